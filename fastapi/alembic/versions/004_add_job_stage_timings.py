@@ -0,0 +1,28 @@
+"""add stage timings to video processing jobs
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'video_processing_jobs',
+        sa.Column('stage_timings', postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('video_processing_jobs', 'stage_timings')
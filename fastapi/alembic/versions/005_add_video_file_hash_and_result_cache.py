@@ -0,0 +1,49 @@
+"""add file hash to camera videos and analysis result cache
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('camera_videos', sa.Column('file_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_camera_videos_file_hash'), 'camera_videos', ['file_hash'], unique=False)
+
+    op.create_table(
+        'analysis_result_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_hash', sa.String(length=64), nullable=False),
+        sa.Column('model_version', sa.String(length=64), nullable=False),
+        sa.Column('config_version', sa.String(length=64), nullable=False),
+        sa.Column('source_video_id', sa.Integer(), nullable=False),
+        sa.Column('summary', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['source_video_id'], ['camera_videos.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('file_hash', 'model_version', 'config_version', name='uq_analysis_result_cache_key')
+    )
+    op.create_index(op.f('ix_analysis_result_cache_id'), 'analysis_result_cache', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_analysis_result_cache_source_video_id'), 'analysis_result_cache', ['source_video_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_analysis_result_cache_source_video_id'), table_name='analysis_result_cache')
+    op.drop_index(op.f('ix_analysis_result_cache_id'), table_name='analysis_result_cache')
+    op.drop_table('analysis_result_cache')
+    op.drop_index(op.f('ix_camera_videos_file_hash'), table_name='camera_videos')
+    op.drop_column('camera_videos', 'file_hash')
@@ -0,0 +1,33 @@
+"""add composite index for time-windowed detection reads
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # FRAME was added to the model without a migration
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE detectiontype ADD VALUE IF NOT EXISTS 'FRAME'")
+
+    op.create_index(
+        'ix_ai_detections_video_type_ts',
+        'ai_detections',
+        ['video_id', 'detection_type', 'frame_timestamp'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    # Enum values cannot be dropped in PostgreSQL; FRAME stays
+    op.drop_index('ix_ai_detections_video_type_ts', table_name='ai_detections')
@@ -0,0 +1,141 @@
+"""partition ai_detections and audit_logs by month
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 14:00:00.000000
+
+Both tables become RANGE partitioned parents with one partition per month
+(``<table>_pYYYY_MM``) and a ``<table>_default`` catch-all. The primary key
+becomes (id, partition key) because PostgreSQL requires the partition key in
+every unique constraint; ids still come from the original sequence.
+
+Indexes from 001/002/003/006 are created on the parent, so every existing and
+future partition gets its own copy. New partitions and retention are handled
+by app.services.partition_service (maintain_partitions_task, daily).
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+# Months created ahead of the current one; the maintenance task keeps extending this
+MONTHS_AHEAD = 3
+
+TABLES = {
+    'ai_detections': {
+        'key': 'detected_at',
+        'indexes': [
+            # 001
+            ('ix_ai_detections_video_id', ['video_id']),
+            ('ix_ai_detections_detection_type', ['detection_type']),
+            ('ix_ai_detections_detected_at', ['detected_at']),
+            ('ix_ai_detections_violation_id', ['violation_id']),
+            ('ix_ai_detections_reviewed', ['reviewed']),
+            ('ix_ai_detections_review_status', ['review_status']),
+            # 002_add_performance_indexes
+            ('ix_ai_detections_video_type', ['video_id', 'detection_type']),
+            ('ix_ai_detections_reviewed_status', ['reviewed', 'review_status']),
+            ('ix_ai_detections_type_confidence', ['detection_type', 'confidence_score']),
+            ('ix_ai_detections_detected_status', ['detected_at', 'review_status']),
+            # 006
+            ('ix_ai_detections_video_type_ts', ['video_id', 'detection_type', 'frame_timestamp']),
+        ],
+        'foreign_keys': [
+            ('fk_ai_detections_video_id', 'video_id', 'camera_videos', None),
+            ('fk_ai_detections_violation_id', 'violation_id', 'violations', None),
+            ('fk_ai_detections_reviewed_by', 'reviewed_by', 'users', None),
+        ],
+    },
+    'audit_logs': {
+        'key': 'timestamp',
+        'indexes': [
+            # 003
+            ('ix_audit_logs_user_id', ['user_id']),
+            ('ix_audit_logs_action', ['action']),
+            ('ix_audit_logs_resource', ['resource']),
+            ('ix_audit_logs_resource_id', ['resource_id']),
+            ('ix_audit_logs_status', ['status']),
+            ('ix_audit_logs_timestamp', ['timestamp']),
+            ('ix_audit_logs_user_action_timestamp', ['user_id', 'action', 'timestamp']),
+        ],
+        'foreign_keys': [
+            ('audit_logs_user_id_fkey', 'user_id', 'users', 'SET NULL'),
+        ],
+    },
+}
+
+
+def _add_months(year: int, month: int, months: int):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def _month_range(first: datetime, last: datetime):
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        yield year, month
+        year, month = _add_months(year, month, 1)
+
+
+def _swap_table(table: str, spec: dict, partitioned: bool) -> None:
+    """Rebuild ``table`` as a partitioned (or plain) table and move its rows."""
+    key = spec['key']
+    legacy = f"{table}_legacy"
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    op.execute(f'ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey')
+    # Keep the id sequence alive when the old table is dropped
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+
+    partition_clause = f' PARTITION BY RANGE ("{key}")' if partitioned else ''
+    op.execute(
+        f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        f'{partition_clause}'
+    )
+    if partitioned:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, "{key}")')
+    else:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+
+    if partitioned:
+        bind = op.get_bind()
+        oldest = bind.execute(sa.text(f'SELECT min("{key}") FROM {legacy}')).scalar()
+        now = datetime.utcnow()
+        last_year, last_month = _add_months(now.year, now.month, MONTHS_AHEAD)
+        for year, month in _month_range(oldest or now, datetime(last_year, last_month, 1)):
+            next_year, next_month = _add_months(year, month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_p{year:04d}_{month:02d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{year:04d}-{month:02d}-01') TO ('{next_year:04d}-{next_month:02d}-01')"
+            )
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+    op.execute(f'DROP TABLE {legacy}')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+    for name, column, referred, ondelete in spec['foreign_keys']:
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+
+    # On a partitioned parent each index cascades to every partition
+    for name, columns in spec['indexes']:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade() -> None:
+    for table, spec in TABLES.items():
+        _swap_table(table, spec, partitioned=True)
+
+
+def downgrade() -> None:
+    # Detached partitions are not brought back; only rows still attached are kept
+    for table, spec in TABLES.items():
+        _swap_table(table, spec, partitioned=False)
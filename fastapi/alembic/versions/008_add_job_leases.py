@@ -0,0 +1,37 @@
+"""add lease columns to video processing jobs
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('video_processing_jobs', sa.Column('lease_owner', sa.String(length=255), nullable=True))
+    op.add_column('video_processing_jobs', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.add_column('video_processing_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+    # Claim (PENDING, oldest first) and reclaim (PROCESSING, expired lease) scans
+    op.create_index(
+        'ix_video_jobs_status_lease',
+        'video_processing_jobs',
+        ['status', 'lease_expires_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_video_jobs_status_lease', table_name='video_processing_jobs')
+    op.drop_column('video_processing_jobs', 'heartbeat_at')
+    op.drop_column('video_processing_jobs', 'lease_expires_at')
+    op.drop_column('video_processing_jobs', 'lease_owner')
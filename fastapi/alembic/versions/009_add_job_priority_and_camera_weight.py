@@ -0,0 +1,42 @@
+"""add job priority and camera scheduling weight
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # JobPriority.NORMAL
+    op.add_column(
+        'video_processing_jobs',
+        sa.Column('priority', sa.Integer(), nullable=False, server_default='10')
+    )
+    op.add_column(
+        'cameras',
+        sa.Column('scheduling_weight', sa.Integer(), nullable=False, server_default='1')
+    )
+
+    # Head-of-queue lookup when claiming: highest priority, then oldest
+    op.create_index(
+        'ix_video_jobs_status_priority_created',
+        'video_processing_jobs',
+        ['status', 'priority', 'created_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_video_jobs_status_priority_created', table_name='video_processing_jobs')
+    op.drop_column('cameras', 'scheduling_weight')
+    op.drop_column('video_processing_jobs', 'priority')
@@ -0,0 +1,24 @@
+"""add estimated cost to video processing jobs
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('video_processing_jobs', sa.Column('estimated_cost_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('video_processing_jobs', 'estimated_cost_seconds')
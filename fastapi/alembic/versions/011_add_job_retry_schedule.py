@@ -0,0 +1,35 @@
+"""add retry schedule to video processing jobs
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('video_processing_jobs', sa.Column('next_run_at', sa.DateTime(), nullable=True))
+    op.add_column('video_processing_jobs', sa.Column('error_class', sa.String(length=50), nullable=True))
+
+    # Dispatch of retries whose backoff elapsed (PENDING, next_run_at <= now)
+    op.create_index(
+        'ix_video_jobs_status_next_run',
+        'video_processing_jobs',
+        ['status', 'next_run_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_video_jobs_status_next_run', table_name='video_processing_jobs')
+    op.drop_column('video_processing_jobs', 'error_class')
+    op.drop_column('video_processing_jobs', 'next_run_at')
@@ -0,0 +1,140 @@
+"""
+Deadline-aware sampling for video analysis.
+
+Without a budget a long video runs into the analysis timeout, the job fails
+and is retried with the same parameters, so all of the CPU spent is lost.
+AnalysisBudget measures the cost of reading a frame and of analyzing a
+sampled frame while the analysis runs and projects the time left:
+
+    projected = remaining_frames * read_cost + remaining_frames / stride * sample_cost
+
+When the projection does not fit in ``safety * deadline`` the sampling
+stride is raised first (fewer analyzed frames, same accuracy per frame) and,
+once the stride is at its maximum, the inference size is lowered one step.
+Settings are only ever degraded, never restored, so a run does not oscillate.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class AnalysisBudget:
+    """Adapts the sampling stride and inference size of one analysis to a deadline."""
+
+    def __init__(
+        self,
+        deadline: float,
+        total_frames: int,
+        stride: int,
+        max_stride: int,
+        imgsz_steps: Sequence[int] = (),
+        safety: float = 0.85,
+        warmup_samples: int = 20,
+        check_every: int = 20
+    ):
+        self.deadline = deadline
+        self.total_frames = total_frames
+        self.initial_stride = stride
+        self.stride = stride
+        self.max_stride = max(stride, max_stride)
+        self.imgsz_steps = list(imgsz_steps)
+        # None = the model's own inference size
+        self.imgsz: Optional[int] = None
+        self.safety = safety
+        self.warmup_samples = max(1, warmup_samples)
+        self.check_every = max(1, check_every)
+
+        self.started = time.monotonic()
+        self.frames_read = 0
+        self.read_seconds = 0.0
+        # Sample cost since the last inference size change
+        self.samples = 0
+        self.sample_seconds = 0.0
+        self.samples_total = 0
+        self.adjustments: List[Dict[str, Any]] = []
+        self.reachable = True
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.adjustments)
+
+    def record_read(self, seconds: float):
+        self.frames_read += 1
+        self.read_seconds += seconds
+
+    def record_sample(self, seconds: float) -> bool:
+        """
+        Record one analyzed frame and replan when due.
+
+        Returns:
+            True if the stride or inference size changed
+        """
+        self.samples += 1
+        self.samples_total += 1
+        self.sample_seconds += seconds
+
+        if self.samples < self.warmup_samples or self.samples_total % self.check_every:
+            return False
+        return self._replan()
+
+    def _projected(self, remaining_frames: int, stride: int, read_cost: float, sample_cost: float) -> float:
+        return remaining_frames * read_cost + remaining_frames / stride * sample_cost
+
+    def _replan(self) -> bool:
+        # Streams and some containers report no frame count: nothing to project against
+        if self.total_frames <= 0 or not self.reachable:
+            return False
+
+        remaining_frames = self.total_frames - self.frames_read
+        if remaining_frames <= 0:
+            return False
+
+        elapsed = time.monotonic() - self.started
+        remaining_time = self.deadline * self.safety - elapsed
+        read_cost = self.read_seconds / max(1, self.frames_read)
+        sample_cost = self.sample_seconds / self.samples
+
+        projected = self._projected(remaining_frames, self.stride, read_cost, sample_cost)
+        if projected <= remaining_time:
+            return False
+
+        inference_time = remaining_time - remaining_frames * read_cost
+        if inference_time > 0:
+            required_stride = math.ceil(remaining_frames * sample_cost / inference_time)
+        else:
+            # Reading the frames alone does not fit, sampling cannot save this run
+            required_stride = math.inf
+
+        if required_stride <= self.max_stride:
+            self.stride = max(self.stride, required_stride)
+        else:
+            self.stride = self.max_stride
+            if self.imgsz_steps:
+                self.imgsz = self.imgsz_steps.pop(0)
+                # The old sample cost no longer applies at the new size
+                self.samples = 0
+                self.sample_seconds = 0.0
+            else:
+                self.reachable = False
+
+        self.adjustments.append({
+            'at_frame': self.frames_read,
+            'elapsed': round(elapsed, 2),
+            'projected_seconds': round(projected, 2),
+            'stride': self.stride,
+            'imgsz': self.imgsz
+        })
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'deadline_seconds': self.deadline,
+            'degraded': self.degraded,
+            'initial_stride': self.initial_stride,
+            'stride': self.stride,
+            'imgsz': self.imgsz,
+            'deadline_reachable': self.reachable,
+            'read_cost_ms': round(self.read_seconds / max(1, self.frames_read) * 1000, 3),
+            'adjustments': self.adjustments
+        }
@@ -0,0 +1,69 @@
+"""
+Perceptual frame hashing for skipping near-identical frames.
+
+A 64-bit dHash of the downscaled grayscale frame changes by only a few
+bits between two frames of a stopped intersection, so the detections of
+the previous inferred frame can be reused instead of running the model.
+"""
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """Difference hash: sign of horizontal gradients of a (hash_size+1) x hash_size thumbnail."""
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class FrameSkipper:
+    """
+    Decides per sampled frame whether the previous detections can be reused.
+
+    Frames are compared with the last frame that went through the model,
+    not the previous sampled frame, so slow drift still triggers inference.
+    Every ``refresh_every`` consecutive reuses force one real inference.
+    """
+
+    def __init__(self, threshold: int, refresh_every: int):
+        self.threshold = threshold
+        self.refresh_every = max(1, refresh_every)
+        self.reference_hash: Optional[int] = None
+        self.reused_in_row = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def should_reuse(self, frame: np.ndarray) -> bool:
+        self.frames += 1
+        frame_hash = dhash(frame)
+
+        if (
+            self.reference_hash is not None
+            and self.reused_in_row < self.refresh_every
+            and hamming_distance(frame_hash, self.reference_hash) <= self.threshold
+        ):
+            self.reused_in_row += 1
+            self.skipped += 1
+            return True
+
+        self.reference_hash = frame_hash
+        self.reused_in_row = 0
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skipped / self.frames, 4) if self.frames else 0.0,
+            'threshold': self.threshold,
+            'refresh_every': self.refresh_every
+        }
@@ -0,0 +1,112 @@
+"""
+Inference backends used by AIDetectionService.
+
+A backend turns one BGR frame into an array of detection rows
+(x1, y1, x2, y2, conf, cls). Backends only detect and keep no per-video
+state; tracking is done per analysis by app.ai.tracking.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.ai.inference_server import InferenceClient
+
+logger = logging.getLogger(__name__)
+
+
+class LocalModelBackend:
+    """Loads the YOLO model into the current process."""
+
+    name = "local"
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self.model = None
+        # The ultralytics predictor is not thread-safe; analyses share the model frame by frame
+        self._predict_lock = threading.Lock()
+
+    def load(self) -> bool:
+        try:
+            from ultralytics import YOLO
+
+            if not os.path.exists(self.model_path):
+                logger.error(f"Model file not found at: {self.model_path}")
+                return False
+
+            self.model = YOLO(self.model_path)
+            logger.info(f"YOLO model loaded successfully from {self.model_path}")
+            return True
+
+        except ImportError:
+            logger.error("ultralytics package not installed. Install with: pip install ultralytics")
+            return False
+        except Exception as e:
+            logger.error(f"Error loading YOLO model: {e}")
+            return False
+
+    def detect(
+        self,
+        frame: np.ndarray,
+        conf: float,
+        iou: float,
+        classes: List[int],
+        imgsz: Optional[int] = None
+    ) -> np.ndarray:
+        # Only pass imgsz when set so the model keeps its trained size by default
+        options = {'imgsz': imgsz} if imgsz else {}
+        with self._predict_lock:
+            results = self.model.predict(
+                frame,
+                conf=conf,
+                iou=iou,
+                classes=classes,
+                verbose=False,
+                **options
+            )
+        if not results or not results[0].boxes:
+            return np.zeros((0, 6), dtype=np.float32)
+        return results[0].boxes.data.cpu().numpy()
+
+    def info(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'model_path': self.model_path}
+
+
+class InferenceServerBackend:
+    """Sends frames to the host-local inference server over a Unix socket."""
+
+    name = "server"
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.client = InferenceClient(socket_path, timeout=timeout)
+        self.server_info: Dict[str, Any] = {}
+
+    def load(self) -> bool:
+        try:
+            self.server_info = self.client.ping()
+            logger.info(f"Connected to inference server at {self.socket_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Inference server not reachable at {self.socket_path}: {e}")
+            return False
+
+    def detect(
+        self,
+        frame: np.ndarray,
+        conf: float,
+        iou: float,
+        classes: List[int],
+        imgsz: Optional[int] = None
+    ) -> np.ndarray:
+        return self.client.detect(frame, conf=conf, iou=iou, classes=classes, imgsz=imgsz)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'backend': self.name,
+            'socket_path': self.socket_path,
+            'model_path': self.server_info.get('model_path'),
+        }
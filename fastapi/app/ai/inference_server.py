@@ -0,0 +1,345 @@
+"""
+Host-local inference server shared by all workers on a machine.
+
+One process owns the YOLO model and listens on a Unix socket. Worker
+processes send single frames; the server coalesces requests from all
+connected workers into micro-batches (bounded by ``max_batch_size`` and
+``max_latency_ms``) and runs one batched ``predict`` call per batch.
+
+Wire format (both directions):
+    4-byte big-endian header length | JSON header | raw payload bytes
+
+Usage:
+    python -m app.ai.inference_server --model MODEL/violation_detection.pt
+"""
+
+import os
+import json
+import socket
+import struct
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HEADER_STRUCT = struct.Struct(">I")
+DETECTION_COLUMNS = 6  # x1, y1, x2, y2, conf, cls
+
+
+class InferenceServerError(Exception):
+    """Raised when the inference server rejects or fails a request."""
+
+
+def _encode_message(header: Dict[str, Any], payload: bytes = b"") -> bytes:
+    raw_header = json.dumps(header).encode("utf-8")
+    return HEADER_STRUCT.pack(len(raw_header)) + raw_header + payload
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Inference server closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    (header_size,) = HEADER_STRUCT.unpack(_recv_exact(sock, HEADER_STRUCT.size))
+    header = json.loads(_recv_exact(sock, header_size).decode("utf-8"))
+    payload_size = header.get("payload_size", 0)
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    return header, payload
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], bytes]:
+    (header_size,) = HEADER_STRUCT.unpack(await reader.readexactly(HEADER_STRUCT.size))
+    header = json.loads((await reader.readexactly(header_size)).decode("utf-8"))
+    payload_size = header.get("payload_size", 0)
+    payload = await reader.readexactly(payload_size) if payload_size else b""
+    return header, payload
+
+
+class InferenceClient:
+    """
+    Synchronous client for the inference server.
+
+    Each thread gets its own connection so concurrent analyses in one
+    process are batched by the server instead of serialized by the client.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            finally:
+                self._local.sock = None
+
+    def _request(self, header: Dict[str, Any], payload: bytes = b"") -> Tuple[Dict[str, Any], bytes]:
+        header = dict(header, payload_size=len(payload))
+        message = _encode_message(header, payload)
+
+        # Retry once on a stale connection (e.g. the server was restarted)
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(message)
+                response, response_payload = _recv_message(sock)
+                break
+            except (ConnectionError, BrokenPipeError, OSError):
+                self.close()
+                if attempt == 1:
+                    raise
+
+        if not response.get("ok"):
+            raise InferenceServerError(response.get("error", "Unknown inference server error"))
+        return response, response_payload
+
+    def ping(self) -> Dict[str, Any]:
+        """Check the server is reachable and return its configuration."""
+        response, _ = self._request({"op": "ping"})
+        return response
+
+    def detect(
+        self,
+        frame: np.ndarray,
+        conf: float,
+        iou: float,
+        classes: List[int],
+        imgsz: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Run detection on a single frame.
+
+        Returns:
+            float32 array of shape (N, 6): x1, y1, x2, y2, conf, cls
+        """
+        frame = np.ascontiguousarray(frame)
+        response, payload = self._request(
+            {
+                "op": "detect",
+                "shape": list(frame.shape),
+                "dtype": str(frame.dtype),
+                "conf": conf,
+                "iou": iou,
+                "classes": list(classes),
+                "imgsz": imgsz,
+            },
+            frame.tobytes()
+        )
+        rows = response.get("rows", 0)
+        if rows == 0:
+            return np.zeros((0, DETECTION_COLUMNS), dtype=np.float32)
+        return np.frombuffer(payload, dtype=np.float32).reshape(rows, DETECTION_COLUMNS)
+
+
+class InferenceServer:
+    """Asyncio Unix-socket server that micro-batches frames into one model."""
+
+    def __init__(
+        self,
+        model_path: str,
+        socket_path: str,
+        max_batch_size: int = 8,
+        max_latency_ms: float = 20.0
+    ):
+        self.model_path = model_path
+        self.socket_path = socket_path
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_latency = max(0.0, max_latency_ms) / 1000.0
+        self.model = None
+        self._queue: Optional[asyncio.Queue] = None
+        # A single inference thread: the model is never called concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.stats = {"requests": 0, "batches": 0}
+
+    def load_model(self):
+        from ultralytics import YOLO
+
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model file not found at: {self.model_path}")
+        self.model = YOLO(self.model_path)
+        logger.info(f"Inference server loaded model from {self.model_path}")
+
+    async def serve_forever(self):
+        if self.model is None:
+            self.load_model()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batch_loop())
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+
+        logger.info(
+            f"Inference server listening on {self.socket_path} "
+            f"(max_batch_size={self.max_batch_size}, max_latency={self.max_latency * 1000:.1f}ms)"
+        )
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown(wait=False)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    header, payload = await _read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+
+                op = header.get("op")
+                if op == "ping":
+                    writer.write(_encode_message({
+                        "ok": True,
+                        "model_path": self.model_path,
+                        "max_batch_size": self.max_batch_size,
+                        "max_latency_ms": self.max_latency * 1000,
+                        "stats": self.stats,
+                    }))
+                elif op == "detect":
+                    frame = np.frombuffer(payload, dtype=header["dtype"]).reshape(header["shape"])
+                    params = (
+                        header["conf"],
+                        header["iou"],
+                        tuple(header.get("classes") or ()),
+                        header.get("imgsz")
+                    )
+                    future = loop.create_future()
+                    await self._queue.put((frame, params, future))
+                    try:
+                        boxes = await future
+                        boxes = np.ascontiguousarray(boxes, dtype=np.float32)
+                        writer.write(_encode_message({"ok": True, "rows": int(boxes.shape[0])}, boxes.tobytes()))
+                    except Exception as e:
+                        writer.write(_encode_message({"ok": False, "error": str(e)}))
+                else:
+                    writer.write(_encode_message({"ok": False, "error": f"Unknown op: {op}"}))
+
+                await writer.drain()
+        except Exception as e:
+            logger.error(f"Inference client connection error: {e}")
+        finally:
+            writer.close()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_latency
+
+            # Coalesce whatever arrives before the deadline, up to the batch size
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests with different thresholds or inference sizes cannot share one predict call
+            groups: Dict[tuple, list] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for params, items in groups.items():
+                frames = [item[0] for item in items]
+                try:
+                    outputs = await loop.run_in_executor(self._executor, self._predict, frames, params)
+                    for (_, _, future), boxes in zip(items, outputs):
+                        if not future.done():
+                            future.set_result(boxes)
+                except Exception as e:
+                    logger.error(f"Batched inference failed: {e}")
+                    for _, _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+
+    def _predict(self, frames: List[np.ndarray], params: tuple) -> List[np.ndarray]:
+        conf, iou, classes, imgsz = params
+        options = {"imgsz": imgsz} if imgsz else {}
+        results = self.model.predict(
+            frames,
+            conf=conf,
+            iou=iou,
+            classes=list(classes) or None,
+            verbose=False,
+            **options
+        )
+        outputs = []
+        for result in results:
+            if result.boxes is None or len(result.boxes) == 0:
+                outputs.append(np.zeros((0, DETECTION_COLUMNS), dtype=np.float32))
+            else:
+                outputs.append(result.boxes.data.cpu().numpy()[:, :DETECTION_COLUMNS].astype(np.float32))
+        return outputs
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Host-local micro-batching inference server")
+    parser.add_argument("--model", default=None, help="Path to YOLO weights")
+    parser.add_argument("--socket", default=settings.AI_INFERENCE_SOCKET, help="Unix socket path")
+    parser.add_argument("--max-batch-size", type=int, default=settings.AI_INFERENCE_MAX_BATCH)
+    parser.add_argument("--max-latency-ms", type=float, default=settings.AI_INFERENCE_MAX_LATENCY_MS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # The server owns the host's inference cores; workers only decode and parse
+    from app.core.cpu_governor import plan_layout, apply_layout
+    apply_layout(plan_layout(concurrency=1, threads_per_child=settings.AI_TORCH_THREADS or None))
+
+    model_path = args.model
+    if model_path is None:
+        from app.services.ai_detection_service import AIDetectionService
+        model_path = AIDetectionService().model_path
+
+    server = InferenceServer(
+        model_path=model_path,
+        socket_path=args.socket,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms
+    )
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
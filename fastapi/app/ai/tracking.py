@@ -0,0 +1,106 @@
+"""
+Per-analysis multi-object tracking.
+
+``model.track(persist=True)`` keeps the tracker on the model object, so
+every analysis sharing a model shares one tracker. Here each analysis owns
+its own ByteTrack instance fed with plain detections, and the model (local
+or behind the inference server) only detects.
+
+ultralytics numbers tracks with a class-level counter that every new
+BYTETracker resets, so with several analyses in one process (threaded
+pools, the inference server) starting an analysis would restart the IDs of
+all the others and two vehicles of one video could share an ID. Each
+VehicleTracker numbers its tracks with its own counter instead: IDs are
+unique and contiguous within a video (from 1), not across videos.
+"""
+
+import logging
+import itertools
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACKER_CONFIG = "bytetrack.yaml"
+
+
+class VehicleTracker:
+    """ByteTrack state for one video analysis."""
+
+    def __init__(self, frame_rate: float = 30.0, tracker_config: str = DEFAULT_TRACKER_CONFIG):
+        from ultralytics.utils import IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+        from ultralytics.trackers.byte_tracker import BYTETracker
+
+        config = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_config)))
+        self.tracker = BYTETracker(args=config, frame_rate=max(1, round(frame_rate)))
+        self._track_class = self._own_track_class()
+
+        # New tracks are created by init_track; give them this tracker's ID counter
+        init_track = self.tracker.init_track
+
+        def init_own_tracks(*args, **kwargs):
+            tracks = init_track(*args, **kwargs)
+            for track in tracks:
+                track.__class__ = self._track_class
+            return tracks
+
+        self.tracker.init_track = init_own_tracks
+
+    @staticmethod
+    def _own_track_class():
+        """STrack subclass whose IDs come from a counter private to one tracker."""
+        from ultralytics.trackers.byte_tracker import STrack
+
+        counter = itertools.count(1)
+
+        class OwnIdTrack(STrack):
+            # Same layout as STrack so existing tracks can switch class
+            __slots__ = ()
+
+            @staticmethod
+            def next_id():
+                return next(counter)
+
+        return OwnIdTrack
+
+    def update(self, rows: np.ndarray, frame: np.ndarray) -> np.ndarray:
+        """
+        Associate one frame of detections with existing tracks.
+
+        Args:
+            rows: Detection rows (x1, y1, x2, y2, conf, cls)
+            frame: The BGR frame the rows were detected on
+
+        Returns:
+            Tracked rows (x1, y1, x2, y2, track_id, conf, cls)
+        """
+        from ultralytics.engine.results import Boxes
+
+        if rows.shape[1] >= 7:
+            # Drop track IDs of a backend that still tracks on its own
+            rows = rows[:, [0, 1, 2, 3, 5, 6]]
+
+        tracks = self.tracker.update(Boxes(rows, frame.shape[:2]), frame)
+        if len(tracks) == 0:
+            return np.zeros((0, 7), dtype=np.float32)
+        # Drop the trailing detection index column
+        return np.asarray(tracks, dtype=np.float32)[:, :7]
+
+
+def create_tracker(frame_rate: float) -> Optional[VehicleTracker]:
+    """
+    Create a tracker for one analysis.
+
+    Args:
+        frame_rate: Rate of the frames fed to the tracker (sampled, not source fps)
+
+    Returns:
+        VehicleTracker, or None if ultralytics is not installed (rows stay untracked)
+    """
+    try:
+        return VehicleTracker(frame_rate=frame_rate)
+    except ImportError:
+        logger.warning("ultralytics not installed, vehicles will not be tracked")
+        return None
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.core.database import get_db
@@ -6,6 +6,9 @@ from app.schemas.user_schema import UserCreate, UserResponse, UserListResponse
 from app.services.user_service import UserService
 from app.api.dependencies import get_current_user, require_role
 from app.models.user import User
+from app.models.video_processing_job import JobType
+from app.services.video_processing_service import video_processing_service
+from app.services.admission_control_service import admission_control_service
 
 router = APIRouter()
 
@@ -63,4 +66,46 @@ def get_admin_dashboard(
         "total_officers": total_officers,
         "total_citizens": total_citizens,
         "system_health": "normal"
-    }
\ No newline at end of file
+    }
+
+@router.get("/video-processing/stage-timings")
+def get_video_processing_stage_timings(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    job_type: Optional[JobType] = Query(None),
+    limit: int = Query(2000, ge=1, le=20000),
+    current_user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    # Histogram thời gian từng giai đoạn xử lý video (decode, inference, ghi DB...)
+    return video_processing_service.get_stage_timing_histograms(
+        db, hours=hours, job_type=job_type, limit=limit
+    )
+
+@router.get("/video-processing/camera-queues")
+def get_video_processing_camera_queues(
+    hours: int = Query(1, ge=1, le=24 * 7),
+    current_user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    # Độ sâu hàng đợi và thời gian chờ theo từng camera (trọng số: Camera.scheduling_weight)
+    return video_processing_service.get_camera_queue_stats(db, hours=hours)
+
+@router.get("/video-processing/backlog")
+def get_video_processing_backlog(
+    current_user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    # Độ sâu hàng đợi phân tích, thời gian ước tính để xử lý hết và quyết định nhận upload hiện tại
+    return admission_control_service.get_metrics(db)
+
+@router.get("/video-processing/jobs/{job_id}/result")
+def get_video_processing_job_result(
+    job_id: int,
+    current_user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    # Kết quả đầy đủ của job (biển số, vi phạm, bounding box), đọc từ blob nén khi được yêu cầu
+    try:
+        return video_processing_service.get_full_result(db, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
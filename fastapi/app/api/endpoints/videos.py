@@ -2,18 +2,21 @@
 Video management endpoints
 Handles video upload, retrieval, and management for AI camera system
 """
+import json
 from typing import Optional
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func, cast, Date
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.api.dependencies import get_current_user
-from app.models.user import User
+from app.models.user import User, Role
 from app.models.CameraVideo import CameraVideo, ProcessingStatus
-from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
+from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus, JobPriority
 from app.models.camera import Camera
 from app.models.ai_detection import AIDetection, DetectionType, ReviewStatus
 from app.schemas.video_schema import (
@@ -25,6 +28,7 @@ from app.schemas.video_schema import (
     VideoAnalysisResponse,
     DetectionResponse,
     VideoDetectionsResponse,
+    VideoTracksResponse,
     PendingDetectionsResponse,
     DetectionReviewRequest,
     DetectionReviewResponse
@@ -32,6 +36,12 @@ from app.schemas.video_schema import (
 from app.services.cloudinary_service import cloudinary_service
 from app.services.ai_detection_service import ai_detection_service
 from app.services.video_processing_service import video_processing_service
+from app.services.analysis_cache_service import analysis_cache_service
+from app.services.media_probe_service import media_probe_service
+from app.services.job_cost_service import job_cost_service
+from app.services.admission_control_service import admission_control_service, REJECT, DEFER
+from app.services.track_store import track_store, TrackStoreUnavailable
+from app.core.config import settings
 from app.services.violation_service import ViolationService
 from app.services.cache_service import cache_service
 from app.services.audit_service import audit_service, AuditAction, AuditResource
@@ -45,7 +55,7 @@ logger = logging.getLogger(__name__)
 
 # Import Celery tasks (only if Celery is available)
 try:
-    from app.workers.video_worker import process_video_task
+    from app.workers.pipeline import start_video_pipeline
     CELERY_AVAILABLE = True
 except ImportError:
     CELERY_AVAILABLE = False
@@ -156,7 +166,29 @@ async def upload_video(
             detail=f"Camera with ID {camera_id} not found"
         )
     
+    # Backlog too deep for this uploader: reject before uploading anything
+    admission = await run_in_threadpool(admission_control_service.decide, db, current_user.role)
+    if admission.action == REJECT:
+        audit_service.log_failed_upload(
+            db=db,
+            user_id=current_user.id,
+            reason=f"Processing backlog full ({admission.drain_seconds:.0f}s to drain)",
+            file_name=file.filename,
+            file_size=file_size,
+            ip_address=client_ip,
+            user_agent=user_agent
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Video processing backlog is full, please retry later",
+            headers={"Retry-After": str(admission.retry_after_seconds)}
+        )
+    
     try:
+        # Duration, fps, resolution and codec from the container header (no decoding)
+        # ffprobe is a blocking subprocess; keep it off the event loop
+        media = await run_in_threadpool(media_probe_service.probe_upload, file)
+        
         # Upload to Cloudinary
         logger.info(f"Uploading video to Cloudinary for camera {camera_id}")
         upload_result = cloudinary_service.upload_video(
@@ -180,6 +212,7 @@ async def upload_video(
             duration=upload_result.get("duration"),
             file_size=upload_result.get("bytes"),
             format=upload_result.get("format"),
+            file_hash=file_hash,
             uploaded_by=current_user.id,
             processing_status=ProcessingStatus.PENDING,
             has_violations=False,
@@ -189,32 +222,47 @@ async def upload_video(
                 "height": upload_result.get("height"),
                 "resource_type": upload_result.get("resource_type"),
                 "cloudinary_created_at": upload_result.get("created_at"),
+                "media": media or media_probe_service.from_upload_result(upload_result),
             }
         )
         
         db.add(video)
         db.flush()  # Get video ID without committing
         
-        # Create processing job for AI analysis
-        processing_job = VideoProcessingJob(
-            video_id=video.id,
-            job_type=JobType.AI_ANALYSIS,
-            status=JobStatus.PENDING,
-            retry_count=0
-        )
+        # Same file already analyzed with the current model and config: reuse the results
+        cached_analysis = analysis_cache_service.find_reusable(db, file_hash)
+        if cached_analysis:
+            # Sao chép track store là I/O đĩa/mạng: không chạy trên event loop
+            processing_job = await run_in_threadpool(analysis_cache_service.clone_results, db, cached_analysis, video)
+        else:
+            # Create processing job for AI analysis
+            processing_job = VideoProcessingJob(
+                video_id=video.id,
+                job_type=JobType.AI_ANALYSIS,
+                status=JobStatus.PENDING,
+                priority=int(JobPriority.UPLOAD),
+                estimated_cost_seconds=job_cost_service.estimate_video(video),
+                retry_count=0
+            )
+            if admission.action == DEFER:
+                # Stored now, analyzed once the backlog should have drained (dispatch_due_retries_task)
+                processing_job.priority = int(JobPriority.BACKGROUND)
+                processing_job.next_run_at = admission.run_at
+            db.add(processing_job)
         
-        db.add(processing_job)
         db.commit()
         db.refresh(video)
         db.refresh(processing_job)
         
         # Queue the video for background processing using Celery
-        if CELERY_AVAILABLE:
+        if cached_analysis:
+            logger.info(f"Video {video.id} is a duplicate of video {cached_analysis.source_video_id}, analysis reused")
+        elif processing_job.next_run_at:
+            logger.info(f"Analysis of video {video.id} deferred until {processing_job.next_run_at} (job {processing_job.id})")
+        elif CELERY_AVAILABLE:
             try:
-                process_video_task.apply_async(
-                    args=[processing_job.id],
-                    queue='video_processing'
-                )
+                # Thumbnail and analysis run in parallel, then violations and notifications
+                start_video_pipeline(processing_job)
                 logger.info(f"Queued video {video.id} for background processing (job {processing_job.id})")
             except Exception as e:
                 logger.error(f"Failed to queue video for background processing: {e}")
@@ -244,7 +292,8 @@ async def upload_video(
             cloudinary_url=video.cloudinary_url,
             thumbnail_url=video.thumbnail_url,
             processing_job_id=processing_job.id,
-            status=video.processing_status
+            status=video.processing_status,
+            analysis_scheduled_at=processing_job.next_run_at
         )
         
     except HTTPException:
@@ -524,7 +573,8 @@ def get_video(
         processed_at=video.processed_at,
         processing_status=video.processing_status,
         has_violations=video.has_violations,
-        violation_count=video.violation_count
+        violation_count=video.violation_count,
+        timeline_sprite=(video.video_metadata or {}).get("timeline_sprite")
     )
     
     # Cache the video metadata for 1 hour
@@ -657,10 +707,15 @@ def analyze_video(
     
     try:
         # Create a new processing job
+        # Officer-initiated re-analysis goes ahead of the upload backlog
+        is_staff = current_user.role in (Role.OFFICER.value, Role.ADMIN.value)
+        priority = JobPriority.REANALYSIS if is_staff else JobPriority.NORMAL
         processing_job = VideoProcessingJob(
             video_id=video_id,
             job_type=JobType.AI_ANALYSIS,
             status=JobStatus.PENDING,
+            priority=int(priority),
+            estimated_cost_seconds=job_cost_service.estimate_video(video),
             retry_count=0
         )
         
@@ -671,10 +726,8 @@ def analyze_video(
         # Queue the video for background processing using Celery
         if CELERY_AVAILABLE:
             try:
-                process_video_task.apply_async(
-                    args=[processing_job.id],
-                    queue='video_processing'
-                )
+                # Thumbnail and analysis run in parallel, then violations and notifications
+                start_video_pipeline(processing_job)
                 logger.info(f"Queued video {video_id} for background AI analysis (job {processing_job.id})")
             except Exception as e:
                 logger.error(f"Failed to queue video for background processing: {e}")
@@ -705,6 +758,10 @@ def get_video_detections(
     video_id: int,
     detection_type: Optional[str] = Query(None, description="Filter by detection type (license_plate, vehicle_count, violation)"),
     min_confidence: Optional[float] = Query(None, description="Minimum confidence score (0.0-1.0)", ge=0.0, le=1.0),
+    t_from: Optional[float] = Query(None, ge=0.0, description="Window start (seconds in video)"),
+    t_to: Optional[float] = Query(None, ge=0.0, description="Window end (seconds in video)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Maximum number of detections per page (all when omitted)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -714,8 +771,11 @@ def get_video_detections(
     - **video_id**: ID of the video
     - **detection_type**: Optional filter by type (license_plate, vehicle_count, violation)
     - **min_confidence**: Optional minimum confidence threshold
+    - **t_from** / **t_to**: Optional time window in the video
+    - **cursor**: Continue after the previous page
+    - **limit**: Optional page size; without it every detection is returned
     
-    Returns list of detections with timestamps and confidence scores
+    Returns detections ordered by timestamp; when paginated, follow next_cursor for more
     
     Requirements: 4.2, 7.1, 7.4
     """
@@ -730,19 +790,30 @@ def get_video_detections(
         )
     
     try:
-        detections = ai_detection_service.get_video_detections(
+        page = ai_detection_service.get_video_detections_page(
             db=db,
             video_id=video_id,
+            limit=limit,
+            cursor=cursor,
             detection_type=detection_type,
-            min_confidence=min_confidence
+            min_confidence=min_confidence,
+            t_from=t_from,
+            t_to=t_to
         )
         
         return VideoDetectionsResponse(
             video_id=video_id,
-            total_detections=len(detections),
-            detections=detections
+            total_detections=page['total'],
+            page_count=len(page['detections']),
+            detections=page['detections'],
+            next_cursor=page['next_cursor']
         )
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching detections for video {video_id}: {str(e)}")
         raise HTTPException(
@@ -751,6 +822,117 @@ def get_video_detections(
         )
 
 
+@router.get("/{video_id}/detections/stream")
+def stream_video_detections(
+    video_id: int,
+    detection_type: Optional[str] = Query(None, description="Filter by detection type (license_plate, vehicle_count, violation)"),
+    min_confidence: Optional[float] = Query(None, description="Minimum confidence score (0.0-1.0)", ge=0.0, le=1.0),
+    t_from: Optional[float] = Query(None, ge=0.0, description="Window start (seconds in video)"),
+    t_to: Optional[float] = Query(None, ge=0.0, description="Window end (seconds in video)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream AI detections of a video as NDJSON (one detection per line)
+    
+    Same filters as GET /{video_id}/detections; rows are fetched in batches
+    so the player can consume overlays while the response is still arriving.
+    """
+    video = db.query(CameraVideo).filter(CameraVideo.id == video_id).first()
+    if not video:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Video with ID {video_id} not found"
+        )
+    
+    def generate():
+        # Own session: the request session may be closed before streaming ends
+        stream_db = SessionLocal()
+        try:
+            for detection in ai_detection_service.iter_video_detections(
+                stream_db,
+                video_id,
+                detection_type=detection_type,
+                min_confidence=min_confidence,
+                t_from=t_from,
+                t_to=t_to
+            ):
+                yield json.dumps(detection) + "\n"
+        finally:
+            stream_db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/{video_id}/tracks", response_model=VideoTracksResponse)
+def get_video_tracks(
+    video_id: int,
+    t_from: float = Query(0.0, ge=0.0, description="Window start (seconds)"),
+    t_to: Optional[float] = Query(None, ge=0.0, description="Window end (seconds, default t_from + 60)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get frame-level bounding boxes of a video for a time window
+    
+    - **video_id**: ID of the video
+    - **t_from**: Window start in seconds
+    - **t_to**: Window end in seconds (at most TRACK_WINDOW_MAX_SECONDS after t_from)
+    
+    Returns sampled frames with their bounding boxes, for the player overlay
+    """
+    video = db.query(CameraVideo).filter(CameraVideo.id == video_id).first()
+    if not video:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Video with ID {video_id} not found"
+        )
+    
+    if t_to is None:
+        t_to = t_from + 60.0
+    if t_to < t_from or t_to - t_from > settings.TRACK_WINDOW_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"t_to must be within {settings.TRACK_WINDOW_MAX_SECONDS:.0f} seconds after t_from"
+        )
+    
+    # Analyses reused before clones got their own pack still point at the source video's
+    pack = (video.video_metadata or {}).get('track_store') or {}
+    
+    try:
+        frames = track_store.read_window(
+            video_id=pack.get('video_id', video_id),
+            t_from=t_from,
+            t_to=t_to,
+            pack=pack
+        )
+    except TrackStoreUnavailable as e:
+        logger.error(f"Tracks of video {video_id} unavailable: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tracks are temporarily unavailable"
+        )
+    except Exception as e:
+        logger.error(f"Error reading tracks for video {video_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read tracks: {str(e)}"
+        )
+    
+    if frames is None and pack:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tracks of video {video_id} are no longer available"
+        )
+    
+    return VideoTracksResponse(
+        video_id=video_id,
+        t_from=t_from,
+        t_to=t_to,
+        frames=frames or []
+    )
+
+
 @router.get("/cameras/{camera_id}/video-stats", response_model=VideoStatsResponse)
 def get_camera_video_stats(
     camera_id: int,
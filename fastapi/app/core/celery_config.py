@@ -11,6 +11,7 @@ Requirements: 5.1, 5.2
 """
 
 from celery import Celery
+from celery.signals import celeryd_after_setup, worker_process_init, worker_process_shutdown
 from app.core.config import settings
 
 # Create Celery instance
@@ -20,7 +21,9 @@ celery_app = Celery(
     backend=settings.CELERY_RESULT_BACKEND,
     include=[
         "app.workers.video_worker",
-        "app.workers.detection_worker"
+        "app.workers.detection_worker",
+        "app.workers.maintenance_worker",
+        "app.workers.pipeline"
     ]
 )
 
@@ -48,8 +51,16 @@ celery_app.conf.update(
     
     # Task routing
     task_routes={
+        # Periodic job bookkeeping must not wait behind long analyses: lease
+        # reclaim and retry dispatch matter most when video workers are saturated or dead
+        "app.workers.video_worker.reclaim_expired_jobs_task": {"queue": "maintenance"},
+        "app.workers.video_worker.dispatch_due_retries_task": {"queue": "maintenance"},
+        "app.workers.video_worker.retry_failed_jobs_task": {"queue": "maintenance"},
+        "app.workers.video_worker.cleanup_old_jobs_task": {"queue": "maintenance"},
         "app.workers.video_worker.*": {"queue": "video_processing"},
         "app.workers.detection_worker.*": {"queue": "detection_processing"},
+        "app.workers.maintenance_worker.*": {"queue": "maintenance"},
+        "app.workers.pipeline.*": {"queue": "video_processing"},
     },
     
     # Retry settings
@@ -58,6 +69,14 @@ celery_app.conf.update(
     
     # Beat schedule (for periodic tasks)
     beat_schedule={
+        "reclaim-expired-job-leases": {
+            "task": "app.workers.video_worker.reclaim_expired_jobs_task",
+            "schedule": float(settings.JOB_RECLAIM_INTERVAL_SECONDS),
+        },
+        "dispatch-due-job-retries": {
+            "task": "app.workers.video_worker.dispatch_due_retries_task",
+            "schedule": float(settings.JOB_RETRY_DISPATCH_INTERVAL_SECONDS),
+        },
         "retry-failed-jobs-every-hour": {
             "task": "app.workers.video_worker.retry_failed_jobs_task",
             "schedule": 3600.0,  # Every hour
@@ -66,6 +85,14 @@ celery_app.conf.update(
             "task": "app.workers.video_worker.cleanup_old_jobs_task",
             "schedule": 86400.0,  # Every day
         },
+        "maintain-partitions-daily": {
+            "task": "app.workers.maintenance_worker.maintain_partitions_task",
+            "schedule": 86400.0,  # Every day
+        },
+        "compact-detections-daily": {
+            "task": "app.workers.maintenance_worker.compact_detections_task",
+            "schedule": 86400.0,  # Every day
+        },
     },
 )
 
@@ -81,3 +108,38 @@ celery_app.conf.task_annotations = {
             print(f"Task {task_id} failed: {exc}")
     }
 }
+
+# CPU governor: the parent records the pool size, each forked child splits the cores
+_pool_concurrency = None
+
+
+@celeryd_after_setup.connect
+def record_pool_concurrency(sender, instance, **kwargs):
+    global _pool_concurrency
+    _pool_concurrency = instance.concurrency
+
+
+@worker_process_init.connect
+def configure_worker_cpu(**kwargs):
+    from billiard.process import current_process
+    from app.core.cpu_governor import configure_worker_process
+
+    configure_worker_process(
+        concurrency=_pool_concurrency or celery_app.conf.worker_concurrency or 1,
+        child_index=getattr(current_process(), "index", None)
+    )
+
+
+# One event loop and HTTP session per child, reused by every task it runs
+@worker_process_init.connect
+def start_worker_runtime(**kwargs):
+    from app.core.worker_runtime import worker_runtime
+
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_worker_runtime(**kwargs):
+    from app.core.worker_runtime import worker_runtime
+
+    worker_runtime.shutdown()
@@ -55,6 +55,136 @@ class Settings(BaseSettings):
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # AI inference
+    # "local": every worker process loads its own YOLO model
+    # "server": frames are sent to the host-local inference server (app.ai.inference_server)
+    AI_INFERENCE_BACKEND: str = "local"
+    AI_INFERENCE_SOCKET: str = "/tmp/tvs_inference.sock"
+    AI_INFERENCE_TIMEOUT: float = 30.0
+    AI_INFERENCE_MAX_BATCH: int = 8
+    AI_INFERENCE_MAX_LATENCY_MS: float = 20.0
+
+    # Reuse the previous detections when a sampled frame's dHash differs by at most
+    # AI_FRAME_SKIP_HAMMING_THRESHOLD bits; force inference after AI_FRAME_SKIP_REFRESH_EVERY reuses
+    AI_FRAME_SKIP_ENABLED: bool = True
+    AI_FRAME_SKIP_HAMMING_THRESHOLD: int = 3
+    AI_FRAME_SKIP_REFRESH_EVERY: int = 10
+
+    # Deadline-aware analysis (app.ai.analysis_budget): after AI_BUDGET_WARMUP_SAMPLES sampled
+    # frames the throughput is measured and, if the video would not finish within
+    # AI_BUDGET_SAFETY x timeout, the sampling stride is raised (up to AI_BUDGET_MAX_STRIDE_FACTOR
+    # x the normal stride) and then the inference size is lowered through AI_BUDGET_IMGSZ_STEPS
+    AI_BUDGET_ENABLED: bool = True
+    AI_BUDGET_SAFETY: float = 0.85
+    AI_BUDGET_WARMUP_SAMPLES: int = 20
+    AI_BUDGET_CHECK_EVERY: int = 20
+    AI_BUDGET_MAX_STRIDE_FACTOR: int = 4
+    AI_BUDGET_IMGSZ_STEPS: list[int] = [480, 320]
+
+    # How save_detection_results writes ai_detections rows: "orm", "bulk" (multi-row INSERT) or "copy"
+    AI_DETECTION_WRITE_MODE: str = "bulk"
+    AI_DETECTION_WRITE_CHUNK: int = 1000
+
+    # Frame-level boxes are packed per video under TRACK_STORE_DIR (app.services.track_store)
+    # and also uploaded to Cloudinary so other hosts can fetch them
+    TRACK_STORE_DIR: str = "data/tracks"
+    TRACK_STORE_UPLOAD: bool = True
+    TRACK_WINDOW_MAX_SECONDS: float = 300.0
+
+    # Full results of video processing jobs are gzip JSON blobs under RESULT_BLOB_DIR
+    # (app.services.result_blob_store); result_data and Celery results only keep a summary
+    RESULT_BLOB_DIR: str = "data/job_results"
+    RESULT_BLOB_UPLOAD: bool = True
+
+    # CPU governor for Celery worker children (app.core.cpu_governor)
+    # 0 = use the Celery pool size / split the available cores evenly
+    AI_WORKER_CONCURRENCY: int = 0
+    AI_TORCH_THREADS: int = 0
+    AI_CPU_AFFINITY: bool = False
+
+    # Media tools (evidence clips, probing)
+    FFMPEG_BINARY: str = "ffmpeg"
+    FFPROBE_BINARY: str = "ffprobe"
+    EVIDENCE_CLIP_PADDING_SECONDS: float = 3.0
+    # Start the clip at the previous keyframe when it is at most this far before the window
+    EVIDENCE_CLIP_KEYFRAME_TOLERANCE_SECONDS: float = 0.5
+
+    # Timeline sprite sheets built from frames sampled during AI analysis
+    TIMELINE_SPRITE_INTERVAL_SECONDS: float = 5.0
+    TIMELINE_SPRITE_TILE_WIDTH: int = 160
+    TIMELINE_SPRITE_COLUMNS: int = 10
+    TIMELINE_SPRITE_MAX_TILES: int = 300
+    THUMBNAIL_WIDTH: int = 640
+
+    # Leases of claimed video processing jobs: the worker renews the lease every
+    # JOB_HEARTBEAT_SECONDS, jobs whose lease expired are reclaimed every JOB_RECLAIM_INTERVAL_SECONDS
+    JOB_LEASE_SECONDS: int = 120
+    JOB_HEARTBEAT_SECONDS: int = 30
+    JOB_RECLAIM_INTERVAL_SECONDS: int = 60
+    # Fair share across cameras counts the jobs each camera started within this window
+    JOB_FAIR_SHARE_WINDOW_SECONDS: int = 600
+    # Failed attempts are retried after min(BASE * 2^(attempt-1), MAX) seconds, jittered down
+    # by up to JOB_RETRY_JITTER; due retries are dispatched every JOB_RETRY_DISPATCH_INTERVAL_SECONDS
+    JOB_RETRY_BASE_SECONDS: int = 60
+    JOB_RETRY_MAX_SECONDS: int = 3600
+    JOB_RETRY_JITTER: float = 0.5
+    JOB_RETRY_DISPATCH_INTERVAL_SECONDS: int = 30
+
+    # Uploads and re-analysis requests start a per-video Celery chord (app.workers.pipeline):
+    # thumbnail and analysis in parallel, then violation creation and notifications.
+    # Disabled, only a claim token is queued and violations are created by the detection worker
+    VIDEO_PIPELINE_ENABLED: bool = True
+
+    # Admission control of uploads (app.services.admission_control_service), from the estimated
+    # time to drain the analysis backlog over ADMISSION_WORKER_SLOTS (0 = pool sizes of the
+    # video workers, asked every ADMISSION_SLOTS_CACHE_SECONDS).
+    # Uploads outside ADMISSION_PROTECTED_ROLES are deferred (stored, analysis scheduled later,
+    # spread by up to ADMISSION_DEFER_JITTER) above the defer threshold and rejected with 429
+    # above the reject threshold
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_WORKER_SLOTS: int = 0
+    ADMISSION_SLOTS_CACHE_SECONDS: float = 300.0
+    ADMISSION_DEFER_JITTER: float = 0.25
+    ADMISSION_DEFER_DRAIN_SECONDS: float = 1800.0
+    ADMISSION_REJECT_DRAIN_SECONDS: float = 7200.0
+    ADMISSION_MAX_DEFER_SECONDS: int = 21600
+    ADMISSION_MAX_RETRY_AFTER_SECONDS: int = 3600
+    ADMISSION_DEFAULT_JOB_SECONDS: float = 120.0
+    ADMISSION_CACHE_SECONDS: float = 10.0
+    ADMISSION_PROTECTED_ROLES: list[str] = ["officer", "admin"]
+
+    # Job cost model (app.services.job_cost_service), calibrated from completed analyses.
+    # Jobs estimated above JOB_HEAVY_COST_SECONDS go to the video_processing_heavy queue (0 = single queue)
+    JOB_COST_CALIBRATION_DAYS: int = 30
+    JOB_COST_CALIBRATION_SAMPLES: int = 500
+    JOB_COST_MODEL_REFRESH_SECONDS: int = 3600
+    JOB_HEAVY_COST_SECONDS: float = 600.0
+    JOB_HEAVY_TIME_LIMIT_SECONDS: int = 7200
+    # Among cameras with equal priority and share, claim the cheapest head job first
+    JOB_PREFER_SHORT_JOBS: bool = True
+
+    # Per-stage timing of video processing jobs (VideoProcessingJob.stage_timings)
+    PIPELINE_PROFILING_ENABLED: bool = True
+
+    # Monthly partitions of ai_detections / audit_logs (app.services.partition_service)
+    # Retention in months, 0 = keep forever; expired partitions are "detach"ed or "drop"ped
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_EXPIRE_MODE: str = "detach"
+    AI_DETECTION_RETENTION_MONTHS: int = 24
+    AUDIT_LOG_RETENTION_MONTHS: int = 12
+
+    # Compaction of detections of old videos (app.services.detection_compaction_service)
+    # 0 days disables a level. A video whose compaction fails is retried after
+    # DETECTION_COMPACTION_RETRY_DAYS, doubled per failure, up to DETECTION_COMPACTION_MAX_FAILURES
+    DETECTION_COMPACT_AFTER_DAYS: int = 30
+    DETECTION_SUMMARIZE_AFTER_DAYS: int = 180
+    DETECTION_COMPACT_FPS: float = 1.0
+    DETECTION_COMPACT_MIN_CONFIDENCE: float = 0.5
+    DETECTION_COMPACTION_BATCH: int = 5000
+    DETECTION_COMPACTION_VIDEO_LIMIT: int = 50
+    DETECTION_COMPACTION_RETRY_DAYS: int = 1
+    DETECTION_COMPACTION_MAX_FAILURES: int = 5
+
     # Pydantic settings configuration (v2)
     model_config = SettingsConfigDict(
         env_file=ENV_PATH,
@@ -0,0 +1,221 @@
+"""
+CPU governor for inference worker processes.
+
+With prefork, every child runs PyTorch with one intra-op thread per core
+it can see, so N children oversubscribe the machine N times. The governor
+detects the cores actually available (affinity mask and cgroup quota),
+splits them between the children, and sets torch/OpenCV thread counts and
+optionally a CPU affinity slice in each child at startup.
+
+OpenMP/MKL/OpenBLAS thread counts come from environment variables that are
+read when numpy and torch are first imported. Those imports happen in the
+Celery parent before it forks, so the variables are exported by the worker
+entrypoint (celery_worker.py, export_thread_env) rather than in the child.
+"""
+
+import os
+import sys
+import math
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Libraries read these once when they are first imported (see export_thread_env)
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+THREADED_MODULES = ("numpy", "torch", "cv2")
+
+_current_layout: Optional["CpuLayout"] = None
+
+
+@dataclass
+class CpuLayout:
+    """How the available cores are split between worker children."""
+    available_cpus: List[int]
+    cgroup_quota: Optional[float]
+    effective_cores: int
+    concurrency: int
+    threads_per_child: int
+    child_index: Optional[int] = None
+    affinity: Optional[List[int]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _read_cgroup_quota() -> Optional[float]:
+    """CPU quota in cores from cgroup v2 cpu.max or v1 cfs files, None if unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def plan_layout(
+    concurrency: int,
+    threads_per_child: Optional[int] = None,
+    child_index: Optional[int] = None,
+    pin: bool = False
+) -> CpuLayout:
+    """
+    Decide threads (and optionally cores) for one worker child.
+
+    Args:
+        concurrency: Number of worker children sharing the cores
+        threads_per_child: Fixed thread count, or None to split the cores evenly
+        child_index: Index of the child (0..concurrency-1), needed for pinning
+        pin: Whether to restrict the child to its own slice of cores
+
+    Returns:
+        CpuLayout for the child
+    """
+    cpus = available_cpus()
+    quota = _read_cgroup_quota()
+    effective = len(cpus)
+    if quota is not None:
+        effective = max(1, min(effective, math.ceil(quota)))
+
+    concurrency = max(1, concurrency)
+    threads = threads_per_child or max(1, effective // concurrency)
+
+    affinity = None
+    if pin and child_index is not None and len(cpus) >= concurrency:
+        # Slices of the affinity mask; children past the end wrap around
+        start = (child_index * threads) % len(cpus)
+        affinity = [cpus[(start + i) % len(cpus)] for i in range(min(threads, len(cpus)))]
+
+    return CpuLayout(
+        available_cpus=cpus,
+        cgroup_quota=quota,
+        effective_cores=effective,
+        concurrency=concurrency,
+        threads_per_child=threads,
+        child_index=child_index,
+        affinity=affinity
+    )
+
+
+def apply_layout(layout: CpuLayout) -> CpuLayout:
+    """Apply a layout to the current process."""
+    global _current_layout
+
+    if layout.affinity:
+        try:
+            os.sched_setaffinity(0, layout.affinity)
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not set CPU affinity {layout.affinity}: {e}")
+            layout.affinity = None
+
+    try:
+        import torch
+        torch.set_num_threads(layout.threads_per_child)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Only allowed before the first parallel op
+            pass
+    except ImportError:
+        pass
+
+    try:
+        import cv2
+        cv2.setNumThreads(layout.threads_per_child)
+    except ImportError:
+        pass
+
+    _current_layout = layout
+    return layout
+
+
+def concurrency_from_argv(argv: List[str]) -> Optional[int]:
+    """Pool size passed to ``celery worker`` as -c/--concurrency, if any."""
+    for i, arg in enumerate(argv):
+        value = None
+        if arg.startswith("--concurrency="):
+            value = arg.split("=", 1)[1]
+        elif arg in ("-c", "--concurrency") and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith("-c") and arg[2:].isdigit():
+            value = arg[2:]
+        if value is not None:
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+def export_thread_env(concurrency: int) -> int:
+    """
+    Export OMP/MKL/OpenBLAS thread counts for the worker children.
+
+    Must run before numpy or torch is imported; values already set in the
+    environment are kept.
+
+    Returns:
+        Threads per child
+    """
+    imported = [name for name in THREADED_MODULES if name in sys.modules]
+    if imported:
+        logger.warning(f"{imported} already imported, thread environment variables have no effect")
+
+    layout = plan_layout(
+        concurrency=settings.AI_WORKER_CONCURRENCY or concurrency,
+        threads_per_child=settings.AI_TORCH_THREADS or None
+    )
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(layout.threads_per_child))
+    return layout.threads_per_child
+
+
+def configure_worker_process(concurrency: int, child_index: Optional[int] = None) -> CpuLayout:
+    """
+    Plan and apply the layout for a worker child using AI_* settings.
+
+    AI_WORKER_CONCURRENCY overrides the pool size reported by Celery and
+    AI_TORCH_THREADS overrides the even split.
+    """
+    layout = plan_layout(
+        concurrency=settings.AI_WORKER_CONCURRENCY or concurrency,
+        threads_per_child=settings.AI_TORCH_THREADS or None,
+        child_index=child_index,
+        pin=settings.AI_CPU_AFFINITY
+    )
+    apply_layout(layout)
+    logger.info(
+        f"CPU layout for worker child {child_index}: {layout.threads_per_child} threads "
+        f"of {layout.effective_cores} cores, concurrency {layout.concurrency}, affinity {layout.affinity}"
+    )
+    return layout
+
+
+def get_current_layout() -> Optional[Dict[str, Any]]:
+    """Layout applied to this process, None if the governor did not run."""
+    return _current_layout.to_dict() if _current_layout else None
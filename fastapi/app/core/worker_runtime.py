@@ -0,0 +1,104 @@
+"""
+Per-process runtime for Celery worker children.
+
+Tasks used to create and close a new asyncio event loop on every call to
+run the async processing pipeline, so nothing bound to a loop could be
+reused between tasks. The runtime keeps one event loop and one pooled HTTP
+session per worker process: both are created at ``worker_process_init``
+(after the fork, so no socket or loop is shared with the parent) and closed
+at ``worker_process_shutdown``.
+
+Outside Celery (solo pool, eager tasks, scripts) they are created lazily on
+first use.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_SIZE = 8
+
+
+class WorkerRuntime:
+    """Event loop and HTTP session shared by the tasks of one worker process."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[requests.Session] = None
+        self._pid: Optional[int] = None
+
+    def _check_pid(self):
+        # A forked child inherits the parent's objects; they must not be used there
+        if self._pid != os.getpid():
+            self._loop = None
+            self._http = None
+            self._pid = os.getpid()
+
+    def start(self):
+        """Create the event loop and HTTP session of this process."""
+        self._check_pid()
+        self.loop
+        self.http
+        logger.info(f"Worker runtime started in process {self._pid}")
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self._check_pid()
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+        return self._loop
+
+    @property
+    def http(self) -> requests.Session:
+        """Pooled session for downloads; keeps connections to Cloudinary alive across tasks."""
+        self._check_pid()
+        if self._http is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._http = session
+        return self._http
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """
+        Run a coroutine to completion on the process's event loop.
+
+        Raises:
+            RuntimeError: If called from inside the running loop
+        """
+        return self.loop.run_until_complete(coro)
+
+    def shutdown(self):
+        """Cancel leftover tasks and close the loop and the HTTP session."""
+        if self._pid != os.getpid():
+            return
+
+        loop, self._loop = self._loop, None
+        if loop is not None and not loop.is_closed():
+            try:
+                pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            except Exception as e:
+                logger.warning(f"Error shutting down worker event loop: {e}")
+            finally:
+                loop.close()
+
+        http, self._http = self._http, None
+        if http is not None:
+            http.close()
+
+
+# Global instance
+worker_runtime = WorkerRuntime()
@@ -27,6 +27,7 @@ class CameraVideo(Base, TimestampMixin):
     duration = Column(Integer)  # seconds
     file_size = Column(Integer)  # bytes
     format = Column(String(20))  # mp4, avi, mov
+    file_hash = Column(String(64), index=True)  # SHA-256 of the uploaded file
     
     # Upload info
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -30,6 +30,7 @@ from app.models.CameraVideo import CameraVideo, ProcessingStatus
 from app.models.ai_detection import AIDetection, DetectionType, ReviewStatus
 from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
 from app.models.ai_model_config import AIModelConfig
+from app.models.analysis_result_cache import AnalysisResultCache
 
 __all__ = [
     'Base',
@@ -59,5 +60,6 @@ __all__ = [
     'CameraVideo', 'ProcessingStatus',
     'AIDetection', 'DetectionType', 'ReviewStatus',
     'VideoProcessingJob', 'JobType', 'JobStatus',
-    'AIModelConfig'
+    'AIModelConfig',
+    'AnalysisResultCache'
 ]
\ No newline at end of file
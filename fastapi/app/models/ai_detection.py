@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime, DECIMAL, Enum
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime, DECIMAL, Enum, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -19,7 +19,13 @@ class ReviewStatus(enum.Enum):
 
 
 class AIDetection(Base, TimestampMixin):
+    # Partitioned by month on detected_at (migration 007, app.services.partition_service);
+    # the database primary key is (id, detected_at), ids stay unique through the sequence
     __tablename__ = "ai_detections"
+    __table_args__ = (
+        # Time-windowed reads of one video (player overlays, paginated API)
+        Index("ix_ai_detections_video_type_ts", "video_id", "detection_type", "frame_timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     video_id = Column(Integer, ForeignKey("camera_videos.id"), nullable=False, index=True)
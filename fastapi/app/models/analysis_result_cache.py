@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+from .base import Base, TimestampMixin
+
+
+class AnalysisResultCache(Base, TimestampMixin):
+    """Completed AI analysis that later uploads of the same file can reuse."""
+    __tablename__ = "analysis_result_cache"
+    __table_args__ = (
+        UniqueConstraint("file_hash", "model_version", "config_version", name="uq_analysis_result_cache_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Cache key
+    file_hash = Column(String(64), nullable=False)
+    model_version = Column(String(64), nullable=False)
+    config_version = Column(String(64), nullable=False)
+
+    # Video whose detections are cloned
+    source_video_id = Column(Integer, ForeignKey("camera_videos.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # saved_counts, processing_time, frame_count of the source analysis
+    summary = Column(JSONB)
+
+    # Relationships
+    source_video = relationship("CameraVideo")
+
+    def __repr__(self):
+        return f"<AnalysisResultCache {self.file_hash[:12]} -> video {self.source_video_id}>"
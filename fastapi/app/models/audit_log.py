@@ -41,7 +41,9 @@ class AuditLog(Base):
     """
     Audit log for tracking security-relevant events
     
-    Stores information about who did what, when, and from where
+    Stores information about who did what, when, and from where.
+    Partitioned by month on timestamp (migration 007); old months are
+    expired by app.services.partition_service.
     """
     __tablename__ = "audit_logs"
     
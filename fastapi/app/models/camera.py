@@ -25,6 +25,9 @@ class Camera(Base, TimestampMixin):
     ai_model_version = Column(String(100))
     confidence_threshold = Column(DECIMAL(5, 4), default=0.7)
     
+    # Share of video processing workers under backlog, relative to other cameras
+    scheduling_weight = Column(Integer, default=1, server_default="1", nullable=False)
+    
     # Maintenance info
     last_maintenance = Column(Date)
     next_maintenance = Column(Date)
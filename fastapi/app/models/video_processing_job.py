@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -11,6 +11,14 @@ class JobType(enum.Enum):
     THUMBNAIL = "thumbnail"
 
 
+class JobPriority(enum.IntEnum):
+    """Claim order of pending jobs, higher first."""
+    BACKGROUND = 0  # retries, backfills
+    NORMAL = 10
+    UPLOAD = 20  # fresh uploads
+    REANALYSIS = 30  # officer-initiated re-analysis
+
+
 class JobStatus(enum.Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -20,6 +28,11 @@ class JobStatus(enum.Enum):
 
 class VideoProcessingJob(Base, TimestampMixin):
     __tablename__ = "video_processing_jobs"
+    __table_args__ = (
+        Index("ix_video_jobs_status_lease", "status", "lease_expires_at"),
+        Index("ix_video_jobs_status_priority_created", "status", "priority", "created_at"),
+        Index("ix_video_jobs_status_next_run", "status", "next_run_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     video_id = Column(Integer, ForeignKey("camera_videos.id"), nullable=False, index=True)
@@ -27,6 +40,9 @@ class VideoProcessingJob(Base, TimestampMixin):
     # Job info
     job_type = Column(Enum(JobType), nullable=False, index=True)
     status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False, index=True)
+    priority = Column(Integer, default=int(JobPriority.NORMAL), server_default="10", nullable=False)
+    # Analysis time predicted from the probed media (app.services.job_cost_service)
+    estimated_cost_seconds = Column(Float)
     
     # Timing
     started_at = Column(DateTime)
@@ -35,9 +51,22 @@ class VideoProcessingJob(Base, TimestampMixin):
     # Error handling
     error_message = Column(String(1000))
     retry_count = Column(Integer, default=0)
+    # Class of the last error (app.services.job_retry_policy); permanent errors are not retried
+    error_class = Column(String(50))
+    # A PENDING job is not claimed before this time (retry backoff); NULL = now
+    next_run_at = Column(DateTime)
     
     # Result data
     result_data = Column(JSONB)
+    
+    # Lease of the worker running the job, renewed by its heartbeat; an expired
+    # lease on a PROCESSING job means the worker died and the job can be reclaimed
+    lease_owner = Column(String(255))
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    
+    # Per-stage timings: {"v": 1, "stages": {name: [wall_ms, cpu_ms, frames]}, "peak_rss_kb": int, "overlap": bool}
+    stage_timings = Column(JSONB)
 
     # Relationships
     video = relationship("CameraVideo", back_populates="processing_jobs")
@@ -16,6 +16,7 @@ class CameraBase(BaseModel):
     enabled_detections: Optional[dict] = None
     ai_model_version: Optional[str] = None
     confidence_threshold: Optional[float] = None
+    scheduling_weight: int = Field(1, ge=1, le=100)
     last_maintenance: Optional[date] = None
     next_maintenance: Optional[date] = None
 
@@ -36,6 +37,7 @@ class CameraUpdate(BaseModel):
     enabled_detections: Optional[dict] = None
     ai_model_version: Optional[str] = None
     confidence_threshold: Optional[float] = None
+    scheduling_weight: Optional[int] = Field(None, ge=1, le=100)
     last_maintenance: Optional[date] = None
     next_maintenance: Optional[date] = None
 
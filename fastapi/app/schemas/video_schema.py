@@ -34,6 +34,8 @@ class VideoUploadResponse(BaseModel):
     thumbnail_url: Optional[str] = None
     processing_job_id: int
     status: ProcessingStatusEnum
+    # Set when admission control deferred the analysis because of the processing backlog
+    analysis_scheduled_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -55,6 +57,7 @@ class VideoResponse(BaseModel):
     processing_status: ProcessingStatusEnum
     has_violations: bool
     violation_count: int
+    timeline_sprite: Optional[dict] = None  # Sprite URL + tile index for timeline scrubbing
     
     class Config:
         from_attributes = True
@@ -119,6 +122,7 @@ class DetectionTypeEnum(str, Enum):
     LICENSE_PLATE = "license_plate"
     VEHICLE_COUNT = "vehicle_count"
     VIOLATION = "violation"
+    FRAME = "frame"  # Legacy rows; frame boxes now come from /tracks
 
 
 class ReviewStatusEnum(str, Enum):
@@ -147,8 +151,24 @@ class DetectionResponse(BaseModel):
 class VideoDetectionsResponse(BaseModel):
     """Response for video detections list"""
     video_id: int
-    total_detections: int
+    total_detections: int  # All detections matching the filters
+    page_count: int  # Number of detections in this page
     detections: List[DetectionResponse]
+    next_cursor: Optional[str] = None
+
+
+class TrackFrameResponse(BaseModel):
+    """Bounding boxes of one sampled frame"""
+    timestamp: float
+    bounding_boxes: List[dict]
+
+
+class VideoTracksResponse(BaseModel):
+    """Response for frame-level boxes in a time window"""
+    video_id: int
+    t_from: float
+    t_to: float
+    frames: List[TrackFrameResponse]
 
 
 class PendingDetectionsResponse(BaseModel):
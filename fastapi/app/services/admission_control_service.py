@@ -0,0 +1,259 @@
+"""
+Admission Control Service for video uploads.
+
+Uploads used to be admitted unconditionally, so when the analysis backlog
+was hours deep every new upload only made it deeper. The backlog is
+measured from the AI_ANALYSIS jobs in the queue:
+
+    pending_cost    = sum of estimated_cost_seconds of PENDING jobs, due or
+                      scheduled for later (deferred uploads, retries in
+                      backoff); jobs without an estimate count as the average one
+    processing_cost = estimated time left of PROCESSING jobs
+    drain_seconds   = (pending_cost + processing_cost) / slots
+
+where ``slots`` is ADMISSION_WORKER_SLOTS or, when it is 0, the summed pool
+size of the Celery workers consuming the video processing queues (asked
+every ADMISSION_SLOTS_CACHE_SECONDS). Uploads by users outside
+ADMISSION_PROTECTED_ROLES (officers and admins by default) are:
+
+- admitted while drain_seconds <= ADMISSION_DEFER_DRAIN_SECONDS
+- deferred above it: stored as usual, analysis scheduled (BACKGROUND
+  priority, ``next_run_at``) for when the backlog should have drained,
+  spread by up to ADMISSION_DEFER_JITTER so deferred jobs do not all come
+  due at once
+- rejected above ADMISSION_REJECT_DRAIN_SECONDS with 429 and Retry-After
+
+The backlog is cached for ADMISSION_CACHE_SECONDS so a burst of uploads
+costs one query.
+"""
+
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
+
+logger = logging.getLogger(__name__)
+
+VIDEO_QUEUES = {"video_processing", "video_processing_heavy"}
+
+ADMIT = "admit"
+DEFER = "defer"
+REJECT = "reject"
+
+
+@dataclass
+class AdmissionDecision:
+    """Outcome of admission control for one upload."""
+    action: str
+    drain_seconds: float
+    retry_after_seconds: Optional[int] = None
+    run_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class AdmissionControlService:
+    """Admits, defers or rejects uploads from the depth of the analysis backlog."""
+
+    def __init__(self):
+        self._backlog: Optional[Dict[str, Any]] = None
+        self._measured_at: Optional[float] = None
+        self._slots: Optional[int] = None
+        self._slots_at: Optional[float] = None
+        self._lock = threading.Lock()
+        # Held while measuring, so a burst of uploads runs one measurement
+        self._refresh_lock = threading.Lock()
+
+    def _inspect_worker_slots(self) -> int:
+        """Summed pool size of the workers consuming the video queues (0 if none answer)."""
+        from app.core.celery_config import celery_app
+
+        inspector = celery_app.control.inspect(timeout=1.0)
+        queues = inspector.active_queues() or {}
+        stats = inspector.stats() or {}
+        slots = 0
+        for worker, worker_queues in queues.items():
+            if not VIDEO_QUEUES.intersection(queue.get('name') for queue in worker_queues):
+                continue
+            pool = (stats.get(worker) or {}).get('pool') or {}
+            slots += int(pool.get('max-concurrency') or 1)
+        return slots
+
+    def worker_slots(self) -> int:
+        """
+        Analysis jobs that can run at once.
+
+        ADMISSION_WORKER_SLOTS when set; otherwise asked from the workers at
+        most every ADMISSION_SLOTS_CACHE_SECONDS. If no worker answers, the
+        last known value is kept (1 before any answer).
+        """
+        if settings.ADMISSION_WORKER_SLOTS > 0:
+            return settings.ADMISSION_WORKER_SLOTS
+
+        with self._lock:
+            fresh = (
+                self._slots_at is not None
+                and time.monotonic() - self._slots_at < settings.ADMISSION_SLOTS_CACHE_SECONDS
+            )
+            if fresh:
+                return self._slots
+
+        try:
+            slots = self._inspect_worker_slots()
+        except Exception as e:
+            logger.warning(f"Could not ask workers for their pool size: {str(e)}")
+            slots = 0
+        with self._lock:
+            if slots:
+                self._slots = slots
+            elif self._slots is None:
+                logger.warning("No video worker answered; assuming 1 worker slot")
+            self._slots = self._slots or 1
+            self._slots_at = time.monotonic()
+            return self._slots
+
+    def measure_backlog(self, db: Session) -> Dict[str, Any]:
+        """
+        Queue depth and estimated drain time of AI analysis jobs.
+
+        Returns:
+            Dictionary with job counts, queued cost in seconds and drain time
+        """
+        now = datetime.utcnow()
+        is_pending = VideoProcessingJob.status == JobStatus.PENDING
+        is_processing = VideoProcessingJob.status == JobStatus.PROCESSING
+        # Deferred jobs and retries in backoff still have to run within the drain window
+        is_due = func.coalesce(VideoProcessingJob.next_run_at <= now, True)
+        elapsed = func.extract('epoch', now - VideoProcessingJob.started_at)
+
+        (
+            pending, scheduled, processing, pending_cost, unestimated, average_cost, processing_cost
+        ) = db.query(
+            func.count(VideoProcessingJob.id).filter(is_pending, is_due),
+            func.count(VideoProcessingJob.id).filter(is_pending, is_due.is_(False)),
+            func.count(VideoProcessingJob.id).filter(is_processing),
+            func.sum(VideoProcessingJob.estimated_cost_seconds).filter(is_pending),
+            func.count(VideoProcessingJob.id).filter(
+                is_pending, VideoProcessingJob.estimated_cost_seconds.is_(None)
+            ),
+            func.avg(VideoProcessingJob.estimated_cost_seconds),
+            func.sum(
+                func.greatest(func.coalesce(VideoProcessingJob.estimated_cost_seconds, 0) - elapsed, 0)
+            ).filter(is_processing)
+        ).filter(
+            VideoProcessingJob.job_type == JobType.AI_ANALYSIS,
+            VideoProcessingJob.status.in_([JobStatus.PENDING, JobStatus.PROCESSING])
+        ).one()
+
+        average_cost = float(average_cost or settings.ADMISSION_DEFAULT_JOB_SECONDS)
+        queued_cost = float(pending_cost or 0) + unestimated * average_cost + float(processing_cost or 0)
+        slots = self.worker_slots()
+
+        return {
+            'pending': pending,
+            'scheduled': scheduled,
+            'processing': processing,
+            'queued_cost_seconds': round(queued_cost, 1),
+            'slots': slots,
+            'drain_seconds': round(queued_cost / slots, 1),
+            'measured_at': now.isoformat()
+        }
+
+    def _cached_backlog(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            fresh = (
+                self._measured_at is not None
+                and time.monotonic() - self._measured_at < settings.ADMISSION_CACHE_SECONDS
+            )
+            return self._backlog if fresh else None
+
+    def _refresh_backlog(self, db: Session) -> Dict[str, Any]:
+        """Measure and cache the backlog; the caller holds ``_refresh_lock``."""
+        backlog = self.measure_backlog(db)
+        with self._lock:
+            self._backlog = backlog
+            self._measured_at = time.monotonic()
+        return backlog
+
+    def get_backlog(self, db: Session) -> Dict[str, Any]:
+        """
+        Backlog measured at most ADMISSION_CACHE_SECONDS ago.
+
+        Concurrent callers that find the cache stale wait for the one
+        measuring instead of each running the queries and worker inspection.
+        """
+        backlog = self._cached_backlog()
+        if backlog is not None:
+            return backlog
+
+        with self._refresh_lock:
+            # Measured by another caller while this one waited
+            backlog = self._cached_backlog()
+            if backlog is not None:
+                return backlog
+            return self._refresh_backlog(db)
+
+    def decide(self, db: Session, role: Optional[str] = None) -> AdmissionDecision:
+        """
+        Admission of an upload by a user with ``role``.
+
+        Args:
+            db: Database session
+            role: Role of the uploading user
+
+        Returns:
+            AdmissionDecision; ``run_at`` is set for deferred uploads and
+            ``retry_after_seconds`` for deferred and rejected ones
+        """
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            return AdmissionDecision(action=ADMIT, drain_seconds=0.0)
+
+        drain = self.get_backlog(db)['drain_seconds']
+        if role in settings.ADMISSION_PROTECTED_ROLES or drain <= settings.ADMISSION_DEFER_DRAIN_SECONDS:
+            return AdmissionDecision(action=ADMIT, drain_seconds=drain)
+
+        if drain > settings.ADMISSION_REJECT_DRAIN_SECONDS:
+            # Back under the reject threshold by then, assuming no new work arrives
+            retry_after = drain - settings.ADMISSION_REJECT_DRAIN_SECONDS
+            retry_after = int(min(max(retry_after, 60), settings.ADMISSION_MAX_RETRY_AFTER_SECONDS))
+            return AdmissionDecision(action=REJECT, drain_seconds=drain, retry_after_seconds=retry_after)
+
+        # Spread deferred jobs so they do not all come due at the same moment
+        delay = min(drain, settings.ADMISSION_MAX_DEFER_SECONDS)
+        delay = int(delay * (1 + random.uniform(0, settings.ADMISSION_DEFER_JITTER)))
+        return AdmissionDecision(
+            action=DEFER,
+            drain_seconds=drain,
+            retry_after_seconds=delay,
+            run_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+
+    def get_metrics(self, db: Session) -> Dict[str, Any]:
+        """Freshly measured backlog, thresholds and the decision for an ordinary upload."""
+        with self._refresh_lock:
+            backlog = self._refresh_backlog(db)
+
+        return {
+            'backlog': backlog,
+            'enabled': settings.ADMISSION_CONTROL_ENABLED,
+            'thresholds': {
+                'defer_drain_seconds': settings.ADMISSION_DEFER_DRAIN_SECONDS,
+                'reject_drain_seconds': settings.ADMISSION_REJECT_DRAIN_SECONDS,
+                'protected_roles': settings.ADMISSION_PROTECTED_ROLES
+            },
+            'upload_decision': self.decide(db).to_dict()
+        }
+
+
+# Global instance
+admission_control_service = AdmissionControlService()
@@ -8,26 +8,47 @@ This service integrates with YOLO model to:
 """
 
 import os
+import enum
+import json
+import base64
+import hashlib
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple
+import time
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from datetime import datetime
 from pathlib import Path
 import tempfile
 from sqlalchemy.orm import Session
 from decimal import Decimal
 
+from app.core.config import settings
+from app.utils.stage_timer import NullStageTimer
+from app.ai.tracking import create_tracker, DEFAULT_TRACKER_CONFIG
+from app.ai.frame_hash import FrameSkipper
+from app.ai.analysis_budget import AnalysisBudget
+from app.services.track_store import track_store
+from app.services.job_retry_policy import PermanentJobError
+from app.core.cpu_governor import get_current_layout
+
 logger = logging.getLogger(__name__)
 
+# Bump when frame sampling or result parsing changes, so cached analyses are not reused
+ANALYSIS_PIPELINE_VERSION = 2
+
+# A plate is attached to a frame's box of the same track within this many seconds
+PLATE_MATCH_WINDOW_SECONDS = 0.5
+
 
 class AIDetectionService:
     """Service for AI-based video analysis and violation detection."""
     
     def __init__(self):
         """Initialize AI Detection Service."""
-        self.model = None
         self.model_loaded = False
         self.model_path = self._get_model_path()
+        self._model_version = None
+        self.backend = self._create_backend()
         self.confidence_threshold = 0.4
         self.iou_threshold = 0.5
         
@@ -66,46 +87,82 @@ class AIDetectionService:
         logger.warning("Model file not found in any expected location")
         return "MODEL/violation_detection.pt"  # Default path
     
+    def _create_backend(self):
+        """Create the inference backend selected by AI_INFERENCE_BACKEND."""
+        from app.ai.inference_backends import LocalModelBackend, InferenceServerBackend
+        
+        if settings.AI_INFERENCE_BACKEND == "server":
+            return InferenceServerBackend(
+                socket_path=settings.AI_INFERENCE_SOCKET,
+                timeout=settings.AI_INFERENCE_TIMEOUT
+            )
+        return LocalModelBackend(self.model_path)
+    
+    def get_model_version(self) -> Optional[str]:
+        """
+        Version of the model weights (SHA-256 prefix of the weights file).
+        
+        Returns:
+            Version string, or None if the weights file is not readable here
+        """
+        if self._model_version is None:
+            try:
+                digest = hashlib.sha256()
+                with open(self.model_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+            except OSError:
+                return None
+            self._model_version = digest.hexdigest()[:16]
+        return self._model_version
+    
+    def get_config_version(self) -> str:
+        """Version of everything besides the weights that shapes the results."""
+        config = {
+            'pipeline': ANALYSIS_PIPELINE_VERSION,
+            'confidence_threshold': self.confidence_threshold,
+            'iou_threshold': self.iou_threshold,
+            'vehicle_classes': self.vehicle_classes,
+            'violation_rules': self.violation_rules,
+            'tracker': DEFAULT_TRACKER_CONFIG,
+            'frame_skip': [
+                settings.AI_FRAME_SKIP_ENABLED,
+                settings.AI_FRAME_SKIP_HAMMING_THRESHOLD,
+                settings.AI_FRAME_SKIP_REFRESH_EVERY
+            ]
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+    
     def load_model(self) -> bool:
         """
-        Load the YOLO model.
+        Load the YOLO model (or connect to the inference server).
         
         Returns:
-            bool: True if model loaded successfully, False otherwise
+            bool: True if the backend is ready, False otherwise
         """
         if self.model_loaded:
             return True
         
-        try:
-            from ultralytics import YOLO
-            
-            if not os.path.exists(self.model_path):
-                logger.error(f"Model file not found at: {self.model_path}")
-                return False
-            
-            self.model = YOLO(self.model_path)
-            self.model_loaded = True
-            logger.info(f"YOLO model loaded successfully from {self.model_path}")
-            return True
-            
-        except ImportError:
-            logger.error("ultralytics package not installed. Install with: pip install ultralytics")
-            return False
-        except Exception as e:
-            logger.error(f"Error loading YOLO model: {e}")
-            return False
+        self.model_loaded = self.backend.load()
+        return self.model_loaded
     
     async def analyze_video(
         self,
         video_path: str,
-        timeout: int = 300
+        timeout: int = 300,
+        frame_sinks: Optional[List[Callable[[float, Any], None]]] = None,
+        stage_timer=None
     ) -> Dict[str, Any]:
         """
         Analyze video using AI model to detect vehicles, license plates, and violations.
         
         Args:
             video_path: Path to the video file (local or URL)
-            timeout: Maximum time in seconds for analysis (default: 300s = 5min)
+            timeout: Maximum time in seconds for analysis (default: 300s = 5min).
+                With AI_BUDGET_ENABLED, sampling is degraded to finish within it
+            frame_sinks: Optional callables receiving (timestamp, frame) for every
+                sampled frame, e.g. to build previews without another decode pass
+            stage_timer: Optional StageTimer collecting open/decode/inference/parse timings
         
         Returns:
             Dictionary containing:
@@ -114,6 +171,7 @@ class AIDetectionService:
             - violations: List of detected violations
             - processing_time: Time taken for analysis
             - frame_count: Total frames processed
+            - budget: Sampling stride / inference size used to meet the timeout
         
         Raises:
             TimeoutError: If analysis exceeds timeout
@@ -126,7 +184,12 @@ class AIDetectionService:
         try:
             # Run analysis with timeout
             result = await asyncio.wait_for(
-                self._analyze_video_internal(video_path),
+                self._analyze_video_internal(
+                    video_path,
+                    frame_sinks or [],
+                    stage_timer or NullStageTimer(),
+                    deadline=timeout if settings.AI_BUDGET_ENABLED else None
+                ),
                 timeout=timeout
             )
             return result
@@ -138,7 +201,13 @@ class AIDetectionService:
             logger.error(f"Error analyzing video: {e}")
             raise
     
-    async def _analyze_video_internal(self, video_path: str) -> Dict[str, Any]:
+    async def _analyze_video_internal(
+        self,
+        video_path: str,
+        frame_sinks: List[Callable[[float, Any], None]],
+        timer,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
         """Internal method to perform video analysis."""
         import cv2
         
@@ -151,8 +220,10 @@ class AIDetectionService:
         tracked_vehicles = set()
         frame_detections_list = []  # Lưu detections cho mỗi frame
         
-        # Open video
+        # Open video (for URLs this includes connecting and reading the header)
+        token = timer.start()
         cap = cv2.VideoCapture(video_path)
+        timer.stop('open', token)
         if not cap.isOpened():
             raise Exception(f"Could not open video file: {video_path}")
         
@@ -162,34 +233,100 @@ class AIDetectionService:
         
         logger.info(f"Analyzing video: {total_frames} frames at {fps} FPS")
         
+        # Tracker state belongs to this analysis, not to the shared model
+        sample_every = max(1, fps // 2)
+        tracker = create_tracker(frame_rate=fps / sample_every if fps else 2)
+        
+        budget = None
+        if deadline:
+            budget = AnalysisBudget(
+                deadline=deadline,
+                total_frames=total_frames,
+                stride=sample_every,
+                max_stride=sample_every * settings.AI_BUDGET_MAX_STRIDE_FACTOR,
+                imgsz_steps=settings.AI_BUDGET_IMGSZ_STEPS,
+                safety=settings.AI_BUDGET_SAFETY,
+                warmup_samples=settings.AI_BUDGET_WARMUP_SAMPLES,
+                check_every=settings.AI_BUDGET_CHECK_EVERY
+            )
+        imgsz = None
+        next_sample = sample_every
+        frames_analyzed = 0
+        
+        skipper = None
+        if settings.AI_FRAME_SKIP_ENABLED:
+            skipper = FrameSkipper(
+                threshold=settings.AI_FRAME_SKIP_HAMMING_THRESHOLD,
+                refresh_every=settings.AI_FRAME_SKIP_REFRESH_EVERY
+            )
+        
         try:
             while cap.isOpened():
-                success, frame = cap.read()
+                # grab() demuxes and decodes; only sampled frames are converted by retrieve()
+                read_started = time.perf_counter()
+                token = timer.start()
+                success = cap.grab()
+                timer.stop('decode', token)
+                if budget is not None:
+                    budget.record_read(time.perf_counter() - read_started)
                 if not success:
                     break
                 
                 frame_count += 1
                 
-                # Process every Nth frame to optimize performance
-                if frame_count % max(1, fps // 2) != 0:  # Process 2 frames per second
+                # Process every Nth frame to optimize performance (2 frames per second
+                # unless the budget raised the stride)
+                if frame_count < next_sample:
                     continue
+                next_sample = frame_count + sample_every
+                frames_analyzed += 1
+                
+                sample_started = time.perf_counter()
+                token = timer.start()
+                success, frame = cap.retrieve()
+                timer.stop('decode', token)
+                if not success:
+                    break
                 
                 # Calculate timestamp in video
                 timestamp = frame_count / fps
                 
-                # Run YOLO detection
-                results = self.model.track(
-                    frame,
-                    persist=True,
-                    conf=self.confidence_threshold,
-                    iou=self.iou_threshold,
-                    classes=list(self.vehicle_classes.keys()),
-                    verbose=False
-                )
+                token = timer.start()
+                for sink in frame_sinks:
+                    try:
+                        sink(timestamp, frame)
+                    except Exception as e:
+                        logger.warning(f"Frame sink failed at {timestamp:.2f}s: {e}")
+                timer.stop('frame_sinks', token)
+                
+                # Near-identical to the last inferred frame: reuse its detections
+                token = timer.start()
+                reuse = skipper is not None and skipper.should_reuse(frame)
+                timer.stop('frame_hash', token)
+                
+                if not reuse:
+                    # Run YOLO detection
+                    token = timer.start()
+                    detections = self.backend.detect(
+                        frame,
+                        conf=self.confidence_threshold,
+                        iou=self.iou_threshold,
+                        classes=list(self.vehicle_classes.keys()),
+                        imgsz=imgsz
+                    )
+                    timer.stop('inference', token)
+                
+                boxes_data = detections
+                if tracker is not None:
+                    # Reused detections still go through the tracker to keep track ages consistent
+                    token = timer.start()
+                    boxes_data = tracker.update(detections, frame)
+                    timer.stop('tracking', token)
                 
                 # Parse detection results
+                token = timer.start()
                 frame_detections = self._parse_frame_detections(
-                    results,
+                    boxes_data,
                     timestamp,
                     tracked_vehicles
                 )
@@ -238,6 +375,15 @@ class AIDetectionService:
                 
                 # Collect violations
                 violations.extend(frame_detections['violations'])
+                timer.stop('parse', token)
+                
+                if budget is not None and budget.record_sample(time.perf_counter() - sample_started):
+                    sample_every, imgsz = budget.stride, budget.imgsz
+                    next_sample = frame_count + sample_every
+                    logger.warning(
+                        f"Analysis behind its {deadline}s deadline at frame {frame_count}/{total_frames}: "
+                        f"stride {sample_every}, imgsz {imgsz or 'default'}"
+                    )
                 
                 # Allow other async tasks to run
                 if frame_count % 100 == 0:
@@ -248,6 +394,9 @@ class AIDetectionService:
         
         processing_time = (datetime.utcnow() - start_time).total_seconds()
         
+        if skipper:
+            logger.info(f"Frame skip: reused detections for {skipper.skipped}/{skipper.frames} sampled frames")
+        
         # Deduplicate license plates
         unique_plates = self._deduplicate_license_plates(license_plates)
         
@@ -258,8 +407,13 @@ class AIDetectionService:
             'frame_detections': frame_detections_list,  # Thêm frame detections với bounding boxes
             'processing_time': processing_time,
             'frame_count': frame_count,
-            'frames_analyzed': len([i for i in range(1, frame_count + 1) if i % max(1, fps // 2) == 0]),
-            'fps': fps
+            'frames_analyzed': frames_analyzed,
+            'frame_skip': skipper.stats() if skipper else None,
+            'budget': budget.stats() if budget else None,
+            'fps': fps,
+            # Reported by the process that ran the model; the analysis cache is keyed by these
+            'model_version': self.get_model_version(),
+            'config_version': self.get_config_version()
         }
         
         logger.info(f"Video analysis complete: {frame_count} frames in {processing_time:.2f}s")
@@ -269,7 +423,7 @@ class AIDetectionService:
     
     def _parse_frame_detections(
         self,
-        results,
+        boxes_data,
         timestamp: float,
         tracked_vehicles: set
     ) -> Dict[str, List[Dict]]:
@@ -277,7 +431,7 @@ class AIDetectionService:
         Parse YOLO detection results for a single frame.
         
         Args:
-            results: YOLO detection results
+            boxes_data: Box rows returned by the inference backend
             timestamp: Timestamp in video (seconds)
             tracked_vehicles: Set of already tracked vehicle IDs
         
@@ -290,11 +444,9 @@ class AIDetectionService:
             'violations': []
         }
         
-        if not results or not results[0].boxes:
+        if boxes_data is None or len(boxes_data) == 0:
             return frame_data
         
-        boxes_data = results[0].boxes.data.cpu().numpy()
-        
         for box_data in boxes_data:
             # Parse box data
             if len(box_data) >= 7:  # With tracking
@@ -420,7 +572,8 @@ class AIDetectionService:
             'vehicle_type': vehicle_detection['vehicle_type'],
             'confidence': vehicle_detection['confidence'] * 0.85,  # OCR confidence
             'bbox': vehicle_detection['bbox'],
-            'timestamp': timestamp
+            'timestamp': timestamp,
+            'track_id': vehicle_detection.get('track_id')
         }
     
     def _deduplicate_license_plates(self, plates: List[Dict]) -> List[Dict]:
@@ -473,6 +626,8 @@ class AIDetectionService:
         return {
             'model_loaded': self.model_loaded,
             'model_path': self.model_path,
+            'inference_backend': self.backend.info(),
+            'cpu_layout': get_current_layout(),
             'confidence_threshold': self.confidence_threshold,
             'iou_threshold': self.iou_threshold,
             'vehicle_classes': self.vehicle_classes,
@@ -483,7 +638,8 @@ class AIDetectionService:
         self,
         db: Session,
         video_id: int,
-        analysis_results: Dict[str, Any]
+        analysis_results: Dict[str, Any],
+        write_mode: Optional[str] = None
     ) -> Dict[str, int]:
         """
         Save AI detection results to database.
@@ -493,10 +649,16 @@ class AIDetectionService:
         - Vehicle counts by type
         - Violations with frame timestamps
         
+        Frame bounding boxes are packed into the track store instead of
+        FRAME rows. Rows are written with the ORM, chunked multi-row INSERTs or
+        PostgreSQL COPY (AI_DETECTION_WRITE_MODE). The video summary is
+        updated in the same transaction.
+        
         Args:
             db: Database session
             video_id: ID of the video being analyzed
             analysis_results: Results from analyze_video method
+            write_mode: "orm", "bulk" or "copy" (default: AI_DETECTION_WRITE_MODE)
         
         Returns:
             Dictionary with counts of saved detections:
@@ -504,108 +666,34 @@ class AIDetectionService:
                 'license_plates': count,
                 'vehicle_counts': count,
                 'violations': count,
+                'frames': count,
                 'total': count
             }
         
         Requirements: 3.3, 3.4, 3.5
         """
-        from app.models.ai_detection import AIDetection, DetectionType
         from app.models.CameraVideo import CameraVideo, ProcessingStatus
         
         logger.info(f"Saving detection results for video {video_id}")
         
-        saved_counts = {
-            'license_plates': 0,
-            'vehicle_counts': 0,
-            'violations': 0,
-            'total': 0
-        }
-        
         try:
-            # Get video record
-            video = db.query(CameraVideo).filter(CameraVideo.id == video_id).first()
-            if not video:
-                raise ValueError(f"Video with ID {video_id} not found")
-            
+            # Building rows also attaches plate numbers to the frame boxes
             detected_at = datetime.utcnow()
+            rows, saved_counts = self._build_detection_rows(video_id, analysis_results, detected_at)
             
-            # Save license plate detections
-            license_plates = analysis_results.get('license_plates', [])
-            for plate in license_plates:
-                detection = AIDetection(
-                    video_id=video_id,
-                    detection_type=DetectionType.LICENSE_PLATE,
-                    detected_at=detected_at,
-                    frame_timestamp=Decimal(str(plate['timestamp'])),
-                    confidence_score=Decimal(str(plate['confidence'])),
-                    detection_data={
-                        'plate_number': plate['plate_number'],
-                        'vehicle_type': plate['vehicle_type'],
-                        'bbox': plate['bbox']
-                    }
-                )
-                db.add(detection)
-                saved_counts['license_plates'] += 1
-            
-            # Save vehicle count detection (single record with all counts)
-            vehicle_counts = analysis_results.get('vehicle_counts', {})
-            if vehicle_counts and sum(vehicle_counts.values()) > 0:
-                detection = AIDetection(
-                    video_id=video_id,
-                    detection_type=DetectionType.VEHICLE_COUNT,
-                    detected_at=detected_at,
-                    frame_timestamp=Decimal('0.0'),  # Summary for entire video
-                    confidence_score=Decimal('1.0'),  # Count is certain
-                    detection_data=vehicle_counts
-                )
-                db.add(detection)
-                saved_counts['vehicle_counts'] = 1
+            # Pack and upload the frame boxes before the transaction opens, so no
+            # row locks are held during the upload (retried inside the store)
+            tracks = track_store.write(video_id, analysis_results.get('frame_detections', []))
             
-            # Save frame detections với bounding boxes
-            frame_detections = analysis_results.get('frame_detections', [])
-            license_plates_list = analysis_results.get('license_plates', [])
+            # Get video record
+            video = db.query(CameraVideo).filter(CameraVideo.id == video_id).first()
+            if not video:
+                raise PermanentJobError(f"Video with ID {video_id} not found")
             
-            for frame_det in frame_detections:
-                # Tìm license plates cho frame này và gán vào bounding boxes
-                for plate in license_plates_list:
-                    if abs(plate['timestamp'] - frame_det['timestamp']) < 0.5:  # Trong cùng frame
-                        # Tìm bounding box tương ứng (có thể cần matching logic tốt hơn)
-                        for bbox in frame_det['bounding_boxes']:
-                            if bbox.get('track_id') == plate.get('track_id'):
-                                bbox['license_plate'] = plate['plate_number']
-                                break
-                
-                detection = AIDetection(
-                    video_id=video_id,
-                    detection_type=DetectionType.FRAME,
-                    detected_at=detected_at,
-                    frame_timestamp=Decimal(str(frame_det['timestamp'])),
-                    confidence_score=Decimal('0.9'),  # Average confidence
-                    detection_data={
-                        'bounding_boxes': frame_det['bounding_boxes']
-                    }
-                )
-                db.add(detection)
-                saved_counts['total'] += 1
+            self._write_detection_rows(db, rows, write_mode or settings.AI_DETECTION_WRITE_MODE)
             
-            # Save violation detections
-            violations = analysis_results.get('violations', [])
-            for violation in violations:
-                detection = AIDetection(
-                    video_id=video_id,
-                    detection_type=DetectionType.VIOLATION,
-                    detected_at=detected_at,
-                    frame_timestamp=Decimal(str(violation['timestamp'])),
-                    confidence_score=Decimal(str(violation['confidence'])),
-                    detection_data={
-                        'violation_type': violation['violation_type'],
-                        'description': violation['description'],
-                        'bbox': violation['bbox'],
-                        'vehicle_type': violation['vehicle_type']
-                    }
-                )
-                db.add(detection)
-                saved_counts['violations'] += 1
+            if tracks:
+                video.video_metadata = {**(video.video_metadata or {}), 'track_store': tracks}
             
             # Update video record with detection summary
             video.has_violations = saved_counts['violations'] > 0
@@ -616,17 +704,12 @@ class AIDetectionService:
             # Commit all changes
             db.commit()
             
-            saved_counts['total'] = (
-                saved_counts['license_plates'] + 
-                saved_counts['vehicle_counts'] + 
-                saved_counts['violations']
-            )
-            
             logger.info(
                 f"Saved {saved_counts['total']} detections for video {video_id}: "
                 f"{saved_counts['license_plates']} plates, "
                 f"{saved_counts['vehicle_counts']} vehicle counts, "
-                f"{saved_counts['violations']} violations"
+                f"{saved_counts['violations']} violations, "
+                f"{saved_counts['frames']} frames"
             )
             
             return saved_counts
@@ -636,12 +719,259 @@ class AIDetectionService:
             db.rollback()
             raise
     
+    def _build_detection_rows(
+        self,
+        video_id: int,
+        analysis_results: Dict[str, Any],
+        detected_at: datetime
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Turn analysis results into ai_detections column dicts.
+        
+        Returns:
+            Tuple of (rows, saved counts)
+        """
+        from app.models.ai_detection import DetectionType, ReviewStatus
+        
+        rows = []
+        saved_counts = {
+            'license_plates': 0,
+            'vehicle_counts': 0,
+            'violations': 0,
+            'frames': 0,
+            'total': 0
+        }
+        
+        def row(detection_type, timestamp, confidence, data):
+            return {
+                'video_id': video_id,
+                'detection_type': detection_type,
+                'detected_at': detected_at,
+                'frame_timestamp': round(float(timestamp), 3),
+                'confidence_score': round(float(confidence), 4),
+                'detection_data': data,
+                'reviewed': False,
+                'review_status': ReviewStatus.PENDING,
+                'created_at': detected_at,
+                'updated_at': detected_at
+            }
+        
+        # License plate detections
+        license_plates = analysis_results.get('license_plates', [])
+        for plate in license_plates:
+            rows.append(row(DetectionType.LICENSE_PLATE, plate['timestamp'], plate['confidence'], {
+                'plate_number': plate['plate_number'],
+                'vehicle_type': plate['vehicle_type'],
+                'bbox': plate['bbox'],
+                'track_id': plate.get('track_id')
+            }))
+            saved_counts['license_plates'] += 1
+        
+        # Vehicle count detection (single record with all counts)
+        vehicle_counts = analysis_results.get('vehicle_counts', {})
+        if vehicle_counts and sum(vehicle_counts.values()) > 0:
+            # Summary for entire video, count is certain
+            rows.append(row(DetectionType.VEHICLE_COUNT, 0.0, 1.0, vehicle_counts))
+            saved_counts['vehicle_counts'] = 1
+        
+        # Frame detections với bounding boxes go to the track store, not to rows
+        plate_index = self._index_plates_by_track(license_plates)
+        for frame_det in analysis_results.get('frame_detections', []):
+            # Gán biển số cho bounding box cùng track_id trong khoảng thời gian gần nhất
+            if plate_index:
+                for bbox in frame_det['bounding_boxes']:
+                    plate = self._match_plate(plate_index, bbox.get('track_id'), frame_det['timestamp'])
+                    if plate:
+                        bbox['license_plate'] = plate['plate_number']
+            saved_counts['frames'] += 1
+        
+        # Violation detections
+        for violation in analysis_results.get('violations', []):
+            rows.append(row(DetectionType.VIOLATION, violation['timestamp'], violation['confidence'], {
+                'violation_type': violation['violation_type'],
+                'description': violation['description'],
+                'bbox': violation['bbox'],
+                'vehicle_type': violation['vehicle_type']
+            }))
+            saved_counts['violations'] += 1
+        
+        saved_counts['total'] = (
+            saved_counts['license_plates'] +
+            saved_counts['vehicle_counts'] +
+            saved_counts['violations']
+        )
+        
+        return rows, saved_counts
+    
+    def _index_plates_by_track(self, plates: List[Dict]) -> Dict[Tuple[int, int], List[Dict]]:
+        """
+        Index plates by (track_id, timestamp bucket) for frame box matching.
+        
+        Buckets are PLATE_MATCH_WINDOW_SECONDS wide, so every plate within the
+        window of a frame is in the frame's bucket or one of its neighbours.
+        Plates without a track ID cannot be matched and are left out.
+        """
+        index: Dict[Tuple[int, int], List[Dict]] = {}
+        for plate in plates:
+            if plate.get('track_id') is None:
+                continue
+            bucket = int(plate['timestamp'] // PLATE_MATCH_WINDOW_SECONDS)
+            index.setdefault((plate['track_id'], bucket), []).append(plate)
+        return index
+    
+    def _match_plate(
+        self,
+        index: Dict[Tuple[int, int], List[Dict]],
+        track_id: Optional[int],
+        timestamp: float
+    ) -> Optional[Dict]:
+        """Closest plate of the same track within PLATE_MATCH_WINDOW_SECONDS."""
+        if track_id is None:
+            return None
+        
+        bucket = int(timestamp // PLATE_MATCH_WINDOW_SECONDS)
+        best, best_distance = None, PLATE_MATCH_WINDOW_SECONDS
+        for b in (bucket - 1, bucket, bucket + 1):
+            for plate in index.get((track_id, b), ()):
+                distance = abs(plate['timestamp'] - timestamp)
+                if distance < best_distance:
+                    best, best_distance = plate, distance
+        return best
+    
+    def _write_detection_rows(self, db: Session, rows: List[Dict[str, Any]], write_mode: str):
+        """Write ai_detections rows inside the session's transaction (no commit)."""
+        from app.models.ai_detection import AIDetection
+        
+        if not rows:
+            return
+        
+        if write_mode == "copy" and db.get_bind().dialect.driver == "psycopg2":
+            self._copy_detection_rows(db, rows)
+            return
+        
+        if write_mode == "orm":
+            # Unit of work, one AIDetection object per row
+            for values in rows:
+                values = dict(values)
+                values['frame_timestamp'] = Decimal(str(values['frame_timestamp']))
+                values['confidence_score'] = Decimal(str(values['confidence_score']))
+                db.add(AIDetection(**values))
+            db.flush()
+            return
+        
+        # Multi-row INSERT ... VALUES per chunk
+        table = AIDetection.__table__
+        chunk_size = settings.AI_DETECTION_WRITE_CHUNK
+        for i in range(0, len(rows), chunk_size):
+            db.execute(table.insert().values(rows[i:i + chunk_size]))
+    
+    def _copy_detection_rows(self, db: Session, rows: List[Dict[str, Any]]):
+        """Stream rows through COPY ... FROM STDIN (CSV) on the session's connection."""
+        import csv
+        import io
+        
+        columns = list(rows[0].keys())
+        
+        def to_csv(value):
+            if isinstance(value, enum.Enum):
+                # SQLAlchemy Enum columns store member names
+                return value.name
+            if isinstance(value, dict):
+                return json.dumps(value)
+            if isinstance(value, bool):
+                return 't' if value else 'f'
+            if isinstance(value, datetime):
+                return value.isoformat()
+            return value
+        
+        cursor = db.connection().connection.dbapi_connection.cursor()
+        try:
+            chunk_size = settings.AI_DETECTION_WRITE_CHUNK * 10
+            for i in range(0, len(rows), chunk_size):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for values in rows[i:i + chunk_size]:
+                    writer.writerow([to_csv(values[c]) for c in columns])
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY ai_detections ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+        finally:
+            cursor.close()
+    
+    def _video_detections_query(
+        self,
+        db: Session,
+        video_id: int,
+        detection_type: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        t_from: Optional[float] = None,
+        t_to: Optional[float] = None
+    ):
+        """Filtered detections of a video ordered by (frame_timestamp, id)."""
+        from app.models.ai_detection import AIDetection, DetectionType
+        
+        query = db.query(AIDetection).filter(AIDetection.video_id == video_id)
+        
+        # Apply filters
+        if detection_type:
+            try:
+                det_type = DetectionType[detection_type.upper()]
+                query = query.filter(AIDetection.detection_type == det_type)
+            except KeyError:
+                logger.warning(f"Invalid detection type: {detection_type}")
+        
+        if min_confidence is not None:
+            query = query.filter(AIDetection.confidence_score >= min_confidence)
+        
+        # Time window, served by ix_ai_detections_video_type_ts
+        if t_from is not None:
+            query = query.filter(AIDetection.frame_timestamp >= Decimal(str(t_from)))
+        if t_to is not None:
+            query = query.filter(AIDetection.frame_timestamp <= Decimal(str(t_to)))
+        
+        # Order by timestamp, id breaks ties for keyset pagination
+        return query.order_by(AIDetection.frame_timestamp, AIDetection.id)
+    
+    def _detection_to_dict(self, det) -> Dict[str, Any]:
+        return {
+            'id': det.id,
+            'video_id': det.video_id,
+            'detection_type': det.detection_type.value,
+            'timestamp': float(det.frame_timestamp),
+            'confidence': float(det.confidence_score),
+            'data': det.detection_data,
+            'detected_at': det.detected_at.isoformat(),
+            'reviewed': det.reviewed,
+            'review_status': det.review_status.value if det.review_status else None,
+            'violation_id': det.violation_id
+        }
+    
+    @staticmethod
+    def encode_detection_cursor(timestamp, detection_id: int) -> str:
+        return base64.urlsafe_b64encode(f"{timestamp}:{detection_id}".encode()).decode()
+    
+    @staticmethod
+    def decode_detection_cursor(cursor: str) -> Tuple[Decimal, int]:
+        """
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            timestamp, detection_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            return Decimal(timestamp), int(detection_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+    
     def get_video_detections(
         self,
         db: Session,
         video_id: int,
         detection_type: Optional[str] = None,
-        min_confidence: Optional[float] = None
+        min_confidence: Optional[float] = None,
+        t_from: Optional[float] = None,
+        t_to: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve detection results for a video.
@@ -651,45 +981,89 @@ class AIDetectionService:
             video_id: ID of the video
             detection_type: Optional filter by detection type
             min_confidence: Optional minimum confidence threshold
+            t_from: Optional window start (seconds in video)
+            t_to: Optional window end (seconds in video, inclusive)
         
         Returns:
             List of detection records
         """
-        from app.models.ai_detection import AIDetection, DetectionType
+        query = self._video_detections_query(db, video_id, detection_type, min_confidence, t_from, t_to)
+        return [self._detection_to_dict(det) for det in query.all()]
+    
+    def get_video_detections_page(
+        self,
+        db: Session,
+        video_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        detection_type: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        t_from: Optional[float] = None,
+        t_to: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        One keyset page of a video's detections.
         
-        query = db.query(AIDetection).filter(AIDetection.video_id == video_id)
+        Args:
+            db: Database session
+            video_id: ID of the video
+            limit: Page size; None returns every remaining detection
+            cursor: ``next_cursor`` of the previous page
+            detection_type, min_confidence, t_from, t_to: Filters as in get_video_detections
         
-        # Apply filters
-        if detection_type:
-            try:
-                det_type = DetectionType[detection_type.upper()]
-                query = query.filter(AIDetection.detection_type == det_type)
-            except KeyError:
-                logger.warning(f"Invalid detection type: {detection_type}")
+        Returns:
+            Dictionary with detections, total (all detections matching the
+            filters, across pages) and next_cursor (None on the last page)
         
-        if min_confidence is not None:
-            query = query.filter(AIDetection.confidence_score >= min_confidence)
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        from sqlalchemy import tuple_
+        from app.models.ai_detection import AIDetection
         
-        # Order by timestamp
-        query = query.order_by(AIDetection.frame_timestamp)
-        
-        detections = query.all()
-        
-        # Convert to dict format
-        result = []
-        for det in detections:
-            result.append({
-                'id': det.id,
-                'detection_type': det.detection_type.value,
-                'timestamp': float(det.frame_timestamp),
-                'confidence': float(det.confidence_score),
-                'data': det.detection_data,
-                'detected_at': det.detected_at.isoformat(),
-                'reviewed': det.reviewed,
-                'review_status': det.review_status.value if det.review_status else None
-            })
+        query = self._video_detections_query(db, video_id, detection_type, min_confidence, t_from, t_to)
+        total = query.order_by(None).count()
+        if cursor:
+            timestamp, detection_id = self.decode_detection_cursor(cursor)
+            query = query.filter(
+                tuple_(AIDetection.frame_timestamp, AIDetection.id) > tuple_(timestamp, detection_id)
+            )
         
-        return result
+        if limit is None:
+            rows = query.all()
+        else:
+            # One extra row tells whether another page exists
+            rows = query.limit(limit + 1).all()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_detection_cursor(rows[-1].frame_timestamp, rows[-1].id)
+        
+        return {
+            'detections': [self._detection_to_dict(det) for det in rows],
+            'total': total,
+            'next_cursor': next_cursor
+        }
+    
+    def iter_video_detections(
+        self,
+        db: Session,
+        video_id: int,
+        batch_size: int = 500,
+        **filters
+    ):
+        """
+        Yield detection dicts in timestamp order, fetching batch_size rows at a time.
+        
+        Args:
+            db: Database session
+            video_id: ID of the video
+            batch_size: Rows per server-side fetch
+            **filters: detection_type, min_confidence, t_from, t_to
+        """
+        query = self._video_detections_query(db, video_id, **filters)
+        for det in query.yield_per(batch_size):
+            yield self._detection_to_dict(det)
 
 
 # Global instance
@@ -0,0 +1,209 @@
+"""
+Analysis Cache Service for reusing AI results of duplicate uploads.
+
+Camera re-syncs upload the same footage again. Completed analyses are
+recorded under (file_hash, model version, config version); a later upload
+with the same key gets the earlier detections cloned with one
+INSERT ... SELECT instead of a new AI_ANALYSIS job.
+
+The versions are the ones the worker that ran the model reported with its
+result; the API process has no weights to hash. An upload is matched
+against the versions of the most recently recorded analysis, i.e. what the
+workers currently run.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from sqlalchemy import select, insert, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.CameraVideo import CameraVideo, ProcessingStatus
+from app.models.ai_detection import AIDetection, ReviewStatus
+from app.models.analysis_result_cache import AnalysisResultCache
+from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
+from app.services.track_store import track_store
+
+logger = logging.getLogger(__name__)
+
+# Preview entries of video_metadata that describe the content, not the upload.
+# The track store pack is not shared: compaction rewrites and deletes it per video.
+REUSABLE_METADATA_KEYS = ("timeline_sprite", "local_thumbnail")
+
+
+class AnalysisCacheService:
+    """Service for recording and reusing completed analyses."""
+
+    def _reported_key(self, file_hash: Optional[str], analysis_results: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Cache key from the versions reported with an analysis result."""
+        model_version = analysis_results.get('model_version')
+        config_version = analysis_results.get('config_version')
+        if not file_hash or not model_version or not config_version:
+            return None
+        return {'file_hash': file_hash, 'model_version': model_version, 'config_version': config_version}
+
+    def current_versions(self, db: Session) -> Optional[Dict[str, str]]:
+        """Model and config versions of the most recently recorded analysis."""
+        row = db.query(
+            AnalysisResultCache.model_version,
+            AnalysisResultCache.config_version
+        ).order_by(AnalysisResultCache.updated_at.desc()).first()
+        if row is None:
+            return None
+        return {'model_version': row.model_version, 'config_version': row.config_version}
+
+    def record(
+        self,
+        db: Session,
+        video: CameraVideo,
+        saved_counts: Dict[str, int],
+        analysis_results: Dict[str, Any]
+    ) -> bool:
+        """
+        Record a completed analysis of a video; the newest analysis wins.
+
+        Returns:
+            True if an entry was written
+        """
+        key = self._reported_key(video.file_hash, analysis_results)
+        if key is None:
+            return False
+        # A run degraded to meet its deadline must not be cloned into full analyses
+        if (analysis_results.get('budget') or {}).get('degraded'):
+            return False
+
+        summary = {
+            'saved_counts': saved_counts,
+            'processing_time': analysis_results.get('processing_time'),
+            'frame_count': analysis_results.get('frame_count')
+        }
+        now = datetime.utcnow()
+        stmt = pg_insert(AnalysisResultCache).values(
+            **key, source_video_id=video.id, summary=summary, created_at=now, updated_at=now
+        )
+        db.execute(stmt.on_conflict_do_update(
+            constraint="uq_analysis_result_cache_key",
+            set_={'source_video_id': video.id, 'summary': summary, 'updated_at': now}
+        ))
+        db.commit()
+        return True
+
+    def find_reusable(self, db: Session, file_hash: Optional[str]) -> Optional[AnalysisResultCache]:
+        """Find a completed analysis of the same file with the model and config workers run now."""
+        if not file_hash:
+            return None
+        key = self.current_versions(db)
+        if key is None:
+            return None
+
+        return db.query(AnalysisResultCache).join(
+            CameraVideo, CameraVideo.id == AnalysisResultCache.source_video_id
+        ).filter(
+            AnalysisResultCache.file_hash == file_hash,
+            AnalysisResultCache.model_version == key['model_version'],
+            AnalysisResultCache.config_version == key['config_version'],
+            CameraVideo.processing_status == ProcessingStatus.COMPLETED
+        ).first()
+
+    def clone_results(
+        self,
+        db: Session,
+        entry: AnalysisResultCache,
+        video: CameraVideo
+    ) -> VideoProcessingJob:
+        """
+        Copy detections of the cached analysis to a new video.
+
+        Cloned detections start unreviewed and unlinked from violations, and
+        the video gets its own copy of the source's track store pack. The
+        video is marked completed and a COMPLETED AI_ANALYSIS job records
+        where the results came from. Does not commit.
+
+        Args:
+            db: Database session
+            entry: Cache entry returned by find_reusable
+            video: Newly uploaded video (flushed, has an ID)
+
+        Returns:
+            The completed VideoProcessingJob
+        """
+        source = entry.source_video
+        now = datetime.utcnow()
+
+        columns = [
+            AIDetection.video_id,
+            AIDetection.detection_type,
+            AIDetection.detected_at,
+            AIDetection.frame_timestamp,
+            AIDetection.confidence_score,
+            AIDetection.detection_data,
+            AIDetection.reviewed,
+            AIDetection.review_status,
+            AIDetection.created_at,
+            AIDetection.updated_at,
+        ]
+        rows = select(
+            literal(video.id),
+            AIDetection.detection_type,
+            literal(now, AIDetection.detected_at.type),
+            AIDetection.frame_timestamp,
+            AIDetection.confidence_score,
+            AIDetection.detection_data,
+            literal(False),
+            literal(ReviewStatus.PENDING, AIDetection.review_status.type),
+            literal(now, AIDetection.created_at.type),
+            literal(now, AIDetection.updated_at.type),
+        ).where(AIDetection.video_id == source.id)
+        cloned = db.execute(insert(AIDetection).from_select(columns, rows)).rowcount
+
+        video.processing_status = ProcessingStatus.COMPLETED
+        video.processed_at = now
+        video.has_violations = source.has_violations
+        video.violation_count = source.violation_count
+        source_metadata = source.video_metadata or {}
+        video.video_metadata = {
+            **(video.video_metadata or {}),
+            **{k: source_metadata[k] for k in REUSABLE_METADATA_KEYS if k in source_metadata},
+            'reused_analysis_from': source.id
+        }
+        if source_metadata.get('local_thumbnail') and source.thumbnail_url:
+            video.thumbnail_url = source.thumbnail_url
+
+        source_pack = source_metadata.get('track_store')
+        if source_pack:
+            try:
+                pack = track_store.copy(source_pack.get('video_id', source.id), video.id, pack=source_pack)
+            except Exception as e:
+                # Detections are still reused; only the frame boxes are missing
+                pack = None
+                logger.warning(f"Could not copy track store of video {source.id} to video {video.id}: {str(e)}")
+            if pack:
+                video.video_metadata = {**video.video_metadata, 'track_store': pack}
+
+        job = VideoProcessingJob(
+            video_id=video.id,
+            job_type=JobType.AI_ANALYSIS,
+            status=JobStatus.COMPLETED,
+            started_at=now,
+            completed_at=now,
+            retry_count=0,
+            result_data={
+                'reused_from_video_id': source.id,
+                'model_version': entry.model_version,
+                'config_version': entry.config_version,
+                'cloned_detections': cloned,
+                **(entry.summary or {})
+            }
+        )
+        db.add(job)
+        db.flush()
+
+        logger.info(f"Reused analysis of video {source.id} for video {video.id}: {cloned} detections cloned")
+
+        return job
+
+
+# Global instance
+analysis_cache_service = AnalysisCacheService()
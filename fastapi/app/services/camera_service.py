@@ -42,6 +42,7 @@ class CameraService:
             enabled_detections=camera.enabled_detections,
             ai_model_version=camera.ai_model_version,
             confidence_threshold=float(camera.confidence_threshold) if camera.confidence_threshold is not None else None,
+            scheduling_weight=camera.scheduling_weight or 1,
             last_maintenance=camera.last_maintenance,
             next_maintenance=camera.next_maintenance,
             violations_today=int(violations_today or 0),
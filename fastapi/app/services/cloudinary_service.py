@@ -54,6 +54,7 @@ class CloudinaryService:
                 - width: Video width in pixels
                 - height: Video height in pixels
                 - resource_type: "video"
+                - frame_rate, bit_rate, nb_frames, video_codec: stream info (may be None)
                 
         Raises:
             HTTPException: If upload fails
@@ -94,6 +95,10 @@ class CloudinaryService:
                 "height": result.get("height"),
                 "resource_type": result.get("resource_type"),
                 "created_at": result.get("created_at"),
+                "frame_rate": result.get("frame_rate"),
+                "bit_rate": result.get("bit_rate"),
+                "nb_frames": result.get("nb_frames"),
+                "video_codec": (result.get("video") or {}).get("codec"),
             }
             
         except cloudinary.exceptions.Error as e:
@@ -109,6 +114,76 @@ class CloudinaryService:
                 detail=f"Unexpected error during video upload: {str(e)}"
             )
     
+    def upload_asset(
+        self,
+        source: Any,
+        folder: str,
+        resource_type: str = "video",
+        public_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Upload a worker-generated asset (evidence clip, sprite sheet, ...)
+
+        Args:
+            source: Local file path, bytes or file-like object
+            folder: Cloudinary folder path
+            resource_type: "video" or "image"
+            public_id: Optional custom public_id (overwrites an existing asset)
+
+        Returns:
+            Dict containing public_id, secure_url, bytes, format, width, height
+
+        Raises:
+            HTTPException: If upload fails
+        """
+        try:
+            upload_options = {
+                "folder": folder,
+                "resource_type": resource_type,
+                "overwrite": public_id is not None,
+            }
+            if public_id:
+                upload_options["public_id"] = public_id
+
+            result = cloudinary.uploader.upload(source, **upload_options)
+
+            logger.info(f"Asset uploaded successfully: {result.get('public_id')}")
+
+            return {
+                "public_id": result.get("public_id"),
+                "secure_url": result.get("secure_url"),
+                "bytes": result.get("bytes"),
+                "format": result.get("format"),
+                "width": result.get("width"),
+                "height": result.get("height"),
+                "duration": result.get("duration"),
+            }
+
+        except cloudinary.exceptions.Error as e:
+            logger.error(f"Cloudinary asset upload error: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload asset to Cloudinary: {str(e)}"
+            )
+
+    def delete_asset(self, public_id: str, resource_type: str = "image") -> bool:
+        """
+        Delete a worker-generated asset, ignoring assets that do not exist
+
+        Args:
+            public_id: Full Cloudinary public ID (including folder)
+            resource_type: "image", "video" or "raw"
+
+        Returns:
+            True if the asset was deleted
+        """
+        try:
+            result = cloudinary.uploader.destroy(public_id, resource_type=resource_type, invalidate=True)
+            return result.get("result") == "ok"
+        except cloudinary.exceptions.Error as e:
+            logger.error(f"Cloudinary asset deletion error: {str(e)}")
+            return False
+
     def delete_video(self, public_id: str) -> Dict[str, Any]:
         """
         Delete video from Cloudinary
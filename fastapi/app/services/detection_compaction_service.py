@@ -0,0 +1,297 @@
+"""
+Detection Compaction Service for shrinking the detections of old videos.
+
+Two levels, applied by the daily compact_detections_task:
+
+1. Videos older than DETECTION_COMPACT_AFTER_DAYS: frame boxes (track store
+   pack and legacy FRAME rows) are downsampled to DETECTION_COMPACT_FPS and
+   unreviewed plate/violation detections below
+   DETECTION_COMPACT_MIN_CONFIDENCE are dropped.
+2. Videos older than DETECTION_SUMMARIZE_AFTER_DAYS: plates are folded into
+   ``video_metadata['plate_summary']``; only reviewed violations, detections
+   linked to a violation and the vehicle count summary are kept.
+
+Before a track store pack is rewritten or deleted, videos whose reused
+analysis still points at it get their own copy.
+
+Rows are deleted DETECTION_COMPACTION_BATCH at a time with a commit after
+each batch so row locks are short. What was done is recorded in
+``video_metadata['compaction']``. So is a failed attempt: the video is
+skipped until ``retry_after`` (DETECTION_COMPACTION_RETRY_DAYS, doubled per
+failure) and for good after DETECTION_COMPACTION_MAX_FAILURES, so a few
+videos that keep failing do not take the daily batch from the others.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import select, delete, func, or_, and_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.CameraVideo import CameraVideo, ProcessingStatus
+from app.models.ai_detection import AIDetection, DetectionType
+from app.models.analysis_result_cache import AnalysisResultCache
+from app.services.cache_service import cache_service
+from app.services.track_store import track_store
+
+logger = logging.getLogger(__name__)
+
+COMPACT_LEVEL = 1
+SUMMARY_LEVEL = 2
+
+
+class DetectionCompactionService:
+    """Service for downsampling and summarizing detections of old videos."""
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size or settings.DETECTION_COMPACTION_BATCH
+
+    def _delete_in_batches(self, db: Session, *conditions) -> int:
+        """Delete matching ai_detections rows in short transactions."""
+        ids = select(AIDetection.id).where(*conditions).limit(self.batch_size).scalar_subquery()
+        statement = delete(AIDetection).where(AIDetection.id.in_(ids)).execution_options(
+            synchronize_session=False
+        )
+
+        total = 0
+        while True:
+            deleted = db.execute(statement).rowcount
+            db.commit()
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+
+    def _videos_due(self, db: Session, level: int, older_than_days: int, limit: int) -> List[CameraVideo]:
+        now = datetime.utcnow()
+        cutoff = now - timedelta(days=older_than_days)
+        compaction = CameraVideo.video_metadata['compaction']
+        current_level = func.coalesce(compaction['level'].as_integer(), 0)
+        failures = func.coalesce(compaction['failures'].as_integer(), 0)
+        # ISO timestamps of the same format compare as strings
+        retry_after = compaction['retry_after'].astext
+        return db.query(CameraVideo).filter(
+            CameraVideo.processing_status == ProcessingStatus.COMPLETED,
+            CameraVideo.created_at < cutoff,
+            current_level < level,
+            failures < settings.DETECTION_COMPACTION_MAX_FAILURES,
+            or_(retry_after.is_(None), retry_after <= now.isoformat())
+        ).order_by(CameraVideo.created_at).limit(limit).all()
+
+    def _detach_pack_references(self, db: Session, video: CameraVideo) -> int:
+        """
+        Give videos that still read this video's pack their own copy.
+
+        Reused analyses used to point at the source video's pack instead of
+        copying it; it must not be rewritten or deleted under them.
+
+        Returns:
+            Number of videos detached
+        """
+        pack = (video.video_metadata or {}).get('track_store')
+        if not pack:
+            return 0
+
+        referencing = db.query(CameraVideo).filter(
+            CameraVideo.id != video.id,
+            CameraVideo.video_metadata['track_store']['video_id'].as_integer() == video.id
+        ).all()
+        for other in referencing:
+            copy = track_store.copy(video.id, other.id, pack=pack)
+            metadata = dict(other.video_metadata or {})
+            if copy:
+                metadata['track_store'] = copy
+            else:
+                metadata.pop('track_store', None)
+            other.video_metadata = metadata
+            db.commit()
+            cache_service.invalidate_video_metadata(other.id)
+        return len(referencing)
+
+    def _owns_pack(self, video: CameraVideo, pack: Dict[str, Any]) -> bool:
+        return pack.get('video_id', video.id) == video.id
+
+    def _downsample_frames(self, db: Session, video: CameraVideo, fps: float) -> Dict[str, Any]:
+        """Downsample the track store pack and legacy FRAME rows of one video."""
+        stats = {'track_frames_before': None, 'track_frames_after': None, 'frame_rows_deleted': 0}
+
+        pack = (video.video_metadata or {}).get('track_store')
+        # A pack borrowed from another video is left to that video's compaction
+        if pack and self._owns_pack(video, pack):
+            stats['pack_references_detached'] = self._detach_pack_references(db, video)
+            stats['track_frames_before'] = pack.get('frames')
+            summary = track_store.downsample(video.id, fps, pack=pack)
+            if summary:
+                video.video_metadata = {**(video.video_metadata or {}), 'track_store': summary}
+                db.commit()
+                pack = summary
+            stats['track_frames_after'] = pack.get('frames')
+        elif pack:
+            stats['track_frames_before'] = stats['track_frames_after'] = pack.get('frames')
+
+        # Analyses from before the track store kept one FRAME row per sampled frame
+        bucket = func.floor(AIDetection.frame_timestamp * fps)
+        keep = select(func.min(AIDetection.id)).where(
+            AIDetection.video_id == video.id,
+            AIDetection.detection_type == DetectionType.FRAME
+        ).group_by(bucket)
+        stats['frame_rows_deleted'] = self._delete_in_batches(
+            db,
+            AIDetection.video_id == video.id,
+            AIDetection.detection_type == DetectionType.FRAME,
+            AIDetection.id.not_in(keep)
+        )
+        return stats
+
+    def _summarize_plates(self, db: Session, video_id: int) -> List[Dict[str, Any]]:
+        plate_number = AIDetection.detection_data['plate_number'].astext
+        rows = db.query(
+            plate_number,
+            func.min(AIDetection.detection_data['vehicle_type'].astext),
+            func.min(AIDetection.frame_timestamp),
+            func.max(AIDetection.frame_timestamp),
+            func.count(AIDetection.id),
+            func.max(AIDetection.confidence_score)
+        ).filter(
+            AIDetection.video_id == video_id,
+            AIDetection.detection_type == DetectionType.LICENSE_PLATE
+        ).group_by(plate_number).order_by(func.min(AIDetection.frame_timestamp)).all()
+
+        return [
+            {
+                'plate_number': plate,
+                'vehicle_type': vehicle_type,
+                'first_seen': float(first_seen),
+                'last_seen': float(last_seen),
+                'detections': count,
+                'max_confidence': float(max_confidence)
+            }
+            for plate, vehicle_type, first_seen, last_seen, count, max_confidence in rows
+        ]
+
+    def compact_video(self, db: Session, video: CameraVideo) -> Dict[str, Any]:
+        """
+        Level 1: downsample frame boxes and drop unreviewed low-confidence detections.
+
+        Returns:
+            Dictionary describing what was removed
+        """
+        stats = self._downsample_frames(db, video, settings.DETECTION_COMPACT_FPS)
+        stats['low_confidence_deleted'] = self._delete_in_batches(
+            db,
+            AIDetection.video_id == video.id,
+            AIDetection.detection_type.in_([DetectionType.LICENSE_PLATE, DetectionType.VIOLATION]),
+            AIDetection.confidence_score < settings.DETECTION_COMPACT_MIN_CONFIDENCE,
+            or_(AIDetection.reviewed.is_(False), AIDetection.reviewed.is_(None)),
+            AIDetection.violation_id.is_(None)
+        )
+        return stats
+
+    def summarize_video(self, db: Session, video: CameraVideo) -> Dict[str, Any]:
+        """
+        Level 2: keep reviewed violations and plate summaries only.
+
+        Returns:
+            Dictionary describing what was removed
+        """
+        plates = self._summarize_plates(db, video.id)
+        video.video_metadata = {**(video.video_metadata or {}), 'plate_summary': plates}
+        db.commit()
+
+        keep = or_(
+            AIDetection.violation_id.isnot(None),
+            AIDetection.detection_type == DetectionType.VEHICLE_COUNT,
+            and_(AIDetection.detection_type == DetectionType.VIOLATION, AIDetection.reviewed.is_(True))
+        )
+        stats = {
+            'plates_summarized': len(plates),
+            'detections_deleted': self._delete_in_batches(db, AIDetection.video_id == video.id, ~keep)
+        }
+
+        pack = (video.video_metadata or {}).get('track_store')
+        if pack:
+            if self._owns_pack(video, pack):
+                stats['pack_references_detached'] = self._detach_pack_references(db, video)
+                track_store.delete(video.id, remote=settings.TRACK_STORE_UPLOAD)
+                stats['track_store_deleted'] = True
+            metadata = dict(video.video_metadata or {})
+            metadata.pop('track_store', None)
+            video.video_metadata = metadata
+            db.commit()
+        return stats
+
+    def _record(self, db: Session, video: CameraVideo, level: int, stats: Dict[str, Any]):
+        metadata = dict(video.video_metadata or {})
+        compaction = dict(metadata.get('compaction') or {})
+        history = list(compaction.get('history') or [])
+        history.append({'level': level, 'at': datetime.utcnow().isoformat(), **stats})
+        metadata['compaction'] = {'level': level, 'compacted_at': history[-1]['at'], 'history': history}
+
+        # Reassign so the JSONB change is picked up by the session
+        video.video_metadata = metadata
+        # Duplicate uploads must not be cloned from reduced results
+        db.query(AnalysisResultCache).filter(
+            AnalysisResultCache.source_video_id == video.id
+        ).delete(synchronize_session=False)
+        db.commit()
+        cache_service.invalidate_video_metadata(video.id)
+
+    def _record_failure(self, db: Session, video: CameraVideo, level: int, error: Exception):
+        """Count a failed attempt and back the video off; the level is left as it was."""
+        try:
+            metadata = dict(video.video_metadata or {})
+            compaction = dict(metadata.get('compaction') or {})
+            failures = int(compaction.get('failures') or 0) + 1
+            now = datetime.utcnow()
+            backoff = timedelta(days=settings.DETECTION_COMPACTION_RETRY_DAYS * 2 ** (failures - 1))
+            compaction.update(
+                failures=failures,
+                retry_after=(now + backoff).isoformat(),
+                last_error={'level': level, 'at': now.isoformat(), 'error': str(error)[:500]}
+            )
+            metadata['compaction'] = compaction
+            # Reassign so the JSONB change is picked up by the session
+            video.video_metadata = metadata
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not record failed compaction of video {video.id}: {str(e)}")
+
+    def run(self, db: Session, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compact up to ``limit`` videos, oldest first, summary level first.
+
+        Returns:
+            Dictionary with per-video results
+        """
+        limit = limit or settings.DETECTION_COMPACTION_VIDEO_LIMIT
+        results = []
+
+        for level, days, handler in (
+            (SUMMARY_LEVEL, settings.DETECTION_SUMMARIZE_AFTER_DAYS, self.summarize_video),
+            (COMPACT_LEVEL, settings.DETECTION_COMPACT_AFTER_DAYS, self.compact_video),
+        ):
+            if days <= 0 or len(results) >= limit:
+                continue
+            for video in self._videos_due(db, level, days, limit - len(results)):
+                try:
+                    stats = handler(db, video)
+                    self._record(db, video, level, stats)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error compacting detections of video {video.id}: {str(e)}", exc_info=True)
+                    self._record_failure(db, video, level, e)
+                    results.append({'video_id': video.id, 'level': level, 'error': str(e)})
+                    continue
+                results.append({'video_id': video.id, 'level': level, **stats})
+
+        if results:
+            cache_service.invalidate_all_detections()
+            logger.info(f"Compacted detections of {len(results)} videos")
+
+        return {'videos': len(results), 'results': results}
+
+
+# Global instance
+detection_compaction_service = DetectionCompactionService()
@@ -0,0 +1,446 @@
+"""
+Evidence Clip Service for cutting short clips around AI-detected violations.
+
+Clips are cut with keyframe-aligned stream copy. When the previous keyframe
+is too far before a clip window, only the partial GOP between the window
+start and the next keyframe is re-encoded and concatenated with the copied
+remainder. All clips of a video are copied out in a single ffmpeg pass over
+the file instead of one decode per violation.
+
+A head segment only joins cleanly with the copied body when both share
+profile, level, pixel format, size and timebase, so the head is encoded
+with the parameters of the source stream and checked against the body.
+When they cannot be matched (e.g. a High 10 source, which x264 cannot
+reproduce 8-bit) the whole clip window is re-encoded instead.
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import subprocess
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.worker_runtime import worker_runtime
+from app.services.cloudinary_service import cloudinary_service
+
+logger = logging.getLogger(__name__)
+
+# Codecs we can re-encode a head segment for and still concat with stream copy
+SMART_CUT_CODECS = {"h264"}
+
+# ffprobe H.264 profiles x264 can encode, by x264 profile name
+X264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+}
+X264_PIX_FMTS = {"yuv420p", "yuvj420p"}
+
+# Stream parameters a head segment and the copied body must share to be concatenated
+CONCAT_PARAMS = ("codec_name", "profile", "level", "pix_fmt", "width", "height", "time_base")
+
+
+@dataclass
+class ClipPlan:
+    """One output clip covering one or more violation timestamps."""
+    start: float
+    end: float
+    timestamps: List[float] = field(default_factory=list)
+    # Keyframe where stream copy begins (None: the whole window is re-encoded)
+    copy_start: Optional[float] = None
+    # End of the re-encoded head segment [start, head_end) (None: no re-encode)
+    head_end: Optional[float] = None
+    url: Optional[str] = None
+
+    def contains(self, timestamp: float) -> bool:
+        return self.start <= timestamp <= self.end
+
+
+class EvidenceClipService:
+    """Service for extracting evidence clips from analyzed videos."""
+
+    def __init__(self):
+        self.padding = settings.EVIDENCE_CLIP_PADDING_SECONDS
+        self.keyframe_tolerance = settings.EVIDENCE_CLIP_KEYFRAME_TOLERANCE_SECONDS
+        self.ffmpeg = settings.FFMPEG_BINARY
+        self.ffprobe = settings.FFPROBE_BINARY
+        self.command_timeout = 600
+
+    def is_available(self) -> bool:
+        """Check that ffmpeg and ffprobe are installed."""
+        return shutil.which(self.ffmpeg) is not None and shutil.which(self.ffprobe) is not None
+
+    def _run(self, cmd: List[str]) -> str:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.command_timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"{os.path.basename(cmd[0])} failed: {result.stderr.strip()[-500:]}")
+        return result.stdout
+
+    def _download(self, url: str, workdir: str) -> str:
+        """Download the source video once; every later step reads the local copy."""
+        if os.path.exists(url):
+            return url
+
+        path = os.path.join(workdir, "source.mp4")
+        with worker_runtime.http.get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+        return path
+
+    def probe_stream(self, source: str) -> Tuple[Optional[str], List[float]]:
+        """
+        Read the video codec and keyframe timestamps from packet headers.
+
+        Only packets are demuxed, no frame is decoded.
+
+        Returns:
+            Tuple of (codec name, sorted keyframe timestamps in seconds)
+        """
+        output = self._run([
+            self.ffprobe, "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=codec_name:packet=pts_time,flags",
+            "-of", "csv",
+            source
+        ])
+
+        codec = None
+        keyframes = []
+        for line in output.splitlines():
+            parts = line.strip().split(",")
+            if parts[0] == "stream" and len(parts) >= 2:
+                codec = parts[1]
+            elif parts[0] == "packet" and len(parts) >= 3 and "K" in parts[2]:
+                try:
+                    keyframes.append(float(parts[1]))
+                except ValueError:
+                    continue
+
+        keyframes.sort()
+        return codec, keyframes
+
+    def probe_encoding(self, source: str) -> Dict[str, Any]:
+        """Encoding parameters of the first video stream, read from the container header."""
+        output = self._run([
+            self.ffprobe, "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=" + ",".join(CONCAT_PARAMS),
+            "-of", "json",
+            source
+        ])
+        streams = json.loads(output or "{}").get("streams") or [{}]
+        params = streams[0]
+        # x264 writes "Constrained Baseline" for a "Baseline" request, both concat the same
+        if params.get("profile") in X264_PROFILES:
+            params["profile"] = X264_PROFILES[params["profile"]]
+        return params
+
+    def head_encoder_args(self, params: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        libx264 arguments reproducing the source stream's parameters.
+
+        Returns:
+            Arguments, or None if x264 cannot match the source (no smart cut)
+        """
+        profile = params.get("profile")
+        pix_fmt = params.get("pix_fmt")
+        time_base = str(params.get("time_base") or "")
+        if (
+            params.get("codec_name") != "h264"
+            or profile not in X264_PROFILES.values()
+            or pix_fmt not in X264_PIX_FMTS
+            or not time_base.startswith("1/")
+        ):
+            return None
+
+        args = [
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+            "-profile:v", profile, "-pix_fmt", pix_fmt,
+            "-video_track_timescale", time_base[2:],
+            # Keep source timestamps so the head ends where the copied body starts
+            "-vsync", "passthrough"
+        ]
+        level = params.get("level")
+        if isinstance(level, int) and level > 0:
+            args += ["-level:v", f"{level / 10:.1f}"]
+        return args
+
+    def _concat_mismatch(self, head: str, body: str) -> List[str]:
+        """Parameters that differ between a head segment and its copied body."""
+        head_params, body_params = self.probe_encoding(head), self.probe_encoding(body)
+        return [key for key in CONCAT_PARAMS if head_params.get(key) != body_params.get(key)]
+
+    def plan_clips(
+        self,
+        timestamps: List[float],
+        keyframes: List[float],
+        smart_cut: bool = True,
+        split_heads: bool = True
+    ) -> List[ClipPlan]:
+        """
+        Merge overlapping violation windows and decide how to cut each one.
+
+        Args:
+            timestamps: Violation timestamps in seconds
+            keyframes: Sorted keyframe timestamps of the source
+            smart_cut: Whether the head partial GOP may be re-encoded
+            split_heads: Whether a re-encoded head can be joined to a copied body;
+                if not, windows needing a head are re-encoded whole
+
+        Returns:
+            List of clip plans ordered by start time
+        """
+        plans: List[ClipPlan] = []
+        for ts in sorted(timestamps):
+            start, end = max(0.0, ts - self.padding), ts + self.padding
+            if plans and start <= plans[-1].end:
+                plans[-1].end = max(plans[-1].end, end)
+                plans[-1].timestamps.append(ts)
+            else:
+                plans.append(ClipPlan(start=start, end=end, timestamps=[ts]))
+
+        for plan in plans:
+            i = bisect_right(keyframes, plan.start) - 1
+            prev_keyframe = keyframes[i] if i >= 0 else 0.0
+
+            if not smart_cut or plan.start - prev_keyframe <= self.keyframe_tolerance:
+                # Start slightly early at the keyframe, no re-encode needed
+                plan.copy_start = prev_keyframe
+                continue
+
+            j = bisect_left(keyframes, plan.start)
+            next_keyframe = keyframes[j] if j < len(keyframes) else None
+            if split_heads and next_keyframe is not None and next_keyframe < plan.end:
+                plan.copy_start = next_keyframe
+                plan.head_end = next_keyframe
+            else:
+                # The window lies inside one GOP: re-encode all of it
+                plan.copy_start = None
+                plan.head_end = plan.end
+
+        return plans
+
+    def _encode(self, source: str, start: float, end: float, path: str, encoder_args: List[str]):
+        self._run([
+            self.ffmpeg, "-hide_banner", "-v", "error", "-y",
+            "-ss", f"{start:.3f}", "-i", source,
+            "-t", f"{end - start:.3f}",
+            "-map", "0:v:0", *encoder_args,
+            path
+        ])
+
+    def extract(
+        self,
+        source: str,
+        plans: List[ClipPlan],
+        workdir: str,
+        encoder_args: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Produce one clip file per plan.
+
+        Stream-copied bodies of all clips are written by a single ffmpeg
+        invocation; only head segments are decoded, each from its own GOP.
+        A head whose parameters do not match its body is discarded and the
+        whole window re-encoded.
+
+        Args:
+            encoder_args: Encoder arguments matching the source (see head_encoder_args)
+        """
+        full_args = encoder_args or [
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p"
+        ]
+        copy_cmd = [self.ffmpeg, "-hide_banner", "-v", "error", "-y", "-i", source]
+        bodies: Dict[int, str] = {}
+        for idx, plan in enumerate(plans):
+            if plan.copy_start is None:
+                continue
+            body = os.path.join(workdir, f"body_{idx}.mp4")
+            copy_cmd += [
+                "-map", "0:v:0", "-c", "copy",
+                "-ss", f"{plan.copy_start:.3f}",
+                "-t", f"{plan.end - plan.copy_start:.3f}",
+                "-avoid_negative_ts", "make_zero",
+                body
+            ]
+            bodies[idx] = body
+
+        if bodies:
+            self._run(copy_cmd)
+
+        clips = []
+        for idx, plan in enumerate(plans):
+            parts = []
+            if plan.head_end is not None:
+                head = os.path.join(workdir, f"head_{idx}.mp4")
+                self._encode(source, plan.start, plan.head_end, head, full_args)
+                parts.append(head)
+            if idx in bodies:
+                parts.append(bodies[idx])
+
+            if len(parts) == 2:
+                mismatch = self._concat_mismatch(*parts)
+                if mismatch:
+                    logger.warning(f"Head of clip {idx} differs from the source in {mismatch}, re-encoding the clip")
+                    clip = os.path.join(workdir, f"clip_{idx}.mp4")
+                    self._encode(source, plan.start, plan.end, clip, full_args)
+                    plan.copy_start, plan.head_end = None, plan.end
+                    clips.append(clip)
+                    continue
+
+            if len(parts) == 1:
+                clips.append(parts[0])
+                continue
+
+            list_path = os.path.join(workdir, f"concat_{idx}.txt")
+            with open(list_path, "w") as f:
+                for part in parts:
+                    f.write(f"file '{part}'\n")
+            clip = os.path.join(workdir, f"clip_{idx}.mp4")
+            self._run([
+                self.ffmpeg, "-hide_banner", "-v", "error", "-y",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-c", "copy", clip
+            ])
+            clips.append(clip)
+
+        return clips
+
+    def extract_clips_for_video(self, db: Session, video_id: int) -> Dict[str, Any]:
+        """
+        Cut evidence clips for every violation detection of a video.
+
+        Each detection gets ``detection_data['evidence_clip']``; detections that
+        already have a violation get the clip attached to it as well.
+
+        Args:
+            db: Database session
+            video_id: ID of the analyzed video
+
+        Returns:
+            Dictionary with counts of clips and updated detections
+        """
+        from app.models.CameraVideo import CameraVideo
+        from app.models.ai_detection import AIDetection, DetectionType
+        from app.models.violation import Violation
+
+        video = db.query(CameraVideo).filter(CameraVideo.id == video_id).first()
+        if not video:
+            raise ValueError(f"Video with ID {video_id} not found")
+
+        detections = db.query(AIDetection).filter(
+            AIDetection.video_id == video_id,
+            AIDetection.detection_type == DetectionType.VIOLATION
+        ).order_by(AIDetection.frame_timestamp).all()
+
+        if not detections:
+            return {'video_id': video_id, 'clips': 0, 'detections': 0}
+
+        if not self.is_available():
+            raise RuntimeError("ffmpeg/ffprobe not found, cannot extract evidence clips")
+
+        with tempfile.TemporaryDirectory(prefix=f"evidence_{video_id}_") as workdir:
+            source = self._download(video.cloudinary_url, workdir)
+            codec, keyframes = self.probe_stream(source)
+            smart_cut = codec in SMART_CUT_CODECS
+            encoder_args = self.head_encoder_args(self.probe_encoding(source)) if smart_cut else None
+            plans = self.plan_clips(
+                [float(d.frame_timestamp) for d in detections],
+                keyframes,
+                smart_cut=smart_cut,
+                split_heads=encoder_args is not None
+            )
+            clip_paths = self.extract(source, plans, workdir, encoder_args=encoder_args)
+
+            for plan, path in zip(plans, clip_paths):
+                upload = cloudinary_service.upload_asset(
+                    path,
+                    folder=f"traffic_evidence/video_{video_id}",
+                    resource_type="video",
+                    public_id=f"clip_{int(plan.start * 1000)}_{int(plan.end * 1000)}"
+                )
+                plan.url = upload["secure_url"]
+
+        violation_ids = {d.violation_id for d in detections if d.violation_id}
+        violations = {
+            violation.id: violation
+            for violation in db.query(Violation).filter(Violation.id.in_(violation_ids)).all()
+        } if violation_ids else {}
+
+        plan_starts = [plan.start for plan in plans]
+        updated = 0
+        for detection in detections:
+            ts = float(detection.frame_timestamp)
+            i = bisect_right(plan_starts, ts) - 1
+            if i < 0 or not plans[i].contains(ts):
+                continue
+
+            plan = plans[i]
+            clip = {'url': plan.url, 'start': round(plan.start, 3), 'end': round(plan.end, 3)}
+            # Reassign so the JSONB change is picked up by the session
+            detection.detection_data = {**(detection.detection_data or {}), 'evidence_clip': clip}
+            updated += 1
+
+            violation = violations.get(detection.violation_id)
+            if violation:
+                self.attach_clip_to_violation(db, violation, detection.detection_data)
+
+        db.commit()
+
+        logger.info(f"Extracted {len(plans)} evidence clips for video {video_id} ({updated} detections)")
+
+        return {
+            'video_id': video_id,
+            'clips': len(plans),
+            'detections': updated,
+            're_encoded_heads': sum(1 for plan in plans if plan.head_end is not None)
+        }
+
+    def attach_clip_to_violation(self, db: Session, violation, detection_data: Optional[Dict[str, Any]]) -> bool:
+        """
+        Link a detection's evidence clip to a violation.
+
+        Sets ``Violation.evidence_gif`` if empty and adds an ``Evidence`` row
+        with the clip as ``video_url``. Does not commit.
+
+        Returns:
+            True if a clip was attached
+        """
+        from app.models.evidence import Evidence
+
+        clip = (detection_data or {}).get('evidence_clip')
+        if not clip or not clip.get('url'):
+            return False
+
+        if not violation.evidence_gif:
+            violation.evidence_gif = clip['url']
+
+        if violation.id is not None:
+            exists = db.query(Evidence.id).filter(
+                Evidence.violation_id == violation.id,
+                Evidence.video_url == clip['url']
+            ).first()
+            if exists:
+                return True
+
+        db.add(Evidence(
+            violation=violation,
+            video_url=clip['url'],
+            processed_data={'clip_start': clip.get('start'), 'clip_end': clip.get('end')},
+            storage_location="cloudinary"
+        ))
+        return True
+
+
+# Global instance
+evidence_clip_service = EvidenceClipService()
@@ -0,0 +1,168 @@
+"""
+Job Cost Service for estimating the analysis time of a video before it runs.
+
+The estimate is linear in two features of the probed media
+(``video_metadata['media']``):
+
+    decode     = frames * width * height / 1e6   (every frame is decoded)
+    inference  = frames / sample_every           (two frames per second are analyzed)
+
+    cost_seconds = c_decode * decode + c_inference * inference + c_overhead
+
+The coefficients are fitted by least squares against the
+``processing_time`` that completed AI_ANALYSIS jobs recorded in
+``result_data`` and refreshed every JOB_COST_MODEL_REFRESH_SECONDS. With
+too few samples the defaults below are used.
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.CameraVideo import CameraVideo
+from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# (c_decode, c_inference, c_overhead): seconds per decoded megapixel-frame,
+# per analyzed frame, and per job
+DEFAULT_COEFFICIENTS = (0.0015, 0.06, 5.0)
+MIN_CALIBRATION_SAMPLES = 20
+
+
+def cost_features(media: Optional[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+    """(decode, inference) features of probed media, or None if duration/fps are unknown."""
+    if not media or not media.get('duration'):
+        return None
+
+    fps = media.get('fps') or 30.0
+    frames = media.get('frames') or media['duration'] * fps
+    megapixels = (media.get('width') or 1280) * (media.get('height') or 720) / 1e6
+    # Same sampling as AIDetectionService._analyze_video_internal
+    sample_every = max(1, int(fps) // 2)
+    return frames * megapixels, frames / sample_every
+
+
+class JobCostService:
+    """Estimates analysis cost of videos from their probed media metadata."""
+
+    def __init__(self):
+        self.coefficients = DEFAULT_COEFFICIENTS
+        self.samples = 0
+        self.calibrated_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def calibrate(self, db: Session) -> Dict[str, Any]:
+        """
+        Refit the coefficients from recent completed analyses.
+
+        Returns:
+            Dictionary with the coefficients and the number of samples used
+        """
+        since = datetime.utcnow() - timedelta(days=settings.JOB_COST_CALIBRATION_DAYS)
+        analysis = VideoProcessingJob.result_data['analysis_results']
+        processing_time = analysis['processing_time'].as_float()
+        # Runs degraded to meet their deadline analyzed fewer frames than the features assume
+        degraded = func.coalesce(analysis['budget']['degraded'].as_boolean(), False)
+
+        rows = db.query(processing_time, CameraVideo.video_metadata['media']).join(
+            CameraVideo, CameraVideo.id == VideoProcessingJob.video_id
+        ).filter(
+            VideoProcessingJob.job_type == JobType.AI_ANALYSIS,
+            VideoProcessingJob.status == JobStatus.COMPLETED,
+            VideoProcessingJob.completed_at >= since,
+            processing_time.isnot(None),
+            degraded.is_(False),
+            CameraVideo.video_metadata['media'].isnot(None)
+        ).order_by(
+            VideoProcessingJob.completed_at.desc()
+        ).limit(settings.JOB_COST_CALIBRATION_SAMPLES).all()
+
+        features, targets = [], []
+        for seconds, media in rows:
+            values = cost_features(media)
+            if values is None or seconds is None:
+                continue
+            features.append((*values, 1.0))
+            targets.append(float(seconds))
+
+        coefficients = DEFAULT_COEFFICIENTS
+        if len(targets) >= MIN_CALIBRATION_SAMPLES:
+            fitted, *_ = np.linalg.lstsq(np.asarray(features), np.asarray(targets), rcond=None)
+            # A negative rate is noise from collinear features, not a speed-up
+            coefficients = tuple(float(max(c, 0.0)) for c in fitted)
+
+        with self._lock:
+            self.coefficients = coefficients
+            self.samples = len(targets)
+            self.calibrated_at = time.monotonic()
+
+        logger.info(f"Job cost model calibrated on {len(targets)} jobs: {coefficients}")
+
+        return {'coefficients': list(coefficients), 'samples': len(targets)}
+
+    def _ensure_calibrated(self):
+        stale = (
+            self.calibrated_at is None
+            or time.monotonic() - self.calibrated_at > settings.JOB_COST_MODEL_REFRESH_SECONDS
+        )
+        if not stale:
+            return
+
+        # Own session: callers are often mid-transaction (upload) and must not be rolled back
+        from app.core.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.calibrate(db)
+        except Exception as e:
+            # Keep the previous coefficients, retry after the refresh interval
+            logger.error(f"Job cost calibration failed: {e}")
+            self.calibrated_at = time.monotonic()
+        finally:
+            db.close()
+
+    def estimate(self, media: Optional[Dict[str, Any]]) -> Optional[float]:
+        """
+        Estimated analysis time in seconds for probed media.
+
+        Returns:
+            Seconds, or None if the media is unknown
+        """
+        values = cost_features(media)
+        if values is None:
+            return None
+
+        self._ensure_calibrated()
+        c_decode, c_inference, c_overhead = self.coefficients
+        decode, inference = values
+        return round(c_decode * decode + c_inference * inference + c_overhead, 1)
+
+    def estimate_video(self, video: CameraVideo) -> Optional[float]:
+        return self.estimate((video.video_metadata or {}).get('media'))
+
+    def is_heavy(self, estimated_cost_seconds: Optional[float]) -> bool:
+        """Whether a job belongs on the heavy queue (never when JOB_HEAVY_COST_SECONDS is 0)."""
+        return (
+            settings.JOB_HEAVY_COST_SECONDS > 0
+            and estimated_cost_seconds is not None
+            and estimated_cost_seconds > settings.JOB_HEAVY_COST_SECONDS
+        )
+
+    def time_limit(self, estimated_cost_seconds: Optional[float]) -> float:
+        """Soft time limit of the queue a job with this estimate is routed to."""
+        if self.is_heavy(estimated_cost_seconds):
+            return settings.JOB_HEAVY_TIME_LIMIT_SECONDS
+        from app.core.celery_config import celery_app
+        return celery_app.conf.task_soft_time_limit
+
+
+# Global instance
+job_cost_service = JobCostService()
@@ -0,0 +1,87 @@
+"""
+Retry policy for video processing jobs.
+
+A failed attempt is classified before it is retried:
+
+- ``permanent``: retrying cannot help. Only errors raised as
+  PermanentJobError (missing video or job, unsupported job type) and 4xx
+  responses of remote services count; the job fails at once. Anything
+  else, including ValueError from a malformed remote response and bugs,
+  is retried and fails only after the last attempt.
+- ``timeout``: the analysis ran out of time; retried (the next attempt runs
+  with a deadline-aware budget, see app.ai.analysis_budget).
+- ``lease_expired``: the worker died or stopped heartbeating; retried.
+- ``transient``: everything else (network, Cloudinary, database); retried.
+
+Retries are spread out with jittered exponential backoff: attempt n waits
+``min(JOB_RETRY_BASE_SECONDS * 2^(n-1), JOB_RETRY_MAX_SECONDS)`` seconds,
+reduced by a random fraction of up to JOB_RETRY_JITTER, so a burst of
+failures (e.g. Cloudinary down for a minute) does not come back as a burst.
+"""
+
+import random
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+
+PERMANENT = "permanent"
+TIMEOUT = "timeout"
+LEASE_EXPIRED = "lease_expired"
+TRANSIENT = "transient"
+
+RETRYABLE_ERROR_CLASSES = (TIMEOUT, LEASE_EXPIRED, TRANSIENT)
+
+
+class PermanentJobError(ValueError):
+    """Input that will be just as wrong on the next attempt (e.g. the video was deleted)."""
+
+
+# 4xx statuses that are still worth retrying
+RETRYABLE_HTTP_STATUSES = {408, 409, 425, 429}
+
+
+def _http_status(error: BaseException) -> Optional[int]:
+    """Status code of requests.HTTPError and fastapi.HTTPException alike."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+class JobRetryPolicy:
+    """Classifies job errors and schedules retries."""
+
+    def classify(self, error: Optional[BaseException]) -> str:
+        if error is None:
+            return TRANSIENT
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+            return TIMEOUT
+
+        status = _http_status(error)
+        if status is not None:
+            if 400 <= status < 500 and status not in RETRYABLE_HTTP_STATUSES:
+                return PERMANENT
+            return TRANSIENT
+
+        if isinstance(error, PermanentJobError):
+            return PERMANENT
+        return TRANSIENT
+
+    def is_retryable(self, error_class: Optional[str]) -> bool:
+        return error_class is None or error_class in RETRYABLE_ERROR_CLASSES
+
+    def backoff_seconds(self, attempt: int) -> float:
+        """Jittered delay before retry number ``attempt`` (1-based)."""
+        delay = min(
+            settings.JOB_RETRY_BASE_SECONDS * 2 ** max(attempt - 1, 0),
+            settings.JOB_RETRY_MAX_SECONDS
+        )
+        return delay * (1 - random.uniform(0, settings.JOB_RETRY_JITTER))
+
+    def next_run_at(self, attempt: int, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.utcnow()) + timedelta(seconds=self.backoff_seconds(attempt))
+
+
+# Global instance
+job_retry_policy = JobRetryPolicy()
@@ -0,0 +1,169 @@
+"""
+Media Probe Service for reading video stream parameters at upload.
+
+ffprobe only reads the container header and stream headers, no frame is
+decoded, so probing a 1-hour video costs about as much as a 20-second clip.
+The result is stored in ``CameraVideo.video_metadata['media']`` and feeds
+the job cost model (app.services.job_cost_service).
+"""
+
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+import subprocess
+from fractions import Fraction
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Linux exposes open descriptors as paths; elsewhere uploads go through a temp file
+PROC_FD_AVAILABLE = sys.platform.startswith("linux") and os.path.isdir("/proc/self/fd")
+
+
+def _parse_rate(value: Optional[str]) -> Optional[float]:
+    """ffprobe frame rates are fractions like "30000/1001"; "0/0" means unknown."""
+    try:
+        rate = float(Fraction(value))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return rate if rate > 0 else None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MediaProbeService:
+    """Service for probing duration, fps, resolution and codec of videos."""
+
+    def __init__(self):
+        self.ffprobe = settings.FFPROBE_BINARY
+        self.timeout = 30
+
+    def is_available(self) -> bool:
+        return shutil.which(self.ffprobe) is not None
+
+    def probe(self, source: str) -> Optional[Dict[str, Any]]:
+        """
+        Probe a local file or URL.
+
+        Args:
+            source: Path or URL of the video
+
+        Returns:
+            Dictionary with duration, fps, width, height, codec, frames,
+            bit_rate and container, or None if the source cannot be probed
+        """
+        if not self.is_available():
+            return None
+
+        cmd = [
+            self.ffprobe, "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries",
+            "stream=codec_name,width,height,avg_frame_rate,r_frame_rate,nb_frames,duration"
+            ":format=duration,bit_rate,format_name",
+            "-of", "json",
+            source
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"ffprobe failed on {source}: {e}")
+            return None
+        if result.returncode != 0:
+            logger.warning(f"ffprobe failed on {source}: {result.stderr.strip()[-300:]}")
+            return None
+
+        data = json.loads(result.stdout or "{}")
+        streams = data.get("streams") or []
+        if not streams:
+            return None
+        stream, container = streams[0], data.get("format") or {}
+
+        fps = _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(stream.get("r_frame_rate"))
+        duration = _to_float(stream.get("duration")) or _to_float(container.get("duration"))
+        frames = _to_float(stream.get("nb_frames"))
+        if frames is None and duration and fps:
+            frames = duration * fps
+
+        return {
+            'duration': round(duration, 3) if duration else None,
+            'fps': round(fps, 3) if fps else None,
+            'width': stream.get("width"),
+            'height': stream.get("height"),
+            'codec': stream.get("codec_name"),
+            'frames': int(frames) if frames else None,
+            'bit_rate': int(_to_float(container.get("bit_rate")) or 0) or None,
+            'container': container.get("format_name"),
+            'probed_by': 'ffprobe'
+        }
+
+    def probe_upload(self, file) -> Optional[Dict[str, Any]]:
+        """
+        Probe a FastAPI UploadFile before it is sent to Cloudinary.
+
+        On Linux, uploads larger than the spool size are already on disk and
+        are read through their file descriptor (``/proc/<pid>/fd``; ffprobe
+        runs in a child process, so not ``/proc/self``). Smaller uploads and
+        other platforms go through a temporary file. The file position is
+        restored afterwards. Blocking: call it from a worker thread in async
+        handlers.
+        """
+        if not self.is_available():
+            return None
+
+        fileobj = file.file
+        position = fileobj.tell()
+        try:
+            if PROC_FD_AVAILABLE:
+                try:
+                    fileobj.flush()
+                    fd_path = f"/proc/{os.getpid()}/fd/{fileobj.fileno()}"
+                    if os.path.exists(fd_path):
+                        return self.probe(fd_path)
+                except (AttributeError, OSError, ValueError):
+                    # In-memory spool: no file descriptor
+                    pass
+
+            fileobj.seek(0)
+            suffix = os.path.splitext(file.filename or "")[1]
+            # Closed before probing: Windows cannot open a file held open elsewhere
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+                shutil.copyfileobj(fileobj, tmp)
+            try:
+                return self.probe(tmp.name)
+            finally:
+                os.unlink(tmp.name)
+        finally:
+            fileobj.seek(position)
+
+    def from_upload_result(self, upload_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fallback metadata from Cloudinary's upload response when ffprobe is missing."""
+        duration = _to_float(upload_result.get("duration"))
+        if not duration:
+            return None
+        fps = _to_float(upload_result.get("frame_rate"))
+        return {
+            'duration': round(duration, 3),
+            'fps': round(fps, 3) if fps else None,
+            'width': upload_result.get("width"),
+            'height': upload_result.get("height"),
+            'codec': upload_result.get("video_codec"),
+            'frames': int(upload_result["nb_frames"]) if upload_result.get("nb_frames") else None,
+            'bit_rate': upload_result.get("bit_rate"),
+            'container': upload_result.get("format"),
+            'probed_by': 'cloudinary'
+        }
+
+
+# Global instance
+media_probe_service = MediaProbeService()
@@ -0,0 +1,215 @@
+"""
+Partition Service for the monthly partitions of ai_detections and audit_logs.
+
+Migration 007 turns both tables into RANGE partitioned parents with one
+``<table>_pYYYY_MM`` partition per month and a ``<table>_default`` catch-all.
+This service keeps PARTITION_MONTHS_AHEAD future months created and detaches
+(or drops) months older than the table's retention, so retention is a
+catalog operation instead of a bulk DELETE.
+"""
+
+import re
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# table -> partition key column
+PARTITIONED_TABLES = {
+    "ai_detections": "detected_at",
+    "audit_logs": "timestamp",
+}
+
+EXPIRE_MODES = ("detach", "drop")
+
+
+def _add_months(year: int, month: int, months: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def partition_name(table: str, year: int, month: int) -> str:
+    return f"{table}_p{year:04d}_{month:02d}"
+
+
+class PartitionService:
+    """Service for creating and expiring monthly partitions."""
+
+    def _retention_months(self, table: str) -> int:
+        if table == "ai_detections":
+            return settings.AI_DETECTION_RETENTION_MONTHS
+        return settings.AUDIT_LOG_RETENTION_MONTHS
+
+    def is_partitioned(self, db: Session, table: str) -> bool:
+        return db.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": table}
+        ).first() is not None
+
+    def list_partitions(self, db: Session, table: str) -> List[Tuple[int, int]]:
+        """
+        Months that currently have an attached partition.
+
+        Returns:
+            Sorted list of (year, month)
+        """
+        rows = db.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ), {"table": table}).scalars().all()
+
+        pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$")
+        months = []
+        for name in rows:
+            match = pattern.match(name)
+            if match:
+                months.append((int(match.group(1)), int(match.group(2))))
+        return sorted(months)
+
+    def create_partition(self, db: Session, table: str, year: int, month: int) -> str:
+        """
+        Create the partition of one month. Does not commit.
+
+        Rows that already landed in the default partition for that month are
+        moved into the new partition before it is attached, otherwise
+        PostgreSQL would refuse the new bounds.
+        """
+        key = PARTITIONED_TABLES[table]
+        name = partition_name(table, year, month)
+        next_year, next_month = _add_months(year, month, 1)
+        start = f"{year:04d}-{month:02d}-01"
+        end = f"{next_year:04d}-{next_month:02d}-01"
+        default = f"{table}_default"
+
+        stray = db.execute(text(
+            f'SELECT 1 FROM {default} WHERE "{key}" >= :start AND "{key}" < :end LIMIT 1'
+        ), {"start": start, "end": end}).first()
+
+        if stray is None:
+            db.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+            ))
+            return name
+
+        # ATTACH builds the parent's indexes and constraints on the new table
+        db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        db.execute(text(
+            f"WITH moved AS (DELETE FROM {default} "
+            f'WHERE "{key}" >= :start AND "{key}" < :end RETURNING *) '
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), {"start": start, "end": end})
+        db.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        logger.warning(f"Moved rows of {start[:7]} out of {default} into {name}")
+        return name
+
+    def ensure_future_partitions(
+        self,
+        db: Session,
+        table: str,
+        months_ahead: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Create missing partitions from the current month to ``months_ahead`` months ahead.
+
+        Returns:
+            Names of the created partitions
+        """
+        months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+        now = now or datetime.utcnow()
+        existing = set(self.list_partitions(db, table))
+
+        created = []
+        for offset in range(months_ahead + 1):
+            year, month = _add_months(now.year, now.month, offset)
+            if (year, month) not in existing:
+                created.append(self.create_partition(db, table, year, month))
+        db.commit()
+        return created
+
+    def expire_partitions(
+        self,
+        db: Session,
+        table: str,
+        retention_months: Optional[int] = None,
+        mode: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Detach or drop partitions that ended before the retention window.
+
+        Detached partitions stay as standalone tables for archiving and are
+        no longer visible through the parent.
+
+        Args:
+            db: Database session
+            table: Partitioned table name
+            retention_months: Months to keep, 0 keeps everything
+            mode: "detach" or "drop"
+            now: Reference time (default: now, UTC)
+
+        Returns:
+            Names of the expired partitions
+
+        Raises:
+            ValueError: If mode is unknown
+        """
+        retention_months = self._retention_months(table) if retention_months is None else retention_months
+        mode = mode or settings.PARTITION_EXPIRE_MODE
+        if mode not in EXPIRE_MODES:
+            raise ValueError(f"Unknown partition expire mode: {mode}")
+        if retention_months <= 0:
+            return []
+
+        now = now or datetime.utcnow()
+        cutoff = _add_months(now.year, now.month, -retention_months)
+
+        expired = []
+        for year, month in self.list_partitions(db, table):
+            # Keep a partition as long as any of its month is inside the window
+            if (year, month) >= cutoff:
+                break
+            name = partition_name(table, year, month)
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if mode == "drop":
+                db.execute(text(f"DROP TABLE {name}"))
+            expired.append(name)
+        db.commit()
+        return expired
+
+    def run_maintenance(self, db: Session) -> Dict[str, Any]:
+        """
+        Pre-create future partitions and expire old ones for every partitioned table.
+
+        Returns:
+            Dictionary of created/expired partition names per table
+        """
+        result = {}
+        for table in PARTITIONED_TABLES:
+            if not self.is_partitioned(db, table):
+                logger.warning(f"{table} is not partitioned, run the 007 migration first")
+                continue
+            try:
+                created = self.ensure_future_partitions(db, table)
+                expired = self.expire_partitions(db, table)
+            except Exception:
+                db.rollback()
+                raise
+
+            result[table] = {'created': created, 'expired': expired}
+            if created or expired:
+                logger.info(f"Partition maintenance on {table}: created {created}, expired {expired}")
+        return result
+
+
+# Global instance
+partition_service = PartitionService()
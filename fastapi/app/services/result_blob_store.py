@@ -0,0 +1,121 @@
+"""
+Result Blob Store for full results of video processing jobs.
+
+An AI analysis result holds every plate, violation and frame box of the
+video. Stored in ``VideoProcessingJob.result_data`` (JSONB) and returned to
+the Celery result backend it was written twice, rarely read and rewritten
+by every status update of the row. The full result is now one gzip JSON
+file per job:
+
+    <RESULT_BLOB_DIR>/job_<id>.json.gz
+
+also uploaded to Cloudinary as a raw asset so API processes without the
+worker's disk can fetch it. ``result_data`` keeps a summary and the
+reference returned by ``put``; ``get`` reads the blob only when asked.
+"""
+
+import io
+import os
+import gzip
+import json
+import logging
+import tempfile
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.core.worker_runtime import worker_runtime
+from app.services.cloudinary_service import cloudinary_service
+
+logger = logging.getLogger(__name__)
+
+RESULT_BLOB_FOLDER = "traffic_job_results"
+
+
+class ResultBlobStore:
+    """Writes and reads gzip JSON blobs of job results."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.RESULT_BLOB_DIR
+
+    def _key(self, job_id: int) -> str:
+        return f"job_{job_id}.json.gz"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _write_local(self, key: str, compressed: bytes):
+        """Write a blob to a temp file and rename it, so readers never see a partial blob."""
+        os.makedirs(self.root, exist_ok=True)
+        fd, staging = tempfile.mkstemp(prefix=f".{key}.", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(staging, self._path(key))
+        except Exception:
+            if os.path.exists(staging):
+                os.unlink(staging)
+            raise
+
+    def put(self, job_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Write the full result of a job, replacing any previous one.
+
+        Returns:
+            Reference stored in ``result_data['full_result']``: key, sizes and URL
+        """
+        raw = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+        compressed = gzip.compress(raw, compresslevel=6)
+
+        key = self._key(job_id)
+        self._write_local(key, compressed)
+
+        reference = {
+            'key': key,
+            'encoding': 'gzip+json',
+            'bytes': len(compressed),
+            'raw_bytes': len(raw)
+        }
+        if settings.RESULT_BLOB_UPLOAD:
+            upload = cloudinary_service.upload_asset(
+                io.BytesIO(compressed), folder=RESULT_BLOB_FOLDER, resource_type="raw", public_id=key
+            )
+            reference['url'] = upload["secure_url"]
+
+        logger.info(f"Wrote result blob {key}: {len(raw)} bytes, {len(compressed)} compressed")
+
+        return reference
+
+    def get(self, reference: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Read a full result, downloading and caching it locally if needed.
+
+        Returns:
+            The full result, or None if the blob no longer exists
+        """
+        path = self._path(reference['key'])
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                compressed = f.read()
+        elif reference.get('url'):
+            response = worker_runtime.http.get(reference['url'], timeout=60)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            compressed = response.content
+            self._write_local(reference['key'], compressed)
+        else:
+            return None
+
+        return json.loads(gzip.decompress(compressed))
+
+    def delete(self, reference: Dict[str, Any], remote: bool = False):
+        """Remove the local blob and, with ``remote``, the uploaded copy."""
+        path = self._path(reference['key'])
+        if os.path.exists(path):
+            os.unlink(path)
+        if remote and reference.get('url'):
+            cloudinary_service.delete_asset(f"{RESULT_BLOB_FOLDER}/{reference['key']}", resource_type="raw")
+
+
+# Global instance
+result_blob_store = ResultBlobStore()
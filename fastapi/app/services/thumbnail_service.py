@@ -0,0 +1,202 @@
+"""
+Thumbnail Service for locally generated video previews.
+
+Builds a thumbnail and a timeline sprite sheet (one small tile every N
+seconds) from the frames the AI analysis already decodes, so previews cost
+no extra decode pass and no Cloudinary transformation.
+"""
+
+import math
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.cloudinary_service import cloudinary_service
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+
+class TimelineSpriteBuilder:
+    """Collects downscaled tiles from sampled frames during analysis."""
+
+    def __init__(
+        self,
+        duration_hint: Optional[float] = None,
+        interval: Optional[float] = None,
+        tile_width: Optional[int] = None,
+        columns: Optional[int] = None,
+        max_tiles: Optional[int] = None
+    ):
+        self.tile_width = tile_width or settings.TIMELINE_SPRITE_TILE_WIDTH
+        self.columns = columns or settings.TIMELINE_SPRITE_COLUMNS
+        self.max_tiles = max_tiles or settings.TIMELINE_SPRITE_MAX_TILES
+        self.interval = interval or settings.TIMELINE_SPRITE_INTERVAL_SECONDS
+
+        # Widen the interval for long videos so the sheet covers the whole timeline
+        if duration_hint:
+            self.interval = max(self.interval, float(duration_hint) / self.max_tiles)
+
+        self.tile_height: Optional[int] = None
+        self.tiles: List[Tuple[float, np.ndarray]] = []
+        self.thumbnail: Optional[np.ndarray] = None
+        self._next_timestamp = 0.0
+
+    def add_frame(self, timestamp: float, frame: np.ndarray):
+        """Frame sink for AIDetectionService.analyze_video."""
+        import cv2
+
+        if self.thumbnail is None:
+            height, width = frame.shape[:2]
+            thumb_width = min(settings.THUMBNAIL_WIDTH, width)
+            thumb_height = max(1, round(height * thumb_width / width))
+            self.thumbnail = cv2.resize(frame, (thumb_width, thumb_height), interpolation=cv2.INTER_AREA)
+
+        if timestamp < self._next_timestamp or len(self.tiles) >= self.max_tiles:
+            return
+
+        if self.tile_height is None:
+            height, width = frame.shape[:2]
+            self.tile_height = max(1, round(height * self.tile_width / width))
+
+        tile = cv2.resize(frame, (self.tile_width, self.tile_height), interpolation=cv2.INTER_AREA)
+        self.tiles.append((timestamp, tile))
+        self._next_timestamp = timestamp + self.interval
+
+    def build_sprite(self, quality: int = 70) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """
+        Compose the sprite sheet.
+
+        Returns:
+            Tuple of (JPEG bytes, index dict) or None if no tiles were collected
+        """
+        import cv2
+
+        if not self.tiles:
+            return None
+
+        columns = min(self.columns, len(self.tiles))
+        rows = math.ceil(len(self.tiles) / columns)
+        sheet = np.zeros((rows * self.tile_height, columns * self.tile_width, 3), dtype=np.uint8)
+
+        index = []
+        for i, (timestamp, tile) in enumerate(self.tiles):
+            x = (i % columns) * self.tile_width
+            y = (i // columns) * self.tile_height
+            sheet[y:y + self.tile_height, x:x + self.tile_width] = tile
+            index.append({'t': round(timestamp, 3), 'x': x, 'y': y})
+
+        ok, encoded = cv2.imencode('.jpg', sheet, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise RuntimeError("Failed to encode timeline sprite")
+
+        return encoded.tobytes(), {
+            'tile_width': self.tile_width,
+            'tile_height': self.tile_height,
+            'columns': columns,
+            'rows': rows,
+            'interval': round(self.interval, 3),
+            'tiles': index
+        }
+
+    def build_thumbnail(self, quality: int = 85) -> Optional[bytes]:
+        import cv2
+
+        if self.thumbnail is None:
+            return None
+        ok, encoded = cv2.imencode('.jpg', self.thumbnail, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return encoded.tobytes() if ok else None
+
+
+class ThumbnailService:
+    """Service for publishing locally generated thumbnails and sprites."""
+
+    def publish(self, db: Session, video, builder: TimelineSpriteBuilder) -> Dict[str, Any]:
+        """
+        Upload the thumbnail and sprite sheet and record them on the video.
+
+        The sprite URL and tile index go to ``video_metadata['timeline_sprite']``
+        so the frontend can scrub without streaming the video.
+
+        Args:
+            db: Database session
+            video: CameraVideo record
+            builder: Builder filled during analysis
+
+        Returns:
+            Dictionary with the published URLs and tile count
+        """
+        folder = f"traffic_previews/video_{video.id}"
+        metadata = dict(video.video_metadata or {})
+        published = {'thumbnail_url': None, 'sprite_url': None, 'tiles': 0}
+
+        thumbnail = builder.build_thumbnail()
+        if thumbnail:
+            upload = cloudinary_service.upload_asset(
+                thumbnail, folder=folder, resource_type="image", public_id="thumbnail"
+            )
+            video.thumbnail_url = upload["secure_url"]
+            metadata['local_thumbnail'] = True
+            published['thumbnail_url'] = upload["secure_url"]
+
+        sprite = builder.build_sprite()
+        if sprite:
+            sprite_bytes, index = sprite
+            upload = cloudinary_service.upload_asset(
+                sprite_bytes, folder=folder, resource_type="image", public_id="timeline_sprite"
+            )
+            metadata['timeline_sprite'] = {'url': upload["secure_url"], **index}
+            published['sprite_url'] = upload["secure_url"]
+            published['tiles'] = len(index['tiles'])
+
+        # Reassign so the JSONB change is picked up by the session
+        video.video_metadata = metadata
+        db.commit()
+        cache_service.invalidate_video_metadata(video.id)
+
+        logger.info(f"Published local previews for video {video.id}: {published['tiles']} sprite tiles")
+
+        return published
+
+    def generate_thumbnail(self, db: Session, video, timestamp: float = 0.0) -> Optional[str]:
+        """
+        Decode one frame locally and publish it as the video thumbnail.
+
+        Returns:
+            Thumbnail URL, or None if the frame could not be read
+        """
+        import cv2
+
+        cap = cv2.VideoCapture(video.cloudinary_url)
+        try:
+            if not cap.isOpened():
+                return None
+            if timestamp > 0:
+                cap.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
+            success, frame = cap.read()
+        finally:
+            cap.release()
+
+        if not success:
+            return None
+
+        builder = TimelineSpriteBuilder()
+        builder.add_frame(timestamp, frame)
+        upload = cloudinary_service.upload_asset(
+            builder.build_thumbnail(),
+            folder=f"traffic_previews/video_{video.id}",
+            resource_type="image",
+            public_id="thumbnail"
+        )
+        video.thumbnail_url = upload["secure_url"]
+        video.video_metadata = {**(video.video_metadata or {}), 'local_thumbnail': True}
+        db.commit()
+        cache_service.invalidate_video_metadata(video.id)
+        return video.thumbnail_url
+
+
+# Global instance
+thumbnail_service = ThumbnailService()
@@ -0,0 +1,399 @@
+"""
+Track Store for frame-level bounding boxes of analyzed videos.
+
+Frame boxes used to be one FRAME row per sampled frame in ai_detections.
+They are now written once per video as NumPy arrays that are memory-mapped
+on read, so a time window costs two binary searches and one slice:
+
+    video_<id>/frames.npy   float64 (F,)    frame timestamps, ascending
+    video_<id>/offsets.npy  int64   (F+1,)  first box row of each frame
+    video_<id>/boxes.npy    float32 (N, 8)  x1, y1, x2, y2, conf, class_id, track_id, plate
+    video_<id>/meta.json    class names, plate numbers, counts
+
+track_id and plate are -1 when missing; plate indexes meta["plates"].
+The directory is also uploaded to Cloudinary as one raw tar so API
+processes without the worker's disk can fetch it on first read.
+
+Every publish gets a new ``revision`` (in meta.json and in the summary kept
+in ``video_metadata['track_store']``). A local copy is used only if its
+revision is the one the caller's summary names, so a pack rewritten by
+compaction on another host is downloaded again instead of read stale.
+"""
+
+import io
+import os
+import json
+import time
+import errno
+import uuid
+import shutil
+import logging
+import tarfile
+import tempfile
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.worker_runtime import worker_runtime
+from app.services.cloudinary_service import cloudinary_service
+
+logger = logging.getLogger(__name__)
+
+TRACK_STORE_VERSION = 1
+BOX_COLUMNS = ("x1", "y1", "x2", "y2", "confidence", "class_id", "track_id", "plate")
+SUMMARY_KEYS = ('version', 'revision', 'video_id', 'frames', 'boxes', 'start', 'end')
+UPLOAD_ATTEMPTS = 3
+
+
+class TrackStoreUnavailable(RuntimeError):
+    """The uploaded pack exists but could not be fetched right now."""
+
+
+class TrackStore:
+    """Writes and reads per-video frame box arrays."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.TRACK_STORE_DIR
+
+    def _video_dir(self, video_id: int) -> str:
+        return os.path.join(self.root, f"video_{video_id}")
+
+    def write(self, video_id: int, frame_detections: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Pack frame detections of one analysis, replacing any previous pack.
+
+        Args:
+            video_id: ID of the analyzed video
+            frame_detections: ``analysis_results['frame_detections']`` (timestamp, bounding_boxes)
+
+        Returns:
+            Summary for ``video_metadata['track_store']``, or None if there are no frames
+        """
+        if not frame_detections:
+            return None
+
+        frames = sorted(frame_detections, key=lambda f: f['timestamp'])
+        timestamps = np.fromiter((f['timestamp'] for f in frames), dtype=np.float64, count=len(frames))
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        np.cumsum([len(f['bounding_boxes']) for f in frames], out=offsets[1:])
+
+        plates: List[str] = []
+        plate_ids: Dict[str, int] = {}
+        class_names: Dict[int, str] = {}
+        boxes = np.full((int(offsets[-1]), len(BOX_COLUMNS)), -1, dtype=np.float32)
+
+        row = 0
+        for frame in frames:
+            for box in frame['bounding_boxes']:
+                plate = box.get('license_plate')
+                if plate is not None and plate not in plate_ids:
+                    plate_ids[plate] = len(plates)
+                    plates.append(plate)
+                class_names[int(box['class_id'])] = box['class_name']
+                boxes[row, :6] = (box['x1'], box['y1'], box['x2'], box['y2'], box['confidence'], box['class_id'])
+                if box.get('track_id') is not None:
+                    boxes[row, 6] = box['track_id']
+                if plate is not None:
+                    boxes[row, 7] = plate_ids[plate]
+                row += 1
+
+        meta = {
+            'class_names': {str(k): v for k, v in class_names.items()},
+            'plates': plates
+        }
+        return self._publish(video_id, timestamps, offsets, boxes, meta)
+
+    def _publish(
+        self,
+        video_id: int,
+        timestamps: np.ndarray,
+        offsets: np.ndarray,
+        boxes: np.ndarray,
+        meta: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Write a pack to staging, upload it and swap it in place of the old one."""
+        meta = {
+            **meta,
+            'version': TRACK_STORE_VERSION,
+            'revision': uuid.uuid4().hex,
+            'video_id': video_id,
+            'frames': len(timestamps),
+            'boxes': int(offsets[-1]),
+            'start': float(timestamps[0]),
+            'end': float(timestamps[-1])
+        }
+
+        os.makedirs(self.root, exist_ok=True)
+        target = self._video_dir(video_id)
+        staging = tempfile.mkdtemp(prefix=f".video_{video_id}_", dir=self.root)
+        try:
+            np.save(os.path.join(staging, "frames.npy"), timestamps)
+            np.save(os.path.join(staging, "offsets.npy"), offsets)
+            np.save(os.path.join(staging, "boxes.npy"), boxes)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            summary = {key: meta[key] for key in SUMMARY_KEYS}
+            if settings.TRACK_STORE_UPLOAD:
+                summary['url'] = self._upload(video_id, staging)
+
+            self._swap_in(staging, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        logger.info(f"Wrote track store for video {video_id}: {meta['frames']} frames, {meta['boxes']} boxes")
+
+        return summary
+
+    def _upload(self, video_id: int, directory: str) -> str:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name in ("frames.npy", "offsets.npy", "boxes.npy", "meta.json"):
+                tar.add(os.path.join(directory, name), arcname=name)
+        # A short Cloudinary hiccup must not cost the whole analysis
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            buffer.seek(0)
+            try:
+                upload = cloudinary_service.upload_asset(
+                    buffer, folder="traffic_tracks", resource_type="raw", public_id=f"video_{video_id}.tar"
+                )
+                return upload["secure_url"]
+            except Exception as e:
+                if attempt == UPLOAD_ATTEMPTS:
+                    raise
+                logger.warning(f"Upload of track store of video {video_id} failed (attempt {attempt}): {e}")
+                time.sleep(2 ** attempt)
+
+    def _swap_in(self, staging: str, target: str):
+        """
+        Replace ``target`` with ``staging``; open memory maps of the old pack stay valid.
+
+        Directories cannot be replaced in one rename, so the old pack is moved
+        aside first. A concurrent swap of the same video may win in between;
+        then its pack is moved aside as well and the rename is retried.
+        """
+        retired = tempfile.mkdtemp(prefix=".retired_", dir=self.root)
+        try:
+            for attempt in range(3):
+                try:
+                    os.replace(target, os.path.join(retired, f"pack{attempt}"))
+                except FileNotFoundError:
+                    pass
+                try:
+                    os.replace(staging, target)
+                    return
+                except OSError as e:
+                    if e.errno not in (errno.ENOTEMPTY, errno.EEXIST) or attempt == 2:
+                        raise
+        finally:
+            shutil.rmtree(retired, ignore_errors=True)
+
+    def _local_revision(self, directory: str) -> Optional[str]:
+        try:
+            with open(os.path.join(directory, "meta.json")) as f:
+                return json.load(f).get('revision')
+        except (OSError, ValueError):
+            return None
+
+    def _ensure_local(self, video_id: int, pack: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Local directory of the pack a summary describes, downloading it if
+        the local copy is missing or of another revision.
+
+        Returns:
+            Directory, or None if the video has no pack or it no longer exists
+
+        Raises:
+            TrackStoreUnavailable: If the uploaded pack could not be downloaded
+        """
+        pack = pack or {}
+        directory = self._video_dir(video_id)
+        if os.path.exists(os.path.join(directory, "meta.json")):
+            # Summaries written before revisions existed accept any local copy
+            if not pack.get('revision') or self._local_revision(directory) == pack['revision']:
+                return directory
+        url = pack.get('url')
+        if not url:
+            return None
+
+        try:
+            response = worker_runtime.http.get(url, timeout=60)
+        except Exception as e:
+            raise TrackStoreUnavailable(f"Could not download track store of video {video_id}: {e}")
+        if response.status_code == 404:
+            logger.warning(f"Track store of video {video_id} is gone: {url}")
+            return None
+        if response.status_code >= 400:
+            raise TrackStoreUnavailable(
+                f"Could not download track store of video {video_id}: HTTP {response.status_code}"
+            )
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".video_{video_id}_", dir=self.root)
+        try:
+            with tarfile.open(fileobj=io.BytesIO(response.content), mode="r") as tar:
+                for member in tar.getmembers():
+                    if member.isfile() and os.path.basename(member.name) == member.name:
+                        tar.extract(member, staging)
+            if not os.path.exists(os.path.join(staging, "meta.json")):
+                raise TrackStoreUnavailable(f"Track store of video {video_id} is incomplete: {url}")
+            self._swap_in(staging, directory)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return directory
+
+    def _open(self, video_id: int, pack: Optional[Dict[str, Any]], mmap_mode: Optional[str] = "r"):
+        """
+        Arrays and meta of a video's pack, or None if it has no pack.
+
+        A concurrent publish or download swaps the directory between two
+        renames; a reader caught in between retries once.
+        """
+        for attempt in (1, 2):
+            directory = self._ensure_local(video_id, pack)
+            if directory is None:
+                return None
+            try:
+                timestamps = np.load(os.path.join(directory, "frames.npy"), mmap_mode=mmap_mode)
+                offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode=mmap_mode)
+                boxes = np.load(os.path.join(directory, "boxes.npy"), mmap_mode="r")
+                with open(os.path.join(directory, "meta.json")) as f:
+                    meta = json.load(f)
+                return timestamps, offsets, boxes, meta
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                logger.info(f"Track store of video {video_id} was swapped while opening it, retrying")
+
+    def read_window(
+        self,
+        video_id: int,
+        t_from: float,
+        t_to: float,
+        pack: Optional[Dict[str, Any]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Frames with timestamps in [t_from, t_to], in the FRAME detection_data shape.
+
+        Args:
+            video_id: ID of the video
+            t_from: Window start in seconds
+            t_to: Window end in seconds (inclusive)
+            pack: Summary from ``video_metadata['track_store']`` (URL and revision)
+
+        Returns:
+            List of {timestamp, bounding_boxes}, or None if the video has no pack
+        """
+        opened = self._open(video_id, pack)
+        if opened is None:
+            return None
+        timestamps, offsets, boxes, meta = opened
+
+        first = int(np.searchsorted(timestamps, t_from, side="left"))
+        last = int(np.searchsorted(timestamps, t_to, side="right"))
+        if first >= last:
+            return []
+
+        rows = np.asarray(boxes[offsets[first]:offsets[last]])
+        base = int(offsets[first])
+        class_names = meta['class_names']
+        plates = meta['plates']
+
+        frames = []
+        for i in range(first, last):
+            bounding_boxes = []
+            for x1, y1, x2, y2, conf, class_id, track_id, plate in rows[offsets[i] - base:offsets[i + 1] - base]:
+                bounding_boxes.append({
+                    'x1': int(x1),
+                    'y1': int(y1),
+                    'x2': int(x2),
+                    'y2': int(y2),
+                    'class_id': int(class_id),
+                    'class_name': class_names.get(str(int(class_id))),
+                    'confidence': round(float(conf), 4),
+                    'track_id': int(track_id) if track_id >= 0 else None,
+                    'license_plate': plates[int(plate)] if plate >= 0 else None
+                })
+            frames.append({'timestamp': round(float(timestamps[i]), 3), 'bounding_boxes': bounding_boxes})
+
+        return frames
+
+    def downsample(self, video_id: int, fps: float, pack: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Keep only the first frame of every 1/fps interval, replacing the pack.
+
+        Args:
+            video_id: ID of the video
+            fps: Target frame rate
+            pack: Summary from ``video_metadata['track_store']`` (URL and revision)
+
+        Returns:
+            New summary for ``video_metadata['track_store']``, or None if the
+            video has no pack or is already at or below ``fps``
+        """
+        opened = self._open(video_id, pack, mmap_mode=None)
+        if opened is None:
+            return None
+        timestamps, offsets, boxes, meta = opened
+
+        buckets = np.floor(timestamps * fps).astype(np.int64)
+        keep = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        if len(keep) == len(timestamps):
+            return None
+
+        counts = offsets[keep + 1] - offsets[keep]
+        new_offsets = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(counts, out=new_offsets[1:])
+        # Row indices of the kept frames' boxes, in frame order
+        rows = np.repeat(offsets[keep] - new_offsets[:-1], counts) + np.arange(new_offsets[-1])
+        new_boxes = np.asarray(boxes[rows], dtype=np.float32)
+        del boxes
+
+        summary = self._publish(
+            video_id,
+            timestamps[keep],
+            new_offsets,
+            new_boxes,
+            {'class_names': meta['class_names'], 'plates': meta['plates']}
+        )
+        logger.info(f"Downsampled track store of video {video_id}: {len(timestamps)} -> {len(keep)} frames")
+        return summary
+
+    def copy(self, source_video_id: int, video_id: int, pack: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Publish the pack of one video as the pack of another.
+
+        Args:
+            source_video_id: ID of the video whose pack is copied
+            video_id: ID of the video that gets the copy
+            pack: Summary of the source pack (URL and revision)
+
+        Returns:
+            Summary for the copy's ``video_metadata['track_store']``, or None
+            if the source has no pack
+        """
+        opened = self._open(source_video_id, pack, mmap_mode=None)
+        if opened is None:
+            return None
+        timestamps, offsets, boxes, meta = opened
+
+        summary = self._publish(
+            video_id,
+            timestamps,
+            offsets,
+            np.asarray(boxes),
+            {'class_names': meta['class_names'], 'plates': meta['plates']}
+        )
+        logger.info(f"Copied track store of video {source_video_id} to video {video_id}")
+        return summary
+
+    def delete(self, video_id: int, remote: bool = False):
+        shutil.rmtree(self._video_dir(video_id), ignore_errors=True)
+        if remote:
+            cloudinary_service.delete_asset(f"traffic_tracks/video_{video_id}.tar", resource_type="raw")
+
+
+# Global instance
+track_store = TrackStore()
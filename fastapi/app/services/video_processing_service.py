@@ -6,29 +6,101 @@ This service handles:
 - Processing videos (upload + AI analysis)
 - Updating processing status in database
 - Retry logic for failed jobs
+- Atomic job claiming (FOR UPDATE SKIP LOCKED) with leases renewed by a heartbeat
+- Priority and weighted fair scheduling across cameras when claiming
+- Cost-aware claiming from probed media (heavy/normal worker classes, short jobs first)
 
 Requirements: 5.1, 5.2, 5.3, 5.4
 """
 
+import os
+import socket
 import logging
 import asyncio
+import threading
+from bisect import bisect_left
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, update, func
 
+from app.core.config import settings
 from app.models.CameraVideo import CameraVideo, ProcessingStatus
-from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
+from app.models.camera import Camera
+from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus, JobPriority
 from app.services.cloudinary_service import cloudinary_service
 from app.services.ai_detection_service import ai_detection_service
+from app.services.thumbnail_service import thumbnail_service, TimelineSpriteBuilder
 from app.services.notification_service import NotificationService
+from app.services.analysis_cache_service import analysis_cache_service
+from app.services.job_cost_service import job_cost_service
+from app.services.result_blob_store import result_blob_store
+from app.services.job_retry_policy import (
+    job_retry_policy, PermanentJobError, PERMANENT, TIMEOUT, LEASE_EXPIRED
+)
+from app.utils.stage_timer import create_stage_timer
 
 logger = logging.getLogger(__name__)
 
+# Per-item lists of an analysis result; result_data keeps their lengths only
+RESULT_LIST_KEYS = ('license_plates', 'violations', 'frame_detections')
+
+
+def worker_identity() -> str:
+    """Lease owner name of this process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseHeartbeat:
+    """
+    Renews a job lease from a background thread while the job runs.
+
+    The analysis blocks the event loop for long stretches, so the heartbeat
+    cannot be an asyncio task. ``lost`` is set when the lease could not be
+    renewed because the job was reclaimed or cancelled meanwhile.
+    """
+
+    def __init__(self, job_id: int, owner: str, interval: Optional[float] = None):
+        self.job_id = job_id
+        self.owner = owner
+        self.interval = interval or settings.JOB_HEARTBEAT_SECONDS
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        from app.core.database import SessionLocal
+
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                if not video_processing_service.renew_lease(db, self.job_id, self.owner):
+                    logger.warning(f"Lost lease on job {self.job_id} ({self.owner})")
+                    self.lost = True
+                    return
+            except Exception as e:
+                # A transient DB error must not kill the heartbeat; the lease has slack
+                logger.error(f"Failed to renew lease on job {self.job_id}: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
 
 class VideoProcessingService:
     """Service for managing video processing queue and background tasks."""
     
+    # Upper bounds (ms) of the stage timing histogram buckets, plus one overflow bucket
+    STAGE_HISTOGRAM_BOUNDS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 30000, 60000, 300000]
+    
     def __init__(self):
         """Initialize Video Processing Service."""
         self.max_retries = 3
@@ -39,7 +111,8 @@ class VideoProcessingService:
         self,
         db: Session,
         video_id: int,
-        job_type: JobType = JobType.AI_ANALYSIS
+        job_type: JobType = JobType.AI_ANALYSIS,
+        priority: JobPriority = JobPriority.NORMAL
     ) -> VideoProcessingJob:
         """
         Add video to processing queue.
@@ -50,6 +123,7 @@ class VideoProcessingService:
             db: Database session
             video_id: ID of the video to process
             job_type: Type of processing job (AI_ANALYSIS, UPLOAD, THUMBNAIL)
+            priority: Claim priority, higher first
         
         Returns:
             VideoProcessingJob: The created or existing job
@@ -83,6 +157,8 @@ class VideoProcessingService:
                 video_id=video_id,
                 job_type=job_type,
                 status=JobStatus.PENDING,
+                priority=int(priority),
+                estimated_cost_seconds=job_cost_service.estimate_video(video),
                 retry_count=0
             )
             
@@ -107,21 +183,28 @@ class VideoProcessingService:
     async def process_video(
         self,
         db: Session,
-        job_id: int
+        job_id: int,
+        worker_id: Optional[str] = None,
+        already_claimed: bool = False
     ) -> Dict[str, Any]:
         """
         Process video: perform AI analysis and update database.
         
         This method:
-        1. Updates job status to PROCESSING
+        1. Claims the job (PENDING -> PROCESSING with a lease)
         2. Downloads video from Cloudinary (if needed)
-        3. Runs AI analysis
+        3. Runs AI analysis while a heartbeat renews the lease
         4. Saves detection results
         5. Updates job status to COMPLETED or FAILED
         
+        A job that is not PENDING (another worker holds it, or it finished)
+        is left alone and ``claimed`` is False in the result.
+        
         Args:
             db: Database session
             job_id: ID of the processing job
+            worker_id: Lease owner name (default: host:pid)
+            already_claimed: The caller already holds the lease (claim_next_jobs)
         
         Returns:
             Dictionary containing:
@@ -135,41 +218,70 @@ class VideoProcessingService:
         """
         job = None
         video = None
+        timer = create_stage_timer()
+        owner = worker_id or worker_identity()
         
         try:
-            # Get job
-            job = db.query(VideoProcessingJob).filter(VideoProcessingJob.id == job_id).first()
+            # Claim the job; only one worker can move it out of PENDING
+            if already_claimed:
+                job = db.query(VideoProcessingJob).filter(
+                    VideoProcessingJob.id == job_id,
+                    VideoProcessingJob.lease_owner == owner
+                ).first()
+            else:
+                job = self.claim_job(db, job_id, owner)
+            
             if not job:
-                raise ValueError(f"Job with ID {job_id} not found")
+                existing = db.query(VideoProcessingJob).filter(VideoProcessingJob.id == job_id).first()
+                if not existing:
+                    raise PermanentJobError(f"Job with ID {job_id} not found")
+                logger.info(f"Job {job_id} is {existing.status.value}, not claimed by {owner}")
+                return {
+                    'success': existing.status == JobStatus.COMPLETED,
+                    'claimed': False,
+                    'job_id': job_id,
+                    'video_id': existing.video_id,
+                    'status': existing.status.value
+                }
             
             # Get video
             video = db.query(CameraVideo).filter(CameraVideo.id == job.video_id).first()
             if not video:
-                raise ValueError(f"Video with ID {job.video_id} not found")
-            
-            # Update job status to processing
-            self.update_processing_status(
-                db=db,
-                job_id=job_id,
-                status=JobStatus.PROCESSING,
-                started_at=datetime.utcnow()
-            )
+                raise PermanentJobError(f"Video with ID {job.video_id} not found")
             
             # Update video status
             video.processing_status = ProcessingStatus.PROCESSING
             db.commit()
             
-            logger.info(f"Starting video processing for job {job_id}, video {video.id}")
+            logger.info(f"Starting video processing for job {job_id}, video {video.id} ({owner})")
             
             # Process based on job type
-            if job.job_type == JobType.AI_ANALYSIS:
-                result = await self._process_ai_analysis(db, video, job)
-            elif job.job_type == JobType.THUMBNAIL:
-                result = await self._process_thumbnail(db, video, job)
-            else:
-                raise ValueError(f"Unsupported job type: {job.job_type.value}")
+            with LeaseHeartbeat(job.id, owner) as heartbeat:
+                if job.job_type == JobType.AI_ANALYSIS:
+                    result = await self._process_ai_analysis(db, video, job, timer)
+                elif job.job_type == JobType.THUMBNAIL:
+                    with timer.stage('thumbnail'):
+                        result = await self._process_thumbnail(db, video, job)
+                else:
+                    raise PermanentJobError(f"Unsupported job type: {job.job_type.value}")
+            
+            if heartbeat.lost:
+                # The job was reclaimed or cancelled meanwhile; its new state wins
+                logger.warning(f"Discarding completion of job {job_id}: lease lost")
+                return {
+                    'success': False,
+                    'claimed': True,
+                    'job_id': job_id,
+                    'video_id': video.id,
+                    'error': 'Lease lost while processing'
+                }
+            
+            # Only a summary goes to result_data and the Celery result backend
+            with timer.stage('result_blob'):
+                result = self._summarize_result(job, result)
             
             # Update job status to completed
+            self.release_lease(job)
             self.update_processing_status(
                 db=db,
                 job_id=job_id,
@@ -182,17 +294,21 @@ class VideoProcessingService:
             
             # Send notification to uploader about successful completion
             try:
-                notification_service = NotificationService(db)
-                notification_service.notify_uploader_processing_complete(
-                    video_id=video.id,
-                    job_id=job_id,
-                    success=True
-                )
+                with timer.stage('notify'):
+                    notification_service = NotificationService(db)
+                    notification_service.notify_uploader_processing_complete(
+                        video_id=video.id,
+                        job_id=job_id,
+                        success=True
+                    )
             except Exception as e:
                 logger.error(f"Failed to send completion notification: {e}")
             
+            self._save_stage_timings(db, job, timer)
+            
             return {
                 'success': True,
+                'claimed': True,
                 'job_id': job_id,
                 'video_id': video.id,
                 'results': result
@@ -203,7 +319,8 @@ class VideoProcessingService:
             logger.error(error_msg)
             
             if job:
-                self._handle_job_failure(db, job, error_msg)
+                job.stage_timings = timer.to_dict()
+                self._handle_job_failure(db, job, error_msg, error_class=TIMEOUT)
             
             # Send notification to uploader about failure
             if video:
@@ -230,7 +347,8 @@ class VideoProcessingService:
             logger.error(error_msg)
             
             if job:
-                self._handle_job_failure(db, job, error_msg)
+                job.stage_timings = timer.to_dict()
+                self._handle_job_failure(db, job, error_msg, error=e)
             
             # Send notification to uploader about failure
             if video:
@@ -252,11 +370,37 @@ class VideoProcessingService:
                 'error': error_msg
             }
     
+    async def process_next_job(
+        self,
+        db: Session,
+        worker_id: Optional[str] = None,
+        job_type: Optional[JobType] = None,
+        heavy: Optional[bool] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Claim the next pending job and process it.
+        
+        Args:
+            db: Database session
+            worker_id: Lease owner name (default: host:pid)
+            job_type: Only claim jobs of this type
+            heavy: True claims only heavy jobs, False only the others, None any
+        
+        Returns:
+            Result of process_video, or None if no job was pending
+        """
+        owner = worker_id or worker_identity()
+        jobs = self.claim_next_jobs(db, owner, limit=1, job_type=job_type, heavy=heavy)
+        if not jobs:
+            return None
+        return await self.process_video(db, jobs[0].id, worker_id=owner, already_claimed=True)
+    
     async def _process_ai_analysis(
         self,
         db: Session,
         video: CameraVideo,
-        job: VideoProcessingJob
+        job: VideoProcessingJob,
+        timer=None
     ) -> Dict[str, Any]:
         """
         Process AI analysis for a video.
@@ -265,35 +409,160 @@ class VideoProcessingService:
             db: Database session
             video: CameraVideo record
             job: VideoProcessingJob record
+            timer: Optional StageTimer for per-stage timings
         
         Returns:
             Analysis results
         """
         logger.info(f"Running AI analysis for video {video.id}")
+        timer = timer or create_stage_timer()
         
         # Use Cloudinary URL for analysis
         video_url = video.cloudinary_url
         
+        # Collect preview tiles from the frames the analysis decodes anyway
+        sprite_builder = TimelineSpriteBuilder(duration_hint=video.duration)
+        
         # Run AI analysis with timeout
         analysis_results = await ai_detection_service.analyze_video(
             video_path=video_url,
-            timeout=self.ai_analysis_timeout
+            timeout=self.analysis_timeout(job),
+            frame_sinks=[sprite_builder.add_frame],
+            stage_timer=timer
         )
         
         # Save detection results to database
-        saved_counts = ai_detection_service.save_detection_results(
-            db=db,
-            video_id=video.id,
-            analysis_results=analysis_results
-        )
+        with timer.stage('db_write'):
+            saved_counts = ai_detection_service.save_detection_results(
+                db=db,
+                video_id=video.id,
+                analysis_results=analysis_results
+            )
         
         logger.info(f"AI analysis completed for video {video.id}: {saved_counts}")
         
+        # Let later uploads of the same file reuse these results
+        try:
+            analysis_cache_service.record(db, video, saved_counts, analysis_results)
+        except Exception as e:
+            logger.error(f"Failed to record analysis cache entry for video {video.id}: {e}")
+            db.rollback()
+        
+        if saved_counts.get('violations'):
+            self._queue_evidence_clips(video.id)
+        
+        # Previews are best effort: a failed upload must not fail the analysis
+        previews = None
+        try:
+            with timer.stage('previews'):
+                previews = thumbnail_service.publish(db, video, sprite_builder)
+        except Exception as e:
+            logger.error(f"Failed to publish previews for video {video.id}: {e}")
+            db.rollback()
+        
         return {
             'analysis_results': analysis_results,
-            'saved_counts': saved_counts
+            'saved_counts': saved_counts,
+            'previews': previews
+        }
+    
+    def _summarize_result(self, job: VideoProcessingJob, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Offload the full analysis result to the blob store and keep a summary.
+        
+        Lists (plates, violations, frame boxes) are replaced by their lengths;
+        counts, timings, budget and versions stay so that calibration and
+        dashboards never need the blob. Non-analysis results are kept as is.
+        """
+        analysis = result.get('analysis_results')
+        if not analysis:
+            return result
+        
+        reference = None
+        try:
+            reference = result_blob_store.put(job.id, result)
+        except Exception as e:
+            # Detections and frame boxes are already stored; only the raw payload is lost
+            logger.error(f"Failed to write result blob for job {job.id}: {e}")
+        
+        summary = {key: value for key, value in analysis.items() if key not in RESULT_LIST_KEYS}
+        for key in RESULT_LIST_KEYS:
+            summary[f'{key}_count'] = len(analysis.get(key) or [])
+        
+        return {
+            **{key: value for key, value in result.items() if key != 'analysis_results'},
+            'analysis_results': summary,
+            'model_version': analysis.get('model_version'),
+            'config_version': analysis.get('config_version'),
+            'full_result': reference
         }
     
+    def get_full_result(self, db: Session, job_id: int) -> Dict[str, Any]:
+        """
+        Full result of a job, read from the blob store on request.
+        
+        Results written before blobs existed are still inline in result_data.
+        
+        Raises:
+            ValueError: If the job does not exist or its full result is gone
+        """
+        job = db.query(VideoProcessingJob).filter(VideoProcessingJob.id == job_id).first()
+        if not job:
+            raise ValueError(f"Job with ID {job_id} not found")
+        
+        result_data = job.result_data or {}
+        reference = result_data.get('full_result')
+        if not reference:
+            return result_data
+        
+        full_result = result_blob_store.get(reference)
+        if full_result is None:
+            raise ValueError(f"Full result of job {job_id} is no longer available")
+        return full_result
+    
+    def analysis_timeout(self, job: VideoProcessingJob) -> float:
+        """
+        Analysis timeout, widened for jobs the cost model expects to run long.
+        
+        Capped below the soft time limit of the queue the job was routed to,
+        leaving time to save the results, so the analysis deadline fires
+        before Celery kills the task.
+        """
+        if not job.estimated_cost_seconds:
+            return self.ai_analysis_timeout
+        time_limit = job_cost_service.time_limit(job.estimated_cost_seconds)
+        margin = max(60, time_limit * 0.1)
+        return min(
+            max(self.ai_analysis_timeout, job.estimated_cost_seconds * 2),
+            time_limit - margin
+        )
+    
+    def _save_stage_timings(self, db: Session, job: VideoProcessingJob, timer):
+        """Store the job's stage timings; a failure here never fails the job."""
+        timings = timer.to_dict()
+        if timings is None:
+            return
+        try:
+            job.stage_timings = timings
+            db.commit()
+        except Exception as e:
+            logger.error(f"Failed to save stage timings for job {job.id}: {e}")
+            db.rollback()
+    
+    def _queue_evidence_clips(self, video_id: int):
+        """Queue evidence clip extraction for a video with violations."""
+        try:
+            from app.core.celery_config import celery_app
+            
+            celery_app.send_task(
+                "app.workers.video_worker.extract_evidence_clips_task",
+                args=[video_id],
+                queue='video_processing'
+            )
+            logger.info(f"Queued evidence clip extraction for video {video_id}")
+        except Exception as e:
+            logger.error(f"Failed to queue evidence clip extraction for video {video_id}: {e}")
+    
     async def _process_thumbnail(
         self,
         db: Session,
@@ -313,15 +582,30 @@ class VideoProcessingService:
         """
         logger.info(f"Generating thumbnail for video {video.id}")
         
-        # Generate thumbnail at 0 seconds
-        thumbnail_url = cloudinary_service.generate_thumbnail(
-            public_id=video.cloudinary_public_id,
-            timestamp=0.0
-        )
+        # Already generated locally during AI analysis
+        if (video.video_metadata or {}).get('local_thumbnail') and video.thumbnail_url:
+            return {
+                'thumbnail_url': video.thumbnail_url,
+                'source': 'analysis'
+            }
         
-        # Update video record
-        video.thumbnail_url = thumbnail_url
-        db.commit()
+        # Decode the first frame locally, fall back to a Cloudinary transformation
+        thumbnail_url = None
+        try:
+            thumbnail_url = thumbnail_service.generate_thumbnail(db, video, timestamp=0.0)
+        except Exception as e:
+            logger.warning(f"Local thumbnail generation failed for video {video.id}: {e}")
+            db.rollback()
+        
+        if not thumbnail_url:
+            thumbnail_url = cloudinary_service.generate_thumbnail(
+                public_id=video.cloudinary_public_id,
+                timestamp=0.0
+            )
+            
+            # Update video record
+            video.thumbnail_url = thumbnail_url
+            db.commit()
         
         logger.info(f"Thumbnail generated for video {video.id}: {thumbnail_url}")
         
@@ -333,44 +617,395 @@ class VideoProcessingService:
         self,
         db: Session,
         job: VideoProcessingJob,
-        error_message: str
+        error_message: str,
+        commit: bool = True,
+        error: Optional[BaseException] = None,
+        error_class: Optional[str] = None
     ):
         """
         Handle job failure with retry logic.
         
+        Permanent errors fail the job at once. Other errors put it back to
+        PENDING with ``next_run_at`` set by jittered exponential backoff, so
+        it is not claimed before then, until max_retries is reached.
+        
         Args:
             db: Database session
             job: VideoProcessingJob record
             error_message: Error message
+            commit: Commit the change (False when the caller batches several jobs)
+            error: The exception, used to classify the error
+            error_class: Error class when known without an exception (timeout, lease_expired)
         
         Requirements: 5.4
         """
         try:
-            job.retry_count += 1
+            self.release_lease(job)
+            job.retry_count = (job.retry_count or 0) + 1
+            job.error_class = error_class or job_retry_policy.classify(error)
             
-            if job.retry_count < self.max_retries:
-                # Retry: set status back to pending
-                logger.info(f"Job {job.id} failed, retry {job.retry_count}/{self.max_retries}")
+            if job.error_class == PERMANENT:
+                logger.error(f"Job {job.id} failed permanently: {error_message}")
+                self._fail_job(db, job, f"Permanent error: {error_message}")
+            elif job.retry_count < self.max_retries:
+                # Retry: set status back to pending once the backoff has elapsed
                 job.status = JobStatus.PENDING
+                job.next_run_at = job_retry_policy.next_run_at(job.retry_count)
                 job.error_message = f"Retry {job.retry_count}: {error_message}"
+                logger.info(
+                    f"Job {job.id} failed ({job.error_class}), retry {job.retry_count}/{self.max_retries} "
+                    f"at {job.next_run_at.isoformat()}"
+                )
             else:
                 # Max retries reached: mark as failed
                 logger.error(f"Job {job.id} failed after {self.max_retries} retries")
-                job.status = JobStatus.FAILED
-                job.error_message = f"Failed after {self.max_retries} retries: {error_message}"
-                job.completed_at = datetime.utcnow()
-                
-                # Update video status
-                video = db.query(CameraVideo).filter(CameraVideo.id == job.video_id).first()
-                if video:
-                    video.processing_status = ProcessingStatus.FAILED
+                self._fail_job(db, job, f"Failed after {self.max_retries} retries: {error_message}")
             
-            db.commit()
+            if commit:
+                db.commit()
             
         except Exception as e:
             logger.error(f"Error handling job failure: {e}")
             db.rollback()
     
+    def _fail_job(self, db: Session, job: VideoProcessingJob, error_message: str):
+        job.status = JobStatus.FAILED
+        job.error_message = error_message
+        job.next_run_at = None
+        job.completed_at = datetime.utcnow()
+        
+        # Update video status
+        video = db.query(CameraVideo).filter(CameraVideo.id == job.video_id).first()
+        if video:
+            video.processing_status = ProcessingStatus.FAILED
+    
+    def _is_due(self, now: datetime):
+        """Filter for PENDING jobs whose retry backoff (if any) has elapsed."""
+        return or_(VideoProcessingJob.next_run_at.is_(None), VideoProcessingJob.next_run_at <= now)
+    
+    def _take_lease(self, job: VideoProcessingJob, owner: str, now: datetime):
+        job.status = JobStatus.PROCESSING
+        job.started_at = now
+        job.lease_owner = owner
+        job.lease_expires_at = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        job.heartbeat_at = now
+        job.next_run_at = None
+    
+    def release_lease(self, job: VideoProcessingJob):
+        """Clear the lease of a job that is leaving PROCESSING. Does not commit."""
+        job.lease_owner = None
+        job.lease_expires_at = None
+    
+    def claim_job(self, db: Session, job_id: int, owner: str) -> Optional[VideoProcessingJob]:
+        """
+        Atomically move one PENDING job to PROCESSING under a lease.
+        
+        The row is locked with FOR UPDATE SKIP LOCKED, so of several workers
+        given the same job exactly one gets it and the others return at once.
+        
+        Args:
+            db: Database session
+            job_id: ID of the processing job
+            owner: Lease owner name
+        
+        Returns:
+            The claimed job, or None if it is not pending or another worker is claiming it
+        """
+        try:
+            now = datetime.utcnow()
+            job = db.query(VideoProcessingJob).filter(
+                VideoProcessingJob.id == job_id,
+                VideoProcessingJob.status == JobStatus.PENDING,
+                self._is_due(now)
+            ).with_for_update(skip_locked=True).first()
+            
+            if not job:
+                db.rollback()
+                return None
+            
+            self._take_lease(job, owner, now)
+            db.commit()
+            return job
+            
+        except Exception as e:
+            logger.error(f"Error claiming job {job_id}: {e}")
+            db.rollback()
+            raise
+    
+    def claim_next_jobs(
+        self,
+        db: Session,
+        owner: str,
+        limit: int = 1,
+        job_type: Optional[JobType] = None,
+        heavy: Optional[bool] = None
+    ) -> List[VideoProcessingJob]:
+        """
+        Claim up to ``limit`` pending jobs, at most one per camera.
+        
+        Each camera's head job is its highest-priority, oldest pending job.
+        Heads are ordered by priority, then by the camera's share of recent
+        work (jobs processing or started within JOB_FAIR_SHARE_WINDOW_SECONDS
+        divided by ``Camera.scheduling_weight``), then by estimated cost if
+        JOB_PREFER_SHORT_JOBS, then by age, so one camera bulk-uploading
+        cannot starve the others.
+        
+        ``heavy`` splits the queue by estimated cost: heavy workers (long time
+        limits) take jobs above JOB_HEAVY_COST_SECONDS, regular workers the
+        rest, including jobs whose cost is unknown.
+        
+        Rows locked by concurrent claimers are skipped instead of waited for,
+        so any number of workers can pull from the table at once.
+        
+        Returns:
+            The claimed jobs (may be empty)
+        """
+        try:
+            now = datetime.utcnow()
+            heads = self._camera_queue_heads(db, job_type, heavy, now=now)
+            if not heads:
+                db.rollback()
+                return []
+            
+            camera_ids = [head[1] for head in heads]
+            window_start = now - timedelta(seconds=settings.JOB_FAIR_SHARE_WINDOW_SECONDS)
+            served = dict(db.query(
+                CameraVideo.camera_id, func.count(VideoProcessingJob.id)
+            ).join(
+                CameraVideo, CameraVideo.id == VideoProcessingJob.video_id
+            ).filter(
+                CameraVideo.camera_id.in_(camera_ids),
+                or_(
+                    VideoProcessingJob.status == JobStatus.PROCESSING,
+                    VideoProcessingJob.started_at >= window_start
+                )
+            ).group_by(CameraVideo.camera_id).all())
+            weights = dict(db.query(Camera.id, Camera.scheduling_weight).filter(Camera.id.in_(camera_ids)).all())
+            
+            prefer_short = settings.JOB_PREFER_SHORT_JOBS
+            heads.sort(key=lambda head: (
+                -head[2],
+                served.get(head[1], 0) / max(weights.get(head[1]) or 1, 1),
+                (head[4] or 0) if prefer_short else 0,
+                head[3]
+            ))
+            
+            jobs = []
+            for job_id, *_ in heads:
+                job = db.query(VideoProcessingJob).filter(
+                    VideoProcessingJob.id == job_id,
+                    VideoProcessingJob.status == JobStatus.PENDING,
+                    self._is_due(now)
+                ).with_for_update(skip_locked=True).first()
+                if job is None:
+                    continue
+                self._take_lease(job, owner, now)
+                jobs.append(job)
+                if len(jobs) >= limit:
+                    break
+            db.commit()
+            
+            if jobs:
+                logger.info(f"{owner} claimed jobs {[job.id for job in jobs]}")
+            return jobs
+            
+        except Exception as e:
+            logger.error(f"Error claiming jobs: {e}")
+            db.rollback()
+            raise
+    
+    def _camera_queue_heads(
+        self,
+        db: Session,
+        job_type: Optional[JobType] = None,
+        heavy: Optional[bool] = None,
+        now: Optional[datetime] = None
+    ) -> List[list]:
+        """(job_id, camera_id, priority, created_at, estimated cost) of the next due pending job of every camera."""
+        cost = VideoProcessingJob.estimated_cost_seconds
+        query = db.query(
+            VideoProcessingJob.id,
+            CameraVideo.camera_id,
+            VideoProcessingJob.priority,
+            VideoProcessingJob.created_at,
+            cost
+        ).join(
+            CameraVideo, CameraVideo.id == VideoProcessingJob.video_id
+        ).filter(
+            VideoProcessingJob.status == JobStatus.PENDING,
+            self._is_due(now or datetime.utcnow())
+        )
+        if job_type:
+            query = query.filter(VideoProcessingJob.job_type == job_type)
+        if settings.JOB_HEAVY_COST_SECONDS <= 0:
+            pass
+        elif heavy is True:
+            query = query.filter(cost > settings.JOB_HEAVY_COST_SECONDS)
+        elif heavy is False:
+            query = query.filter(or_(cost.is_(None), cost <= settings.JOB_HEAVY_COST_SECONDS))
+        
+        return [list(row) for row in query.distinct(CameraVideo.camera_id).order_by(
+            CameraVideo.camera_id,
+            VideoProcessingJob.priority.desc(),
+            VideoProcessingJob.created_at
+        ).all()]
+    
+    def get_camera_queue_stats(self, db: Session, hours: int = 1) -> Dict[str, Any]:
+        """
+        Queue depth and wait times per camera.
+        
+        Args:
+            db: Database session
+            hours: Window for the wait time of started jobs
+        
+        Returns:
+            Dictionary with one entry per camera that has queued or recently started jobs
+        """
+        now = datetime.utcnow()
+        since = now - timedelta(hours=hours)
+        is_pending = VideoProcessingJob.status == JobStatus.PENDING
+        is_processing = VideoProcessingJob.status == JobStatus.PROCESSING
+        
+        depth = db.query(
+            CameraVideo.camera_id,
+            func.count(VideoProcessingJob.id).filter(is_pending),
+            func.count(VideoProcessingJob.id).filter(is_processing),
+            func.min(VideoProcessingJob.created_at).filter(is_pending),
+            func.max(VideoProcessingJob.priority).filter(is_pending),
+            func.sum(VideoProcessingJob.estimated_cost_seconds).filter(is_pending)
+        ).join(
+            CameraVideo, CameraVideo.id == VideoProcessingJob.video_id
+        ).filter(
+            or_(is_pending, is_processing)
+        ).group_by(CameraVideo.camera_id).all()
+        
+        wait = func.extract('epoch', VideoProcessingJob.started_at - VideoProcessingJob.created_at)
+        waits = db.query(
+            CameraVideo.camera_id,
+            func.count(VideoProcessingJob.id),
+            func.avg(wait),
+            func.percentile_cont(0.9).within_group(wait)
+        ).join(
+            CameraVideo, CameraVideo.id == VideoProcessingJob.video_id
+        ).filter(
+            VideoProcessingJob.started_at >= since
+        ).group_by(CameraVideo.camera_id).all()
+        
+        cameras: Dict[int, Dict[str, Any]] = {}
+        
+        def entry(camera_id: int) -> Dict[str, Any]:
+            return cameras.setdefault(camera_id, {
+                'camera_id': camera_id,
+                'pending': 0,
+                'processing': 0,
+                'oldest_pending_wait_seconds': None,
+                'top_pending_priority': None,
+                'pending_cost_seconds': None,
+                'started': 0,
+                'wait_seconds_avg': None,
+                'wait_seconds_p90': None
+            })
+        
+        for camera_id, pending, processing, oldest, top_priority, pending_cost in depth:
+            item = entry(camera_id)
+            item['pending'] = pending
+            item['processing'] = processing
+            item['oldest_pending_wait_seconds'] = round((now - oldest).total_seconds(), 1) if oldest else None
+            item['top_pending_priority'] = top_priority
+            item['pending_cost_seconds'] = round(float(pending_cost), 1) if pending_cost is not None else None
+        
+        for camera_id, started, avg_wait, p90_wait in waits:
+            item = entry(camera_id)
+            item['started'] = started
+            item['wait_seconds_avg'] = round(float(avg_wait), 1) if avg_wait is not None else None
+            item['wait_seconds_p90'] = round(float(p90_wait), 1) if p90_wait is not None else None
+        
+        if cameras:
+            for camera in db.query(Camera).filter(Camera.id.in_(list(cameras))).all():
+                cameras[camera.id]['camera_code'] = camera.camera_id
+                cameras[camera.id]['name'] = camera.name
+                cameras[camera.id]['scheduling_weight'] = camera.scheduling_weight
+        
+        items = sorted(
+            cameras.values(),
+            key=lambda item: item['oldest_pending_wait_seconds'] or 0,
+            reverse=True
+        )
+        return {
+            'window_hours': hours,
+            'total_pending': sum(item['pending'] for item in items),
+            'total_processing': sum(item['processing'] for item in items),
+            'cost_model': {
+                'coefficients': list(job_cost_service.coefficients),
+                'samples': job_cost_service.samples,
+                'heavy_threshold_seconds': settings.JOB_HEAVY_COST_SECONDS
+            },
+            'cameras': items
+        }
+    
+    def renew_lease(self, db: Session, job_id: int, owner: str) -> bool:
+        """
+        Extend the lease of a job this worker holds.
+        
+        Returns:
+            False if the job is no longer PROCESSING under ``owner``
+        """
+        now = datetime.utcnow()
+        renewed = db.execute(
+            update(VideoProcessingJob).where(
+                VideoProcessingJob.id == job_id,
+                VideoProcessingJob.status == JobStatus.PROCESSING,
+                VideoProcessingJob.lease_owner == owner
+            ).values(
+                lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                heartbeat_at=now
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return renewed == 1
+    
+    def reclaim_expired_leases(self, db: Session, limit: int = 100) -> List[VideoProcessingJob]:
+        """
+        Return PROCESSING jobs whose worker stopped heartbeating to the queue.
+        
+        A reclaim counts as a failed attempt, so a video that keeps killing
+        workers ends FAILED after max_retries. Jobs started before leases
+        existed are reclaimed once they exceed twice the processing timeout.
+        
+        Returns:
+            Jobs set back to PENDING; they are dispatched by dispatch_due_retries
+            once their backoff has elapsed
+        """
+        try:
+            now = datetime.utcnow()
+            stale_start = now - timedelta(seconds=self.processing_timeout * 2)
+            
+            jobs = db.query(VideoProcessingJob).filter(
+                VideoProcessingJob.status == JobStatus.PROCESSING,
+                or_(
+                    VideoProcessingJob.lease_expires_at < now,
+                    and_(
+                        VideoProcessingJob.lease_expires_at.is_(None),
+                        or_(VideoProcessingJob.started_at.is_(None), VideoProcessingJob.started_at < stale_start)
+                    )
+                )
+            ).order_by(VideoProcessingJob.lease_expires_at).limit(limit).with_for_update(
+                skip_locked=True
+            ).all()
+            
+            for job in jobs:
+                owner = job.lease_owner or 'unknown worker'
+                logger.warning(f"Reclaiming job {job.id}: lease of {owner} expired")
+                self._handle_job_failure(db, job, f"Lease of {owner} expired", commit=False, error_class=LEASE_EXPIRED)
+            db.commit()
+            
+            return [job for job in jobs if job.status == JobStatus.PENDING]
+            
+        except Exception as e:
+            logger.error(f"Error reclaiming expired leases: {e}")
+            db.rollback()
+            raise
+    
     def update_processing_status(
         self,
         db: Session,
@@ -439,7 +1074,7 @@ class VideoProcessingService:
         limit: int = 10
     ) -> List[VideoProcessingJob]:
         """
-        Get pending jobs from the queue.
+        Get pending jobs from the queue whose retry backoff has elapsed.
         
         Args:
             db: Database session
@@ -450,7 +1085,8 @@ class VideoProcessingService:
             List of pending VideoProcessingJob records
         """
         query = db.query(VideoProcessingJob).filter(
-            VideoProcessingJob.status == JobStatus.PENDING
+            VideoProcessingJob.status == JobStatus.PENDING,
+            self._is_due(datetime.utcnow())
         )
         
         if job_type:
@@ -473,6 +1109,10 @@ class VideoProcessingService:
         """
         Retry failed jobs that haven't exceeded max retries.
         
+        Jobs are not made claimable at once: each gets its own jittered
+        ``next_run_at``, so a burst of failures is spread out instead of
+        coming back together. Permanent errors are never retried.
+        
         Args:
             db: Database session
             max_age_hours: Only retry jobs failed within this many hours
@@ -483,23 +1123,31 @@ class VideoProcessingService:
         Requirements: 5.4
         """
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=max_age_hours)
+            now = datetime.utcnow()
+            cutoff_time = now - timedelta(hours=max_age_hours)
             
             # Find failed jobs that can be retried
             failed_jobs = db.query(VideoProcessingJob).filter(
                 and_(
                     VideoProcessingJob.status == JobStatus.FAILED,
                     VideoProcessingJob.retry_count < self.max_retries,
-                    VideoProcessingJob.updated_at >= cutoff_time
+                    VideoProcessingJob.updated_at >= cutoff_time,
+                    or_(
+                        VideoProcessingJob.error_class.is_(None),
+                        VideoProcessingJob.error_class != PERMANENT
+                    )
                 )
-            ).all()
+            ).with_for_update(skip_locked=True).all()
             
             retried_jobs = []
             
             for job in failed_jobs:
-                logger.info(f"Retrying failed job {job.id}")
                 job.status = JobStatus.PENDING
+                job.next_run_at = job_retry_policy.next_run_at(max(job.retry_count or 0, 1), now)
+                # Retries do not jump ahead of fresh uploads
+                job.priority = int(JobPriority.BACKGROUND)
                 job.error_message = None
+                logger.info(f"Retrying failed job {job.id} at {job.next_run_at.isoformat()}")
                 retried_jobs.append(job)
             
             db.commit()
@@ -513,6 +1161,35 @@ class VideoProcessingService:
             db.rollback()
             raise
     
+    def dispatch_due_retries(self, db: Session, limit: int = 100) -> List[VideoProcessingJob]:
+        """
+        Pending jobs whose retry backoff elapsed since the last dispatch.
+        
+        ``next_run_at`` is cleared on the returned jobs, so each retry is
+        dispatched (gets a claim token) exactly once; a cleared job is due.
+        
+        Returns:
+            Jobs to queue a claim token for
+        """
+        try:
+            jobs = db.query(VideoProcessingJob).filter(
+                VideoProcessingJob.status == JobStatus.PENDING,
+                VideoProcessingJob.next_run_at <= datetime.utcnow()
+            ).order_by(VideoProcessingJob.next_run_at).limit(limit).with_for_update(
+                skip_locked=True
+            ).all()
+            
+            for job in jobs:
+                job.next_run_at = None
+            db.commit()
+            
+            return jobs
+            
+        except Exception as e:
+            logger.error(f"Error dispatching due retries: {e}")
+            db.rollback()
+            raise
+    
     def get_job_status(
         self,
         db: Session,
@@ -537,12 +1214,111 @@ class VideoProcessingService:
             'video_id': job.video_id,
             'job_type': job.job_type.value,
             'status': job.status.value,
+            'priority': job.priority,
+            'estimated_cost_seconds': job.estimated_cost_seconds,
             'retry_count': job.retry_count,
+            'error_class': job.error_class,
+            'next_run_at': job.next_run_at.isoformat() if job.next_run_at else None,
             'created_at': job.created_at.isoformat() if job.created_at else None,
             'started_at': job.started_at.isoformat() if job.started_at else None,
             'completed_at': job.completed_at.isoformat() if job.completed_at else None,
             'error_message': job.error_message,
-            'result_data': job.result_data
+            'lease_owner': job.lease_owner,
+            'lease_expires_at': job.lease_expires_at.isoformat() if job.lease_expires_at else None,
+            'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+            'result_data': job.result_data,
+            'stage_timings': job.stage_timings
+        }
+    
+    def get_stage_timing_histograms(
+        self,
+        db: Session,
+        hours: int = 24,
+        job_type: Optional[JobType] = None,
+        limit: int = 2000
+    ) -> Dict[str, Any]:
+        """
+        Aggregate per-stage timings of recent jobs into histograms.
+        
+        Buckets are log-scale upper bounds in milliseconds; a stage lands in
+        the first bucket whose bound is >= its wall time.
+        
+        Args:
+            db: Database session
+            hours: Look-back window on completed_at
+            job_type: Optional job type filter
+            limit: Maximum number of jobs to aggregate
+        
+        Returns:
+            Dictionary with per-stage wall-time histograms and percentiles,
+            per-frame averages and peak RSS statistics
+        """
+        since = datetime.utcnow() - timedelta(hours=hours)
+        query = db.query(VideoProcessingJob.stage_timings).filter(
+            VideoProcessingJob.stage_timings.isnot(None),
+            VideoProcessingJob.completed_at >= since
+        )
+        if job_type:
+            query = query.filter(VideoProcessingJob.job_type == job_type)
+        rows = query.order_by(VideoProcessingJob.completed_at.desc()).limit(limit).all()
+        
+        bounds = self.STAGE_HISTOGRAM_BOUNDS_MS
+        walls: Dict[str, List[float]] = {}
+        totals: Dict[str, List[float]] = {}  # name -> [wall_ms, cpu_ms, frames]
+        peak_rss = []
+        skip_ratios = []
+        
+        for (timings,) in rows:
+            for name, (wall_ms, cpu_ms, frames) in (timings.get('stages') or {}).items():
+                walls.setdefault(name, []).append(wall_ms)
+                total = totals.setdefault(name, [0.0, 0.0, 0])
+                total[0] += wall_ms
+                total[1] += cpu_ms
+                total[2] += frames
+            # An overlapping job's peak also covers the other jobs of its process
+            if timings.get('peak_rss_kb') and not timings.get('overlap'):
+                peak_rss.append(timings['peak_rss_kb'])
+            
+            # Sampled frames that skipped inference (frame_hash sees every sampled frame)
+            stage_frames = timings.get('stages') or {}
+            if stage_frames.get('frame_hash') and stage_frames['frame_hash'][2]:
+                inferred = stage_frames.get('inference', [0, 0, 0])[2]
+                skip_ratios.append(1 - inferred / stage_frames['frame_hash'][2])
+        
+        def percentile(values: List[float], q: float) -> float:
+            return values[min(len(values) - 1, int(q * len(values)))]
+        
+        stages = {}
+        for name, values in walls.items():
+            values.sort()
+            counts = [0] * (len(bounds) + 1)
+            for value in values:
+                counts[bisect_left(bounds, value)] += 1
+            
+            wall_total, cpu_total, frames_total = totals[name]
+            stages[name] = {
+                'jobs': len(values),
+                'histogram': counts,
+                'mean_ms': round(wall_total / len(values), 1),
+                'p50_ms': percentile(values, 0.50),
+                'p90_ms': percentile(values, 0.90),
+                'p99_ms': percentile(values, 0.99),
+                'cpu_ratio': round(cpu_total / wall_total, 3) if wall_total else None,
+                'ms_per_frame': round(wall_total / frames_total, 3) if frames_total else None
+            }
+        
+        peak_rss.sort()
+        return {
+            'jobs': len(rows),
+            'hours': hours,
+            'bucket_bounds_ms': bounds,
+            'stages': stages,
+            'peak_rss_kb': {
+                'p50': percentile(peak_rss, 0.50),
+                'p90': percentile(peak_rss, 0.90),
+                'max': peak_rss[-1]
+            } if peak_rss else None,
+            'frame_skip_ratio_mean': round(sum(skip_ratios) / len(skip_ratios), 4) if skip_ratios else None
         }
     
     def cancel_job(
@@ -566,6 +1342,8 @@ class VideoProcessingService:
                 raise ValueError(f"Job with ID {job_id} not found")
             
             if job.status in [JobStatus.PENDING, JobStatus.PROCESSING]:
+                # The running worker notices on its next heartbeat
+                self.release_lease(job)
                 job.status = JobStatus.FAILED
                 job.error_message = "Job cancelled by user"
                 job.completed_at = datetime.utcnow()
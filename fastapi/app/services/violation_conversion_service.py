@@ -0,0 +1,242 @@
+"""
+Violation Conversion Service for turning violation detections into violations.
+
+A batch of detections is converted with a fixed number of statements,
+whatever its size:
+
+1. One query for the video and camera context of every video in the batch
+   and one for the violation rules of every violation type in it.
+2. One multi-row ``INSERT INTO violations ... RETURNING`` (and one for the
+   evidence clips).
+3. One ``UPDATE ai_detections ... FROM violations`` linking each detection
+   to its violation through ``ai_metadata['detection_id']``.
+4. One ``UPDATE camera_videos`` setting violation_count of every video in
+   the batch to its number of detections linked to a violation.
+
+Nothing is committed; the caller owns the transaction.
+"""
+
+import logging
+from typing import Dict, Any, Optional, Sequence
+
+from sqlalchemy import insert, update, select, func
+from sqlalchemy.orm import Session
+
+from app.models.ai_detection import AIDetection, DetectionType, ReviewStatus
+from app.models.CameraVideo import CameraVideo
+from app.models.camera import Camera
+from app.models.evidence import Evidence
+from app.models.violation import Violation
+from app.models.violation_rule import ViolationRule
+
+logger = logging.getLogger(__name__)
+
+# Vehicle types fined with the motorbike column of a violation rule
+BIKE_VEHICLE_TYPES = {"motorcycle", "motorbike", "bicycle"}
+
+
+class ViolationConversionService:
+    """Service for converting AI violation detections into violations in bulk."""
+
+    def _load_context(self, db: Session, video_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """Video and camera fields copied onto violations, per video ID."""
+        rows = db.query(
+            CameraVideo.id,
+            CameraVideo.thumbnail_url,
+            CameraVideo.cloudinary_url,
+            Camera.camera_id,
+            Camera.location_name,
+            Camera.latitude,
+            Camera.longitude
+        ).outerjoin(
+            Camera, Camera.id == CameraVideo.camera_id
+        ).filter(CameraVideo.id.in_(video_ids)).all()
+
+        return {
+            video_id: {
+                'thumbnail_url': thumbnail_url,
+                'video_url': cloudinary_url,
+                'camera_id': camera_id,
+                'location_name': location_name,
+                'latitude': latitude,
+                'longitude': longitude
+            }
+            for video_id, thumbnail_url, cloudinary_url, camera_id, location_name, latitude, longitude in rows
+        }
+
+    def _load_rules(self, db: Session, violation_types: Sequence[str]) -> Dict[str, ViolationRule]:
+        """Violation rules keyed by upper-case code (detections use e.g. ``no_helmet``)."""
+        codes = {violation_type.upper() for violation_type in violation_types if violation_type}
+        if not codes:
+            return {}
+        rules = db.query(ViolationRule).filter(func.upper(ViolationRule.code).in_(codes)).all()
+        return {rule.code.upper(): rule for rule in rules}
+
+    def _violation_row(
+        self,
+        detection: AIDetection,
+        context: Dict[str, Any],
+        rule: Optional[ViolationRule],
+        status: str,
+        officer_id: Optional[int]
+    ) -> Dict[str, Any]:
+        data = detection.detection_data or {}
+        vehicle_type = data.get('vehicle_type')
+        violation_type = data.get('violation_type', 'unknown')
+        clip = data.get('evidence_clip') or {}
+
+        fine_amount = points = legal_reference = None
+        if rule is not None:
+            bike = (vehicle_type or '').lower() in BIKE_VEHICLE_TYPES
+            fine_amount = rule.fine_min_bike if bike else rule.fine_min_car
+            points = rule.points_bike if bike else rule.points_car
+            legal_reference = rule.law_reference
+
+        evidence_images = [url for url in (context.get('thumbnail_url'), context.get('video_url')) if url]
+
+        return {
+            'license_plate': data.get('license_plate') or 'UNKNOWN',
+            'vehicle_type': vehicle_type,
+            'vehicle_color': data.get('vehicle_color'),
+            'vehicle_brand': data.get('vehicle_brand'),
+            'violation_type': violation_type,
+            'violation_description': data.get('description') or f'AI detected {violation_type}',
+            'violation_rule_id': rule.id if rule is not None else None,
+            'points_deducted': points or 0,
+            'fine_amount': fine_amount,
+            'legal_reference': legal_reference,
+            'location_name': context.get('location_name'),
+            'latitude': context.get('latitude'),
+            'longitude': context.get('longitude'),
+            'camera_id': context.get('camera_id'),
+            'video_id': detection.video_id,
+            'detected_at': detection.detected_at,
+            'confidence_score': float(detection.confidence_score),
+            'evidence_images': evidence_images,
+            'evidence_gif': clip.get('url'),
+            'status': status,
+            'priority': 'medium',
+            'reviewed_by': officer_id,
+            'ai_metadata': {
+                'detection_id': detection.id,
+                'video_id': detection.video_id,
+                'video_url': context.get('video_url'),
+                'frame_timestamp': float(detection.frame_timestamp),
+                'detection_data': data,
+                'ai_generated': True,
+                'reviewed_by': detection.reviewed_by,
+                'reviewed_at': detection.reviewed_at.isoformat() if detection.reviewed_at else None
+            }
+        }
+
+    def convert(
+        self,
+        db: Session,
+        detections: Sequence[AIDetection],
+        status: str = "ai_detected",
+        officer_id: Optional[int] = None,
+        approve: bool = True
+    ) -> Dict[int, int]:
+        """
+        Create one violation per detection and link them. Does not commit.
+
+        Detections that already have a violation are skipped; callers that
+        may race should select the detections ``FOR UPDATE SKIP LOCKED``.
+
+        Args:
+            db: Database session
+            detections: Violation detections to convert
+            status: Status of the created violations
+            officer_id: Optional officer assigned to review the violations
+            approve: Also mark the detections reviewed and approved
+
+        Returns:
+            Mapping of detection ID to created violation ID
+        """
+        detections = [detection for detection in detections if detection.violation_id is None]
+        if not detections:
+            return {}
+
+        contexts = self._load_context(db, {detection.video_id for detection in detections})
+        rules = self._load_rules(db, {(d.detection_data or {}).get('violation_type') for d in detections})
+
+        rows = []
+        for detection in detections:
+            violation_type = (detection.detection_data or {}).get('violation_type') or ''
+            rows.append(self._violation_row(
+                detection,
+                contexts.get(detection.video_id, {}),
+                rules.get(violation_type.upper()),
+                status,
+                officer_id
+            ))
+
+        detection_id = Violation.ai_metadata['detection_id'].as_integer()
+        created = db.execute(
+            insert(Violation).values(rows).returning(Violation.id, detection_id)
+        ).all()
+        violation_ids = {detection_id_value: violation_id for violation_id, detection_id_value in created}
+
+        # Evidence clips cut around the detections (see EvidenceClipService)
+        evidence_rows = []
+        for detection in detections:
+            clip = (detection.detection_data or {}).get('evidence_clip') or {}
+            if clip.get('url'):
+                evidence_rows.append({
+                    'violation_id': violation_ids[detection.id],
+                    'video_url': clip['url'],
+                    'processed_data': {'clip_start': clip.get('start'), 'clip_end': clip.get('end')},
+                    'storage_location': 'cloudinary'
+                })
+        if evidence_rows:
+            db.execute(insert(Evidence).values(evidence_rows))
+
+        link = {'violation_id': Violation.id}
+        if approve:
+            link.update(reviewed=True, review_status=ReviewStatus.APPROVED)
+        db.execute(
+            update(AIDetection).where(
+                AIDetection.id == detection_id,
+                Violation.id.in_(list(violation_ids.values()))
+            ).values(**link).execution_options(synchronize_session=False)
+        )
+
+        # Recount from the links rather than adding to the count analysis wrote
+        linked = select(func.count(AIDetection.id)).where(
+            AIDetection.video_id == CameraVideo.id,
+            AIDetection.violation_id.isnot(None)
+        ).correlate(CameraVideo).scalar_subquery()
+        db.execute(
+            update(CameraVideo).where(
+                CameraVideo.id.in_({detection.video_id for detection in detections})
+            ).values(
+                violation_count=linked,
+                has_violations=True
+            ).execution_options(synchronize_session=False)
+        )
+
+        logger.info(f"Converted {len(violation_ids)} detections into violations")
+        return violation_ids
+
+    def convert_video(self, db: Session, video_id: int, min_confidence: float = 0.85) -> Dict[int, int]:
+        """
+        Convert the unreviewed high-confidence violation detections of a video. Does not commit.
+
+        Rows another conversion holds are skipped, so running this twice for
+        the same video never creates a violation twice.
+
+        Returns:
+            Mapping of detection ID to created violation ID
+        """
+        detections = db.query(AIDetection).filter(
+            AIDetection.video_id == video_id,
+            AIDetection.detection_type == DetectionType.VIOLATION,
+            AIDetection.confidence_score >= min_confidence,
+            AIDetection.violation_id.is_(None),
+            AIDetection.reviewed.is_(False)
+        ).with_for_update(skip_locked=True).all()
+        return self.convert(db, detections)
+
+
+# Global instance
+violation_conversion_service = ViolationConversionService()
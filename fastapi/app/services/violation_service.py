@@ -7,6 +7,7 @@ from app.models.user import User
 from app.models.vehicle import Vehicle
 from app.schemas.violation_schema import ViolationCreate, ViolationUpdate, ViolationReview
 from app.services.notification_service import NotificationService
+from app.services.violation_conversion_service import violation_conversion_service
 import cv2
 import os
 import logging
@@ -340,8 +341,6 @@ class ViolationService:
             HTTPException: If detection not found or invalid
         """
         from app.models.ai_detection import AIDetection, DetectionType, ReviewStatus
-        from app.models.CameraVideo import CameraVideo
-        from app.models.camera import Camera
         
         # Get the detection
         detection = self.db.query(AIDetection).filter(
@@ -378,91 +377,27 @@ class ViolationService:
                     detail=f"Violation already exists for this detection (ID: {detection.violation_id})"
                 )
         
-        # Get video and camera information for context
-        video = self.db.query(CameraVideo).filter(
-            CameraVideo.id == detection.video_id
-        ).first()
-        
-        camera = None
-        if video:
-            camera = self.db.query(Camera).filter(
-                Camera.id == video.camera_id
-            ).first()
-        
-        # Extract violation data from detection
-        violation_data = detection.detection_data
-        license_plate = violation_data.get('license_plate', 'UNKNOWN')
-        violation_type = violation_data.get('violation_type', 'Unknown Violation')
-        vehicle_type = violation_data.get('vehicle_type')
-        vehicle_color = violation_data.get('vehicle_color')
-        vehicle_brand = violation_data.get('vehicle_brand')
-        description = violation_data.get('description')
-        
-        # Prepare evidence images - include video thumbnail and cloudinary URL
-        evidence_images = []
-        if video:
-            if video.thumbnail_url:
-                evidence_images.append(video.thumbnail_url)
-            if video.cloudinary_url:
-                evidence_images.append(video.cloudinary_url)
-        
-        # Create violation record
-        violation = Violation(
-            license_plate=license_plate,
-            vehicle_type=vehicle_type,
-            vehicle_color=vehicle_color,
-            vehicle_brand=vehicle_brand,
-            violation_type=violation_type,
-            violation_description=description,
-            location_name=camera.location if camera else None,
-            latitude=camera.latitude if camera else None,
-            longitude=camera.longitude if camera else None,
-            camera_id=str(camera.camera_id) if camera else None,
-            video_id=detection.video_id,  # Link video evidence directly
-            detected_at=detection.detected_at,
-            confidence_score=float(detection.confidence_score),
-            evidence_images=evidence_images,
-            status="ai_detected",  # Set status to ai_detected as per requirement
-            priority="medium",  # Default priority
-            ai_metadata={
-                'detection_id': detection.id,
-                'video_id': detection.video_id,
-                'video_url': video.cloudinary_url if video else None,
-                'frame_timestamp': float(detection.frame_timestamp),
-                'detection_data': violation_data,
-                'reviewed_by': detection.reviewed_by,
-                'reviewed_at': detection.reviewed_at.isoformat() if detection.reviewed_at else None
-            }
-        )
-        
-        # Assign to officer if provided
+        # Verify officer exists before anything is written
         if officer_id:
-            # Verify officer exists
             officer = self.db.query(User).filter(User.id == officer_id).first()
             if not officer:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Officer with ID {officer_id} not found"
                 )
-            violation.reviewed_by = officer_id
-        
-        # Save violation
-        self.db.add(violation)
-        self.db.flush()
-        
-        # Link violation back to detection
-        detection.violation_id = violation.id
-        
-        # Update video violation count
-        if video:
-            video.has_violations = True
-            video.violation_count = self.db.query(AIDetection).filter(
-                AIDetection.video_id == video.id,
-                AIDetection.violation_id.isnot(None)
-            ).count()
         
+        # Video/camera context, rule, evidence clip, detection link and video counter
+        # are handled set-based by the conversion service
+        created = violation_conversion_service.convert(
+            self.db,
+            [detection],
+            status="ai_detected",  # Set status to ai_detected as per requirement
+            officer_id=officer_id,
+            approve=False  # Already approved by the reviewer
+        )
         self.db.commit()
-        self.db.refresh(violation)
+        
+        violation = self.db.query(Violation).filter(Violation.id == created[detection.id]).first()
         
         # Send notification to admins about new violation
         try:
@@ -0,0 +1,148 @@
+"""
+Per-stage timing for the video analysis pipeline.
+
+StageTimer accumulates wall time, CPU time and frame counts per stage and
+reports the peak RSS of the job. NullStageTimer has the same interface and
+does nothing, so the hot loop costs two no-op calls per stage when
+profiling is disabled.
+
+CPU time and peak RSS come from process-wide counters, so they are exact
+only when the job is the only one timed in its process (prefork children).
+With threaded pools or the inference server several jobs share the
+counters: CPU time includes the other jobs' work and the peak RSS is reset
+only when no other timer is active, so it covers the whole overlap. Such
+timings are marked ``"overlap": true``.
+"""
+
+import time
+import weakref
+import resource
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+# Version of the compact format stored in VideoProcessingJob.stage_timings
+STAGE_TIMINGS_VERSION = 1
+
+
+def _read_peak_rss_kb() -> int:
+    """Peak resident set size (VmHWM) of the current process in KB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak_rss():
+    """Reset VmHWM so the peak covers one job, not the worker's lifetime (process-wide)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# Timers of jobs still running in this process
+_active_timers: "weakref.WeakSet[StageTimer]" = weakref.WeakSet()
+_active_lock = threading.Lock()
+
+
+class StageTimer:
+    """Accumulates timings per named stage."""
+
+    enabled = True
+
+    def __init__(self):
+        # name -> [wall seconds, cpu seconds, frames]
+        self._stages: Dict[str, list] = {}
+        self.overlap = False
+        with _active_lock:
+            if _active_timers:
+                # Another job is being measured: keep its peak, share the counters
+                self.overlap = True
+                for timer in _active_timers:
+                    timer.overlap = True
+            else:
+                _reset_peak_rss()
+            _active_timers.add(self)
+
+    def close(self):
+        """Stop sharing the process counters; called by to_dict."""
+        with _active_lock:
+            _active_timers.discard(self)
+
+    def start(self) -> Tuple[float, float]:
+        return time.perf_counter(), time.process_time()
+
+    def stop(self, name: str, token: Tuple[float, float], frames: int = 1):
+        wall = time.perf_counter() - token[0]
+        cpu = time.process_time() - token[1]
+        self.add(name, wall, cpu, frames)
+
+    def add(self, name: str, wall: float, cpu: float, frames: int = 0):
+        stage = self._stages.get(name)
+        if stage is None:
+            self._stages[name] = [wall, cpu, frames]
+        else:
+            stage[0] += wall
+            stage[1] += cpu
+            stage[2] += frames
+
+    @contextmanager
+    def stage(self, name: str, frames: int = 0):
+        token = self.start()
+        try:
+            yield
+        finally:
+            self.stop(name, token, frames)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Compact representation:
+            {"v": 1, "stages": {name: [wall_ms, cpu_ms, frames]}, "peak_rss_kb": int, "overlap": bool}
+        """
+        self.close()
+        return {
+            'v': STAGE_TIMINGS_VERSION,
+            'stages': {
+                name: [round(wall * 1000, 1), round(cpu * 1000, 1), frames]
+                for name, (wall, cpu, frames) in self._stages.items()
+            },
+            'peak_rss_kb': _read_peak_rss_kb(),
+            'overlap': self.overlap
+        }
+
+
+class NullStageTimer:
+    """Disabled timer with the same interface as StageTimer."""
+
+    enabled = False
+
+    def start(self) -> None:
+        return None
+
+    def stop(self, name: str, token: Any, frames: int = 1):
+        pass
+
+    def add(self, name: str, wall: float, cpu: float, frames: int = 0):
+        pass
+
+    def stage(self, name: str, frames: int = 0):
+        return nullcontext()
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+def create_stage_timer():
+    """Create a timer honouring PIPELINE_PROFILING_ENABLED."""
+    if settings.PIPELINE_PROFILING_ENABLED:
+        return StageTimer()
+    return NullStageTimer()
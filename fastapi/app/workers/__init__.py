@@ -4,6 +4,7 @@ Background workers for video and detection processing.
 This package contains Celery workers for:
 - Video processing (upload, analysis, thumbnail generation)
 - Detection processing (AI analysis results)
+- Database maintenance (monthly partitions)
 
 Requirements: 5.1, 5.2
 """
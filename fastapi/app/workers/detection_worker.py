@@ -17,8 +17,8 @@ from sqlalchemy.orm import Session
 
 from app.core.celery_config import celery_app
 from app.core.database import SessionLocal
-from app.models.ai_detection import AIDetection, DetectionType, ReviewStatus
-from app.models.violation import Violation
+from app.models.ai_detection import AIDetection, DetectionType
+from app.services.violation_conversion_service import violation_conversion_service
 
 logger = logging.getLogger(__name__)
 
@@ -53,8 +53,10 @@ def process_detection_task(self, detection_id: int) -> Dict[str, Any]:
     try:
         logger.info(f"Processing detection {detection_id}")
         
-        # Get detection
-        detection = db.query(AIDetection).filter(AIDetection.id == detection_id).first()
+        # Get detection (locked so a concurrent batch cannot convert it twice)
+        detection = db.query(AIDetection).filter(
+            AIDetection.id == detection_id
+        ).with_for_update().first()
         if not detection:
             error_msg = f"Detection {detection_id} not found"
             logger.error(error_msg)
@@ -72,20 +74,16 @@ def process_detection_task(self, detection_id: int) -> Dict[str, Any]:
             logger.info(f"Creating violation for high-confidence detection {detection_id}")
             
             # Create violation record
-            violation = create_violation_from_detection(db, detection)
+            created = violation_conversion_service.convert(db, [detection])
+            db.commit()
             
-            if violation:
-                detection.violation_id = violation.id
-                detection.reviewed = True
-                detection.review_status = ReviewStatus.APPROVED
-                db.commit()
-                
-                logger.info(f"Created violation {violation.id} from detection {detection_id}")
+            if detection_id in created:
+                logger.info(f"Created violation {created[detection_id]} from detection {detection_id}")
                 
                 return {
                     'success': True,
                     'detection_id': detection_id,
-                    'violation_id': violation.id,
+                    'violation_id': created[detection_id],
                     'action': 'violation_created'
                 }
         
@@ -100,6 +98,7 @@ def process_detection_task(self, detection_id: int) -> Dict[str, Any]:
     except Exception as e:
         error_msg = f"Error processing detection: {str(e)}"
         logger.error(error_msg, exc_info=True)
+        db.rollback()
         
         # Retry the task
         raise self.retry(exc=e)
@@ -120,16 +119,14 @@ def batch_process_detections_task(
     try:
         logger.info(f"Batch processing detections for video {video_id}")
         
-        # Get all high-confidence violation detections for the video
-        detections = db.query(AIDetection).filter(
-            AIDetection.video_id == video_id,
-            AIDetection.detection_type == DetectionType.VIOLATION,
-            AIDetection.confidence_score >= min_confidence,
-            AIDetection.violation_id.is_(None),
-            AIDetection.reviewed == False
-        ).all()
+        # Convert the whole batch with one INSERT ... RETURNING and one UPDATE ... FROM;
+        # rows another batch is converting are skipped instead of converted twice
+        created = violation_conversion_service.convert_video(db, video_id, min_confidence=min_confidence)
+        violations_created = len(created)
+        
+        db.commit()
         
-        if not detections:
+        if not created:
             logger.info(f"No detections to process for video {video_id}")
             return {
                 'success': True,
@@ -138,28 +135,14 @@ def batch_process_detections_task(
                 'message': 'No detections to process'
             }
         
-        # Process each detection
-        violations_created = 0
-        for detection in detections:
-            try:
-                violation = create_violation_from_detection(db, detection)
-                if violation:
-                    detection.violation_id = violation.id
-                    detection.reviewed = True
-                    detection.review_status = ReviewStatus.APPROVED
-                    violations_created += 1
-            except Exception as e:
-                logger.error(f"Error processing detection {detection.id}: {e}")
-        
-        db.commit()
-        
-        logger.info(f"Batch processed {len(detections)} detections, created {violations_created} violations")
+        logger.info(f"Batch processed video {video_id}, created {violations_created} violations")
         
         return {
             'success': True,
             'video_id': video_id,
-            'processed': len(detections),
-            'violations_created': violations_created
+            'processed': violations_created,
+            'violations_created': violations_created,
+            'violation_ids': list(created.values())
         }
         
     except Exception as e:
@@ -173,47 +156,6 @@ def batch_process_detections_task(
         }
 
 
-def create_violation_from_detection(db: Session, detection: AIDetection) -> Violation:
-    try:
-        # Extract violation data from detection
-        detection_data = detection.detection_data or {}
-        
-        # Get violation type from detection data
-        violation_type = detection_data.get('violation_type', 'unknown')
-        license_plate = detection_data.get('license_plate', 'UNKNOWN')
-        vehicle_type = detection_data.get('vehicle_type', 'car')
-        description = detection_data.get('description', f'AI detected {violation_type}')
-        
-        # Create violation record
-        violation = Violation(
-            license_plate=license_plate,
-            violation_type=violation_type,
-            description=description,
-            status='ai_detected',
-            confidence_score=detection.confidence_score,
-            detected_at=detection.detected_at,
-            video_id=detection.video_id,
-            frame_timestamp=detection.frame_timestamp,
-            metadata={
-                'detection_id': detection.id,
-                'vehicle_type': vehicle_type,
-                'ai_generated': True,
-                'bbox': detection_data.get('bbox')
-            }
-        )
-        
-        db.add(violation)
-        db.flush()  # Get the violation ID without committing
-        
-        logger.info(f"Created violation {violation.id} from detection {detection.id}")
-        
-        return violation
-        
-    except Exception as e:
-        logger.error(f"Error creating violation from detection: {e}")
-        return None
-
-
 @celery_app.task(
     bind=True,
     base=DatabaseTask,
@@ -0,0 +1,69 @@
+"""
+Maintenance Worker for Celery.
+
+This worker handles:
+- Monthly partitions of ai_detections and audit_logs (pre-create, expire)
+- Compaction of detections of old videos
+
+Requirements: 5.1, 5.2
+"""
+
+import logging
+from typing import Dict, Any
+
+from app.core.celery_config import celery_app
+from app.services.partition_service import partition_service
+from app.services.detection_compaction_service import detection_compaction_service
+from app.workers.video_worker import DatabaseTask
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.maintenance_worker.maintain_partitions_task"
+)
+def maintain_partitions_task(self) -> Dict[str, Any]:
+    db = self.db
+
+    try:
+        tables = partition_service.run_maintenance(db)
+        return {
+            'success': True,
+            'tables': tables
+        }
+
+    except Exception as e:
+        error_msg = f"Error maintaining partitions: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {
+            'success': False,
+            'error': error_msg
+        }
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.maintenance_worker.compact_detections_task"
+)
+def compact_detections_task(self, limit: int = None) -> Dict[str, Any]:
+    db = self.db
+
+    try:
+        result = detection_compaction_service.run(db, limit=limit)
+        return {
+            'success': True,
+            **result
+        }
+
+    except Exception as e:
+        error_msg = f"Error compacting detections: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {
+            'success': False,
+            'error': error_msg
+        }
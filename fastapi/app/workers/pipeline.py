@@ -0,0 +1,293 @@
+"""
+Per-video processing pipeline for Celery.
+
+After an upload (or a re-analysis request) the stages of one video run as
+an explicit workflow instead of being picked up by polling tasks:
+
+    chord(group(thumbnail, analysis), violations) | notify
+
+- thumbnail: decode the first frame and publish it (skipped when present)
+- analysis: act as a claim token, then wait for the video's AI_ANALYSIS
+  job. The token claims the next job by priority and per-camera fair share
+  (VideoProcessingService.claim_next_jobs), which may be another camera's
+  job; this job is then run by another token. Lease, heartbeat and retry
+  backoff work as for any other job
+- violations: convert the high-confidence violation detections
+- notify: notify admins of the violations created
+
+Every stage is keyed by video (and analysis job) and idempotent, so a
+redelivered or retried stage does not redo finished work: the thumbnail is
+skipped when already local, the analysis claim is atomic, detections are
+converted once (SKIP LOCKED, only unlinked rows) and notified violation IDs
+are recorded on the job.
+
+Requirements: 5.1, 5.2
+"""
+
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from celery import chord, group
+
+from app.core.config import settings
+from app.core.celery_config import celery_app
+from app.core.worker_runtime import worker_runtime
+from app.models.CameraVideo import CameraVideo
+from app.models.video_processing_job import VideoProcessingJob, JobStatus
+from app.services.video_processing_service import video_processing_service, worker_identity
+from app.services.thumbnail_service import thumbnail_service
+from app.services.violation_conversion_service import violation_conversion_service
+from app.services.notification_service import NotificationService
+from app.services.job_cost_service import job_cost_service
+from app.workers.video_worker import DatabaseTask
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks while another worker holds the analysis job. Waiting
+# stops once the current attempt is past its analysis timeout and lease.
+ANALYSIS_WAIT_SECONDS = 30
+ANALYSIS_MAX_WAIT_SECONDS = 300
+
+
+def _analysis_deadline(job: VideoProcessingJob, now: datetime) -> float:
+    """
+    Latest time (epoch seconds) to keep waiting for the current attempt of a job.
+
+    The attempt starts at ``next_run_at`` when that is still ahead, and must
+    finish within its analysis timeout; after that its lease expires too.
+    """
+    start = max(now, job.next_run_at or now)
+    wait = video_processing_service.analysis_timeout(job) + settings.JOB_LEASE_SECONDS + ANALYSIS_MAX_WAIT_SECONDS
+    return time.time() + (start - now).total_seconds() + wait
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.pipeline.thumbnail_stage",
+    max_retries=2,
+    default_retry_delay=60
+)
+def thumbnail_stage(self, video_id: int) -> Dict[str, Any]:
+    db = self.db
+
+    try:
+        video = db.query(CameraVideo).filter(CameraVideo.id == video_id).first()
+        if not video:
+            return {'success': False, 'video_id': video_id, 'error': f"Video {video_id} not found"}
+
+        if (video.video_metadata or {}).get('local_thumbnail') and video.thumbnail_url:
+            db.rollback()
+            return {'success': True, 'video_id': video_id, 'thumbnail_url': video.thumbnail_url, 'skipped': True}
+
+        # The upload already set a Cloudinary transformation URL, kept if decoding fails.
+        # A concurrent run overwrites the same public ID, so no lock is held while decoding
+        thumbnail_url = thumbnail_service.generate_thumbnail(db, video, timestamp=0.0)
+
+        return {
+            'success': True,
+            'video_id': video_id,
+            'thumbnail_url': thumbnail_url or video.thumbnail_url
+        }
+
+    except Exception as e:
+        # Previews are best effort: never block the analysis branch of the chord
+        error_msg = f"Error generating thumbnail: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        return {'success': False, 'video_id': video_id, 'error': error_msg}
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.pipeline.analysis_stage",
+    max_retries=None
+)
+def analysis_stage(
+    self,
+    video_id: int,
+    job_id: int,
+    heavy: Optional[bool] = None,
+    deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    db = self.db
+
+    try:
+        job = db.query(VideoProcessingJob).filter(VideoProcessingJob.id == job_id).first()
+        if not job:
+            return {'success': False, 'video_id': video_id, 'job_id': job_id, 'error': f"Job {job_id} not found"}
+
+        claimed = False
+        if job.status == JobStatus.PENDING:
+            # Claim like a token so priority and camera fair share decide what runs next
+            claimed = worker_runtime.run(
+                video_processing_service.process_next_job(db, worker_id=worker_identity(), heavy=heavy)
+            ) is not None
+            db.expire_all()
+            job = db.query(VideoProcessingJob).filter(VideoProcessingJob.id == job_id).first()
+
+        if job.status == JobStatus.COMPLETED:
+            return {
+                'success': True,
+                'video_id': video_id,
+                'job_id': job_id,
+                'saved_counts': (job.result_data or {}).get('saved_counts')
+            }
+        if job.status == JobStatus.FAILED:
+            return {'success': False, 'video_id': video_id, 'job_id': job_id, 'error': job.error_message}
+
+        # Processing elsewhere, queued behind fairer jobs, or back to PENDING
+        # until its retry backoff elapses
+        now = datetime.utcnow()
+        countdown = ANALYSIS_WAIT_SECONDS
+        if job.status == JobStatus.PENDING and job.next_run_at:
+            countdown = (job.next_run_at - now).total_seconds()
+        countdown = min(max(countdown, ANALYSIS_WAIT_SECONDS), ANALYSIS_MAX_WAIT_SECONDS)
+
+        # The wait is extended while the queue moves (this stage ran a job) or a
+        # new attempt was scheduled; the retry policy bounds the attempts
+        rescheduled = job.status == JobStatus.PENDING and job.next_run_at and job.next_run_at > now
+        if deadline is None or claimed or rescheduled:
+            deadline = max(deadline or 0, _analysis_deadline(job, now))
+        status_value = job.status.value
+        db.rollback()
+
+    except Exception as e:
+        error_msg = f"Error in analysis stage: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {'success': False, 'video_id': video_id, 'job_id': job_id, 'error': error_msg}
+
+    if time.time() + countdown > deadline:
+        # Stuck in a non-terminal state: release the chord instead of polling forever
+        error_msg = f"Analysis job {job_id} still {status_value} after its deadline"
+        logger.error(error_msg)
+        return {'success': False, 'video_id': video_id, 'job_id': job_id, 'error': error_msg}
+
+    logger.info(f"Analysis job {job_id} is {status_value}, checking again in {countdown:.0f}s")
+    raise self.retry(countdown=countdown, kwargs={'heavy': heavy, 'deadline': deadline})
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.pipeline.violations_stage"
+)
+def violations_stage(
+    self,
+    stage_results: List[Dict[str, Any]],
+    video_id: int,
+    job_id: int,
+    min_confidence: float = 0.85
+) -> Dict[str, Any]:
+    db = self.db
+
+    analysis = next((result for result in stage_results if result and 'job_id' in result), None)
+    if not analysis or not analysis.get('success'):
+        logger.info(f"Skipping violation creation for video {video_id}: analysis did not complete")
+        return {'success': False, 'video_id': video_id, 'job_id': job_id, 'skipped': True}
+
+    try:
+        created = violation_conversion_service.convert_video(db, video_id, min_confidence=min_confidence)
+        db.commit()
+
+        if created:
+            logger.info(f"Pipeline created {len(created)} violations for video {video_id}")
+
+        return {
+            'success': True,
+            'video_id': video_id,
+            'job_id': job_id,
+            'violation_ids': list(created.values())
+        }
+
+    except Exception as e:
+        error_msg = f"Error creating violations: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {'success': False, 'video_id': video_id, 'job_id': job_id, 'error': error_msg}
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.pipeline.notify_stage"
+)
+def notify_stage(self, violations_result: Dict[str, Any], video_id: int, job_id: int) -> Dict[str, Any]:
+    db = self.db
+
+    violation_ids = violations_result.get('violation_ids') or []
+    if not violation_ids:
+        return {'success': True, 'video_id': video_id, 'notified': 0}
+
+    try:
+        job = db.query(VideoProcessingJob).filter(
+            VideoProcessingJob.id == job_id
+        ).with_for_update().first()
+        result_data = dict(job.result_data or {}) if job else {}
+        pipeline = dict(result_data.get('pipeline') or {})
+        notified = set(pipeline.get('notified_violation_ids') or [])
+
+        notification_service = NotificationService(db)
+        sent = []
+        for violation_id in violation_ids:
+            if violation_id in notified:
+                continue
+            notification_service.notify_admin_new_violation(violation_id=violation_id)
+            sent.append(violation_id)
+
+        if job is not None:
+            pipeline['notified_violation_ids'] = sorted(notified.union(sent))
+            # Reassign so the JSONB change is picked up by the session
+            job.result_data = {**result_data, 'pipeline': pipeline}
+        db.commit()
+
+        return {'success': True, 'video_id': video_id, 'notified': len(sent)}
+
+    except Exception as e:
+        error_msg = f"Error sending pipeline notifications: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {'success': False, 'video_id': video_id, 'error': error_msg}
+
+
+def build_video_pipeline(video_id: int, job_id: int, estimated_cost_seconds: Optional[float] = None):
+    """
+    Celery canvas of the processing stages of one video.
+
+    Heavy analyses run on the video_processing_heavy queue with its long
+    time limit and claim only heavy jobs, like claim tokens (see
+    queue_claim_token).
+    """
+    if job_cost_service.is_heavy(estimated_cost_seconds):
+        analysis = analysis_stage.si(video_id, job_id, heavy=True).set(
+            queue='video_processing_heavy',
+            time_limit=settings.JOB_HEAVY_TIME_LIMIT_SECONDS + 300,
+            soft_time_limit=settings.JOB_HEAVY_TIME_LIMIT_SECONDS
+        )
+    else:
+        analysis = analysis_stage.si(video_id, job_id, heavy=False).set(queue='video_processing')
+
+    return chord(
+        group(thumbnail_stage.si(video_id).set(queue='video_processing'), analysis),
+        violations_stage.s(video_id, job_id).set(queue='detection_processing')
+    ) | notify_stage.s(video_id, job_id).set(queue='detection_processing')
+
+
+def start_video_pipeline(job: VideoProcessingJob):
+    """
+    Start the pipeline of an AI_ANALYSIS job, or queue a claim token when
+    VIDEO_PIPELINE_ENABLED is off.
+    """
+    if not settings.VIDEO_PIPELINE_ENABLED:
+        from app.workers.video_worker import queue_claim_token
+
+        queue_claim_token(job.estimated_cost_seconds)
+        return None
+
+    return build_video_pipeline(job.video_id, job.id, job.estimated_cost_seconds).apply_async()
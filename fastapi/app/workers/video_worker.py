@@ -3,24 +3,30 @@ Video Processing Worker for Celery.
 
 This worker handles:
 - Video processing tasks (AI analysis, thumbnail generation)
-- Retry logic for failed jobs
+- Evidence clip extraction around detected violations
+- Retry of failed jobs with jittered backoff (next_run_at)
+- Reclaiming jobs whose worker lease expired
 - Periodic cleanup of old jobs
 
 Requirements: 5.1, 5.2, 5.4
 """
 
 import logging
-import asyncio
 from typing import Dict, Any
 from datetime import datetime, timedelta
 
 from celery import Task
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.celery_config import celery_app
 from app.core.database import SessionLocal
-from app.services.video_processing_service import video_processing_service
-from app.models.video_processing_job import VideoProcessingJob, JobStatus
+from app.core.worker_runtime import worker_runtime
+from app.services.video_processing_service import video_processing_service, worker_identity
+from app.services.evidence_clip_service import evidence_clip_service
+from app.services.job_cost_service import job_cost_service
+from app.services.result_blob_store import result_blob_store
+from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
 
 logger = logging.getLogger(__name__)
 
@@ -79,26 +85,14 @@ def process_video_task(self, job_id: int) -> Dict[str, Any]:
                 'results': job.result_data
             }
         
-        if job.status == JobStatus.PROCESSING:
-            logger.warning(f"Job {job_id} is already being processed")
-            return {
-                'success': False,
-                'job_id': job_id,
-                'error': 'Job is already being processed'
-            }
-        
-        # Process the video using async service
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(
-                video_processing_service.process_video(db, job_id)
-            )
-        finally:
-            loop.close()
+        # Claiming is atomic in the service: a job another worker holds is skipped there
+        result = worker_runtime.run(
+            video_processing_service.process_video(db, job_id, worker_id=worker_identity())
+        )
         
-        if result['success']:
+        if not result.get('claimed', True):
+            logger.info(f"Job {job_id} not claimed ({result.get('status')})")
+        elif result['success']:
             logger.info(f"Video processing completed successfully for job {job_id}")
         else:
             logger.error(f"Video processing failed for job {job_id}: {result.get('error')}")
@@ -127,6 +121,169 @@ def process_video_task(self, job_id: int) -> Dict[str, Any]:
         raise self.retry(exc=e)
 
 
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.video_worker.extract_evidence_clips_task",
+    max_retries=2,
+    default_retry_delay=120
+)
+def extract_evidence_clips_task(self, video_id: int) -> Dict[str, Any]:
+    db = self.db
+    
+    try:
+        logger.info(f"Extracting evidence clips for video {video_id}")
+        
+        result = evidence_clip_service.extract_clips_for_video(db, video_id)
+        
+        return {
+            'success': True,
+            **result
+        }
+        
+    except ValueError as e:
+        logger.error(f"Cannot extract evidence clips: {e}")
+        return {
+            'success': False,
+            'video_id': video_id,
+            'error': str(e)
+        }
+    except Exception as e:
+        error_msg = f"Error extracting evidence clips: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        raise self.retry(exc=e)
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.video_worker.process_next_job_task"
+)
+def process_next_job_task(self, job_type: str = None, heavy: bool = None) -> Dict[str, Any]:
+    db = self.db
+    
+    try:
+        result = worker_runtime.run(
+            video_processing_service.process_next_job(
+                db,
+                worker_id=worker_identity(),
+                job_type=JobType(job_type) if job_type else None,
+                heavy=heavy
+            )
+        )
+        
+        if result is None:
+            return {
+                'success': True,
+                'processed': 0,
+                'message': 'No pending jobs'
+            }
+        return result
+        
+    except Exception as e:
+        error_msg = f"Error processing next job: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {
+            'success': False,
+            'error': error_msg
+        }
+
+
+def queue_claim_token(estimated_cost_seconds: float = None):
+    """
+    Ask one worker to claim the next job.
+    
+    Tokens carry no job ID: the worker picks by priority and per-camera fair
+    share. Jobs the cost model marks heavy get their token on the
+    video_processing_heavy queue, whose workers run with a long time limit.
+    """
+    if job_cost_service.is_heavy(estimated_cost_seconds):
+        process_next_job_task.apply_async(
+            kwargs={'heavy': True},
+            queue='video_processing_heavy',
+            time_limit=settings.JOB_HEAVY_TIME_LIMIT_SECONDS + 300,
+            soft_time_limit=settings.JOB_HEAVY_TIME_LIMIT_SECONDS
+        )
+    else:
+        process_next_job_task.apply_async(kwargs={'heavy': False}, queue='video_processing')
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.video_worker.reclaim_expired_jobs_task"
+)
+def reclaim_expired_jobs_task(self, limit: int = 100) -> Dict[str, Any]:
+    db = self.db
+    
+    try:
+        # Reclaimed jobs wait for their backoff; dispatch_due_retries_task queues them
+        reclaimed = video_processing_service.reclaim_expired_leases(db, limit=limit)
+        
+        if reclaimed:
+            logger.info(f"Reclaimed {len(reclaimed)} jobs with expired leases")
+        
+        return {
+            'success': True,
+            'reclaimed': len(reclaimed)
+        }
+        
+    except Exception as e:
+        error_msg = f"Error reclaiming expired jobs: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {
+            'success': False,
+            'error': error_msg
+        }
+
+
+@celery_app.task(
+    bind=True,
+    base=DatabaseTask,
+    name="app.workers.video_worker.dispatch_due_retries_task"
+)
+def dispatch_due_retries_task(self, limit: int = 100) -> Dict[str, Any]:
+    db = self.db
+    
+    try:
+        due_jobs = video_processing_service.dispatch_due_retries(db, limit=limit)
+        
+        queued_count = 0
+        for job in due_jobs:
+            try:
+                if job.job_type == JobType.AI_ANALYSIS and not job.retry_count:
+                    # Never attempted: an upload deferred by admission control, run it end to end
+                    from app.workers.pipeline import start_video_pipeline
+                    
+                    start_video_pipeline(job)
+                else:
+                    queue_claim_token(job.estimated_cost_seconds)
+                queued_count += 1
+            except Exception as e:
+                logger.error(f"Error queueing retry of job {job.id}: {e}")
+        
+        if due_jobs:
+            logger.info(f"Dispatched {queued_count} due job retries")
+        
+        return {
+            'success': True,
+            'due': len(due_jobs),
+            'queued': queued_count
+        }
+        
+    except Exception as e:
+        error_msg = f"Error dispatching due retries: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        db.rollback()
+        return {
+            'success': False,
+            'error': error_msg
+        }
+
+
 @celery_app.task(
     bind=True,
     base=DatabaseTask,
@@ -156,11 +313,7 @@ def process_pending_jobs_task(self, limit: int = 10) -> Dict[str, Any]:
         queued_count = 0
         for job in pending_jobs:
             try:
-                # Queue the job asynchronously
-                process_video_task.apply_async(
-                    args=[job.id],
-                    queue='video_processing'
-                )
+                queue_claim_token(job.estimated_cost_seconds)
                 queued_count += 1
                 logger.info(f"Queued job {job.id} for processing")
             except Exception as e:
@@ -194,31 +347,18 @@ def retry_failed_jobs_task(self, max_age_hours: int = 24) -> Dict[str, Any]:
     try:
         logger.info(f"Retrying failed jobs (max age: {max_age_hours} hours)")
         
-        # Retry failed jobs
+        # Retry failed jobs; each gets a jittered next_run_at and is queued by
+        # dispatch_due_retries_task when it comes due, not all at once here
         retried_jobs = video_processing_service.retry_failed_jobs(
             db=db,
             max_age_hours=max_age_hours
         )
         
-        # Queue retried jobs for processing
-        queued_count = 0
-        for job in retried_jobs:
-            try:
-                process_video_task.apply_async(
-                    args=[job.id],
-                    queue='video_processing'
-                )
-                queued_count += 1
-                logger.info(f"Queued failed job {job.id} for retry")
-            except Exception as e:
-                logger.error(f"Error queueing job {job.id} for retry: {e}")
-        
-        logger.info(f"Retried {queued_count} failed jobs")
+        logger.info(f"Scheduled {len(retried_jobs)} failed jobs for retry")
         
         return {
             'success': True,
-            'retried': queued_count,
-            'total_failed': len(retried_jobs)
+            'retried': len(retried_jobs)
         }
         
     except Exception as e:
@@ -244,13 +384,26 @@ def cleanup_old_jobs_task(self, days: int = 30) -> Dict[str, Any]:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
         # Delete old completed and failed jobs
-        deleted_count = db.query(VideoProcessingJob).filter(
+        old_jobs = db.query(VideoProcessingJob).filter(
             VideoProcessingJob.status.in_([JobStatus.COMPLETED, JobStatus.FAILED]),
             VideoProcessingJob.updated_at < cutoff_date
-        ).delete(synchronize_session=False)
+        )
+        references = [
+            result_data['full_result']
+            for (result_data,) in old_jobs.with_entities(VideoProcessingJob.result_data)
+            if result_data and result_data.get('full_result')
+        ]
+        deleted_count = old_jobs.delete(synchronize_session=False)
         
         db.commit()
         
+        # Their full result blobs go with them
+        for reference in references:
+            try:
+                result_blob_store.delete(reference, remote=settings.RESULT_BLOB_UPLOAD)
+            except Exception as e:
+                logger.warning(f"Failed to delete result blob {reference.get('key')}: {e}")
+        
         logger.info(f"Cleaned up {deleted_count} old jobs")
         
         return {
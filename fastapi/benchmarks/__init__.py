@@ -0,0 +1,7 @@
+"""
+Offline benchmarks for the AI video pipeline.
+
+Chạy từ thư mục fastapi/:
+    python -m benchmarks.run_pipeline --detector stub
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
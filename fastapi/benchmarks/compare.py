@@ -0,0 +1,56 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/abc123_stub.json benchmarks/results/def456_stub.json
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Any
+
+
+def load_runs(path: str) -> Dict[tuple, Dict[str, Any]]:
+    with open(path) as f:
+        report = json.load(f)
+    # Keep the fastest of repeated runs
+    runs = {}
+    for run in report['runs']:
+        key = (run['video'], run['detector'])
+        if key not in runs or run['wall_s'] < runs[key]['wall_s']:
+            runs[key] = run
+    return runs
+
+
+def change(old, new) -> str:
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load_runs(args.baseline), load_runs(args.candidate)
+
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        print(f"{key[0]} [{key[1]}]")
+        print(f"  fps decoded   {old['fps_decoded']:>10} -> {new['fps_decoded']:<10} {change(old['fps_decoded'], new['fps_decoded'])}")
+        print(f"  peak rss kb   {old['peak_rss_kb']:>10} -> {new['peak_rss_kb']:<10} {change(old['peak_rss_kb'], new['peak_rss_kb'])}")
+        if 'db_write_ms' in old and 'db_write_ms' in new:
+            print(f"  db write ms   {old['db_write_ms']:>10} -> {new['db_write_ms']:<10} {change(old['db_write_ms'], new['db_write_ms'])}")
+        for stage in sorted(old['stage_ms_per_frame'].keys() | new['stage_ms_per_frame'].keys()):
+            before = old['stage_ms_per_frame'].get(stage)
+            after = new['stage_ms_per_frame'].get(stage)
+            print(f"  {stage + ' ms/frame':<13} {str(before):>10} -> {str(after):<10} {change(before, after)}")
+
+    for key in sorted(baseline.keys() ^ candidate.keys()):
+        print(f"{key[0]} [{key[1]}] only in {'baseline' if key in baseline else 'candidate'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Sweep worker concurrency x torch threads on one host.
+
+Each combination forks `concurrency` processes that apply the CPU governor
+layout and analyze the same synthetic video; the aggregate frames/sec shows
+which split of the cores gives the best throughput.
+
+    python -m benchmarks.concurrency_sweep --concurrency 1,2,4,8 --threads 1,2,4 --detector model
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("TRACK_STORE_UPLOAD", "false")
+os.environ.setdefault("TRACK_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tracks"))
+
+from benchmarks.synthetic_video import SyntheticVideoSpec, generate_video
+from benchmarks.run_pipeline import DEFAULT_VIDEO_DIR, DEFAULT_RESULTS_DIR, git_revision, create_service
+
+
+def _child(video_path: str, detector: str, concurrency: int, threads: int, index: int, pin: bool,
+           start_barrier, results):
+    import asyncio
+    from app.core.cpu_governor import plan_layout, apply_layout
+
+    layout = apply_layout(plan_layout(concurrency, threads_per_child=threads, child_index=index, pin=pin))
+    service = create_service(detector)
+
+    start_barrier.wait()
+    start = time.perf_counter()
+    analysis = asyncio.run(service.analyze_video(video_path, timeout=3600))
+    results.put({
+        'index': index,
+        'wall_s': time.perf_counter() - start,
+        'frames': analysis['frame_count'],
+        'frames_analyzed': analysis['frames_analyzed'],
+        'affinity': layout.affinity
+    })
+
+
+def run_combination(video_path: str, detector: str, concurrency: int, threads: int, pin: bool) -> Dict[str, Any]:
+    ctx = mp.get_context("fork")
+    barrier = ctx.Barrier(concurrency)
+    results = ctx.Queue()
+    children = [
+        ctx.Process(target=_child, args=(video_path, detector, concurrency, threads, i, pin, barrier, results))
+        for i in range(concurrency)
+    ]
+    for child in children:
+        child.start()
+    per_child = [results.get() for _ in children]
+    for child in children:
+        child.join()
+
+    wall = max(r['wall_s'] for r in per_child)
+    frames = sum(r['frames_analyzed'] for r in per_child)
+    return {
+        'concurrency': concurrency,
+        'threads_per_child': threads,
+        'pinned': pin,
+        'wall_s': round(wall, 3),
+        'frames_analyzed': frames,
+        'throughput_fps': round(frames / wall, 2) if wall else None,
+        'children': per_child
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sweep worker concurrency x torch threads")
+    parser.add_argument("--detector", choices=["stub", "model"], default="model")
+    parser.add_argument("--concurrency", default="1,2,4")
+    parser.add_argument("--threads", default="1,2,4")
+    parser.add_argument("--pin", action="store_true", help="Pin each child to its own cores")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    width, height = (int(n) for n in args.resolution.lower().split("x"))
+    video = generate_video(SyntheticVideoSpec(width=width, height=height, duration=args.duration), DEFAULT_VIDEO_DIR)
+
+    from app.core.cpu_governor import plan_layout
+    cores = plan_layout(1).effective_cores
+
+    runs = []
+    for concurrency in (int(c) for c in args.concurrency.split(",") if c):
+        for threads in (int(t) for t in args.threads.split(",") if t):
+            if concurrency * threads > 2 * cores:
+                # Heavily oversubscribed, not a candidate
+                continue
+            run = run_combination(video['path'], args.detector, concurrency, threads, args.pin)
+            runs.append(run)
+            print(f"concurrency {concurrency:>2} x threads {threads:>2}: {run['throughput_fps']:>8} analyzed fps")
+
+    best = max(runs, key=lambda r: r['throughput_fps'] or 0) if runs else None
+    if best:
+        print(
+            f"Best on {cores} cores: --concurrency={best['concurrency']} "
+            f"AI_TORCH_THREADS={best['threads_per_child']} ({best['throughput_fps']} fps)"
+        )
+
+    revision = git_revision()
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{revision['commit'] or 'unknown'}_sweep_{args.detector}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            'created_at': datetime.utcnow().isoformat(),
+            'revision': revision,
+            'effective_cores': cores,
+            'video': video,
+            'runs': runs,
+            'best': best
+        }, f, indent=2, default=str)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Compare write modes of AIDetectionService.save_detection_results.
+
+Needs a PostgreSQL database with the schema migrated and an existing
+camera_videos row; every run is rolled back.
+
+    python -m benchmarks.detection_writes --database-url postgresql://... --video-id 1 --rows 10000,100000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("TRACK_STORE_UPLOAD", "false")
+os.environ.setdefault("TRACK_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tracks"))
+
+from benchmarks.run_pipeline import DEFAULT_RESULTS_DIR, git_revision
+
+WRITE_MODES = ("orm", "bulk", "copy")
+
+
+def synthetic_results(rows: int, seed: int = 0) -> Dict[str, Any]:
+    """Analysis results with `rows` ai_detections rows, plus rows // 10 frames for the track store."""
+    rng = random.Random(seed)
+    frames = rows // 10
+    plates = int(rows * 0.6)
+    violations = rows - plates - 1
+
+    def bbox():
+        x, y = rng.randint(0, 1800), rng.randint(0, 1000)
+        return [x, y, x + rng.randint(40, 200), y + rng.randint(40, 200)]
+
+    return {
+        'frame_detections': [
+            {
+                'timestamp': i * 0.5,
+                'bounding_boxes': [
+                    {
+                        'x1': b[0], 'y1': b[1], 'x2': b[2], 'y2': b[3],
+                        'class_id': 2, 'class_name': 'car',
+                        'confidence': round(rng.uniform(0.4, 1.0), 4),
+                        'track_id': rng.randint(1, 500), 'license_plate': None
+                    }
+                    for b in (bbox() for _ in range(rng.randint(1, 8)))
+                ]
+            }
+            for i in range(frames)
+        ],
+        'license_plates': [
+            {
+                'plate_number': f"{rng.randint(10, 99)}A-{rng.randint(10000, 99999)}",
+                'vehicle_type': 'car', 'confidence': round(rng.uniform(0.7, 1.0), 4),
+                'bbox': bbox(), 'timestamp': rng.uniform(0, frames * 0.5),
+                'track_id': rng.randint(1, 500)
+            }
+            for _ in range(plates)
+        ],
+        'violations': [
+            {
+                'violation_type': 'red_light', 'description': 'synthetic',
+                'confidence': round(rng.uniform(0.7, 1.0), 4), 'bbox': bbox(),
+                'timestamp': rng.uniform(0, frames * 0.5), 'vehicle_type': 'car'
+            }
+            for _ in range(max(0, violations))
+        ],
+        'vehicle_counts': {'car': 500, 'motorcycle': 0, 'bus': 0, 'truck': 0, 'person': 0},
+    }
+
+
+def run_mode(database_url: str, video_id: int, results: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.services.ai_detection_service import AIDetectionService
+
+    service = AIDetectionService()
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            outer = conn.begin()
+            session = Session(bind=conn, join_transaction_mode="create_savepoint")
+            tracemalloc.start()
+            try:
+                start = time.perf_counter()
+                saved = service.save_detection_results(session, video_id, results, write_mode=mode)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+                session.close()
+                outer.rollback()
+    finally:
+        engine.dispose()
+
+    rows = saved['total']
+    return {
+        'mode': mode,
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed) if elapsed else None,
+        'track_store_frames': saved['frames'],
+        'python_peak_kb': peak // 1024
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark ai_detections write modes")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--video-id", type=int, required=True)
+    parser.add_argument("--rows", default="10000,100000")
+    parser.add_argument("--modes", default=",".join(WRITE_MODES))
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for rows in (int(r) for r in args.rows.split(",") if r):
+        for mode in (m for m in args.modes.split(",") if m):
+            # Fresh results per run: saving annotates bounding boxes in place
+            run = run_mode(args.database_url, args.video_id, synthetic_results(rows), mode)
+            runs.append(run)
+            print(f"{rows:>8} rows  {mode:<5} {run['seconds']:>8}s  {run['rows_per_second']:>8} rows/s  "
+                  f"peak {run['python_peak_kb']} KB")
+
+    revision = git_revision()
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{revision['commit'] or 'unknown'}_detection_writes.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({'created_at': datetime.utcnow().isoformat(), 'revision': revision, 'runs': runs}, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+End-to-end benchmark of AIDetectionService on synthetic videos.
+
+Examples (từ thư mục fastapi/):
+    python -m benchmarks.run_pipeline --detector stub
+    python -m benchmarks.run_pipeline --detector model --resolutions 1280x720 --durations 30
+    python -m benchmarks.run_pipeline --database-url postgresql://... --video-id 1
+
+With --database-url, detections are written for --video-id (an existing
+camera_videos row) inside a transaction that is rolled back afterwards.
+
+Results are written to benchmarks/results/<commit>_<detector>.json.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# Settings require these; the benchmark never uses them unless --database-url is given
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("TRACK_STORE_UPLOAD", "false")
+os.environ.setdefault("TRACK_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tracks"))
+
+from benchmarks.synthetic_video import SyntheticVideoSpec, generate_video
+from benchmarks.stub_detector import StubDetectorBackend
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_VIDEO_DIR = os.path.join(BENCHMARK_DIR, ".videos")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=BENCHMARK_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git("rev-parse", "--short", "HEAD"),
+        'dirty': bool(git("status", "--porcelain", "--untracked-files=no"))
+    }
+
+
+def create_service(detector: str):
+    from app.services.ai_detection_service import AIDetectionService
+
+    service = AIDetectionService()
+    if detector == "stub":
+        service.backend = StubDetectorBackend()
+    if not service.load_model():
+        raise RuntimeError(f"Detector '{detector}' could not be loaded")
+    return service
+
+
+def time_db_write(database_url: str, video_id: int, service, results: Dict[str, Any]) -> Dict[str, Any]:
+    """Time save_detection_results against a real database, then roll back."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            outer = conn.begin()
+            session = Session(bind=conn, join_transaction_mode="create_savepoint")
+            try:
+                start = time.perf_counter()
+                saved = service.save_detection_results(db=session, video_id=video_id, analysis_results=results)
+                elapsed = time.perf_counter() - start
+            finally:
+                session.close()
+                outer.rollback()
+    finally:
+        engine.dispose()
+
+    return {'db_write_ms': round(elapsed * 1000, 1), 'saved_counts': saved}
+
+
+def run_one(service, video: Dict[str, Any], detector: str, args) -> Dict[str, Any]:
+    from app.utils.stage_timer import StageTimer
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    results = asyncio.run(service.analyze_video(video['path'], timeout=args.timeout, stage_timer=timer))
+    wall = time.perf_counter() - start
+    timings = timer.to_dict()
+
+    run = {
+        'video': os.path.basename(video['path']),
+        'spec': video['spec'],
+        'detector': detector,
+        'wall_s': round(wall, 3),
+        'frames': results['frame_count'],
+        'frames_analyzed': results['frames_analyzed'],
+        'fps_decoded': round(results['frame_count'] / wall, 1) if wall else None,
+        'fps_analyzed': round(results['frames_analyzed'] / wall, 1) if wall else None,
+        'stages': timings['stages'],
+        'stage_ms_per_frame': {
+            name: round(wall_ms / frames, 3) if frames else None
+            for name, (wall_ms, _, frames) in timings['stages'].items()
+        },
+        'peak_rss_kb': timings['peak_rss_kb'],
+        'vehicles_expected': video['vehicles'],
+        'vehicles_counted': sum(results['vehicle_counts'].values()),
+        'violations': len(results['violations']),
+    }
+
+    if args.database_url:
+        run.update(time_db_write(args.database_url, args.video_id, service, results))
+
+    return run
+
+
+def parse_resolutions(value: str) -> List[tuple]:
+    return [tuple(int(n) for n in item.lower().split("x")) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the AI video pipeline on synthetic videos")
+    parser.add_argument("--detector", choices=["stub", "model"], default="stub")
+    parser.add_argument("--resolutions", default="640x360,1280x720,1920x1080")
+    parser.add_argument("--durations", default="10,60", help="Comma-separated durations in seconds")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--vehicles-per-minute", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--timeout", type=int, default=3600)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--video-id", type=int, default=None)
+    parser.add_argument("--video-dir", default=DEFAULT_VIDEO_DIR)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    if args.database_url and args.video_id is None:
+        parser.error("--database-url requires --video-id")
+
+    service = create_service(args.detector)
+
+    runs = []
+    for width, height in parse_resolutions(args.resolutions):
+        for duration in (float(d) for d in args.durations.split(",") if d):
+            spec = SyntheticVideoSpec(
+                width=width, height=height, duration=duration,
+                fps=args.fps, vehicles_per_minute=args.vehicles_per_minute
+            )
+            video = generate_video(spec, args.video_dir)
+            for _ in range(args.repeat):
+                run = run_one(service, video, args.detector, args)
+                runs.append(run)
+                print(
+                    f"{spec.name:<28} {run['fps_decoded']:>8} fps decoded  "
+                    f"{run['fps_analyzed']:>7} fps analyzed  peak {run['peak_rss_kb'] // 1024} MB"
+                    + (f"  db {run['db_write_ms']} ms" if 'db_write_ms' in run else "")
+                )
+
+    revision = git_revision()
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'revision': revision,
+        'host': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'model': service.get_model_info(),
+        'runs': runs,
+    }
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{revision['commit'] or 'unknown'}_{args.detector}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
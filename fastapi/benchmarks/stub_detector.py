@@ -0,0 +1,48 @@
+"""
+Deterministic stand-in for the YOLO model.
+
+Implements the inference backend interface of app.ai.inference_backends
+by thresholding the synthetic vehicle colours, so benchmark runs measure
+the pipeline around the model rather than the model itself.
+"""
+
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic_video import CLASS_COLORS
+
+
+class StubDetectorBackend:
+    """Finds the coloured rectangles drawn by benchmarks.synthetic_video."""
+
+    name = "stub"
+
+    def __init__(self, min_area: int = 16, confidence: float = 0.9):
+        self.min_area = min_area
+        self.confidence = confidence
+
+    def load(self) -> bool:
+        return True
+
+    def detect(self, frame: np.ndarray, conf: float, iou: float, classes: List[int]) -> np.ndarray:
+        rows = []
+        for class_id, color in CLASS_COLORS.items():
+            if class_id not in classes or self.confidence < conf:
+                continue
+            lower = np.array([max(0, c - 40) for c in color], dtype=np.uint8)
+            upper = np.array([min(255, c + 40) for c in color], dtype=np.uint8)
+            mask = cv2.inRange(frame, lower, upper)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in contours:
+                x, y, w, h = cv2.boundingRect(contour)
+                if w * h >= self.min_area:
+                    rows.append((x, y, x + w, y + h, self.confidence, class_id))
+
+        if not rows:
+            return np.zeros((0, 6), dtype=np.float32)
+        return np.asarray(rows, dtype=np.float32)
+
+    def info(self) -> Dict[str, Any]:
+        return {'backend': self.name}
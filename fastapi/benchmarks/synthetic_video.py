@@ -0,0 +1,125 @@
+"""
+Synthetic traffic videos for benchmarks.
+
+Vehicles are solid rectangles in saturated colours moving across a grey
+road at constant speed, so a colour-threshold detector finds them exactly
+and the number of vehicles is known in advance.
+"""
+
+import os
+import random
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, List, Tuple
+
+import cv2
+import numpy as np
+
+# BGR colour per COCO class id used by AIDetectionService.vehicle_classes
+CLASS_COLORS: Dict[int, Tuple[int, int, int]] = {
+    2: (0, 255, 0),      # car
+    3: (255, 0, 0),      # motorcycle
+    5: (0, 0, 255),      # bus
+    7: (0, 255, 255),    # truck
+}
+
+# Vehicle size as a fraction of (frame width, frame height)
+CLASS_SIZES: Dict[int, Tuple[float, float]] = {
+    2: (0.08, 0.06),
+    3: (0.04, 0.04),
+    5: (0.14, 0.08),
+    7: (0.12, 0.08),
+}
+
+
+@dataclass
+class SyntheticVehicle:
+    class_id: int
+    lane: int
+    enter_at: float      # seconds
+    speed: float         # fraction of frame width per second
+
+
+@dataclass
+class SyntheticVideoSpec:
+    width: int
+    height: int
+    duration: float
+    fps: int = 30
+    lanes: int = 4
+    vehicles_per_minute: int = 60
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.width}x{self.height}_{int(self.duration)}s_{self.fps}fps"
+
+
+def plan_vehicles(spec: SyntheticVideoSpec) -> List[SyntheticVehicle]:
+    """Deterministic arrival schedule: same spec, same vehicles."""
+    rng = random.Random(spec.seed)
+    count = max(1, round(spec.vehicles_per_minute * spec.duration / 60))
+    interval = spec.duration / count
+    class_ids = sorted(CLASS_COLORS)
+    return [
+        SyntheticVehicle(
+            class_id=rng.choice(class_ids),
+            lane=i % spec.lanes,
+            enter_at=i * interval,
+            speed=rng.uniform(0.15, 0.4)
+        )
+        for i in range(count)
+    ]
+
+
+def render_frame(spec: SyntheticVideoSpec, vehicles: List[SyntheticVehicle], t: float) -> np.ndarray:
+    frame = np.full((spec.height, spec.width, 3), 90, dtype=np.uint8)
+    lane_height = spec.height / spec.lanes
+    for lane in range(1, spec.lanes):
+        y = int(lane * lane_height)
+        cv2.line(frame, (0, y), (spec.width, y), (200, 200, 200), 2)
+
+    for vehicle in vehicles:
+        if t < vehicle.enter_at:
+            continue
+        w = int(CLASS_SIZES[vehicle.class_id][0] * spec.width)
+        h = int(CLASS_SIZES[vehicle.class_id][1] * spec.height)
+        x = int((t - vehicle.enter_at) * vehicle.speed * spec.width) - w
+        if x > spec.width:
+            continue
+        y = int((vehicle.lane + 0.5) * lane_height - h / 2)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), CLASS_COLORS[vehicle.class_id], -1)
+
+    return frame
+
+
+def generate_video(spec: SyntheticVideoSpec, directory: str) -> Dict[str, Any]:
+    """
+    Write the video (MJPG AVI, decodable by every OpenCV build) once per spec.
+
+    Returns:
+        Dictionary with the video path, spec and ground truth vehicles
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{spec.name}_seed{spec.seed}.avi")
+    vehicles = plan_vehicles(spec)
+
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp.avi"
+        writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*"MJPG"), spec.fps, (spec.width, spec.height))
+        if not writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {tmp_path}")
+        try:
+            for i in range(int(spec.duration * spec.fps)):
+                writer.write(render_frame(spec, vehicles, i / spec.fps))
+        finally:
+            writer.release()
+        os.replace(tmp_path, path)
+
+    return {
+        'path': path,
+        'spec': asdict(spec),
+        'vehicles': len(vehicles),
+        'vehicles_by_class': {
+            class_id: sum(1 for v in vehicles if v.class_id == class_id) for class_id in CLASS_COLORS
+        }
+    }
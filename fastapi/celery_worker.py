@@ -11,9 +11,15 @@ Usage:
     # Start worker for specific queue
     celery -A celery_worker worker -Q video_processing --loglevel=info
     celery -A celery_worker worker -Q detection_processing --loglevel=info
+    celery -A celery_worker worker -Q maintenance --concurrency=1 --loglevel=info
+    # Jobs estimated above JOB_HEAVY_COST_SECONDS only run here
+    celery -A celery_worker worker -Q video_processing_heavy --concurrency=1 --loglevel=info
 
     # Start worker with concurrency
     celery -A celery_worker worker --concurrency=4 --loglevel=info
+    # Each child gets cores/concurrency torch threads (AI_TORCH_THREADS,
+    # AI_CPU_AFFINITY override); find the best split with:
+    python -m benchmarks.concurrency_sweep --concurrency 1,2,4 --threads 1,2,4
 
     # Start Celery Beat (for periodic tasks)
     celery -A celery_worker beat --loglevel=info
@@ -21,6 +27,9 @@ Usage:
     # Start Flower (monitoring UI)
     celery -A celery_worker flower --port=5555
 
+    # Optional: one shared inference server per host (set AI_INFERENCE_BACKEND=server)
+    python -m app.ai.inference_server
+
 Requirements: 5.1, 5.2
 """
 
@@ -30,10 +39,15 @@ import os
 # Add the app directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+# Thread counts of OpenMP/MKL are read when numpy/torch load, i.e. before the pool forks
+from app.core.cpu_governor import export_thread_env, concurrency_from_argv
+
+export_thread_env(concurrency_from_argv(sys.argv) or os.cpu_count() or 1)
+
 from app.core.celery_config import celery_app
 
 # Import workers to register tasks
-from app.workers import video_worker, detection_worker
+from app.workers import video_worker, detection_worker, maintenance_worker
 
 if __name__ == '__main__':
     celery_app.start()
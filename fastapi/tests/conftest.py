@@ -0,0 +1,18 @@
+"""
+Test settings.
+
+Chạy từ thư mục fastapi/:
+    python -m pytest tests
+
+Tests needing PostgreSQL use TEST_DATABASE_URL and are skipped without it.
+"""
+
+import os
+import sys
+
+os.environ.setdefault("DATABASE_URL", os.environ.get("TEST_DATABASE_URL", "postgresql://localhost/test"))
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("TRACK_STORE_UPLOAD", "false")
+os.environ.setdefault("RESULT_BLOB_UPLOAD", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,105 @@
+"""Stride and inference size degradation of the deadline-aware analysis budget."""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from app.ai import analysis_budget
+from app.ai.analysis_budget import AnalysisBudget
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(analysis_budget, "time", clock)
+    return clock
+
+
+def analyze(budget, clock, frames, read_cost, sample_cost):
+    """Simulate the analysis loop: read every frame, analyze every ``stride``-th one."""
+    since_sample = budget.stride - 1
+    for _ in range(frames):
+        clock.now += read_cost
+        budget.record_read(read_cost)
+        since_sample += 1
+        if since_sample >= budget.stride:
+            cost = sample_cost(budget.imgsz) if callable(sample_cost) else sample_cost
+            clock.now += cost
+            budget.record_sample(cost)
+            since_sample = 0
+
+
+def make_budget(**kwargs):
+    options = dict(deadline=100.0, total_frames=1000, stride=2, max_stride=8, imgsz_steps=[480, 320])
+    options.update(kwargs)
+    return AnalysisBudget(**options)
+
+
+def test_run_that_fits_is_left_alone(clock):
+    budget = make_budget()
+    analyze(budget, clock, 1000, read_cost=0.01, sample_cost=0.1)
+
+    assert not budget.degraded
+    assert (budget.stride, budget.imgsz) == (2, None)
+    assert budget.stats()['deadline_reachable'] is True
+
+
+def test_stride_is_raised_first_and_never_restored(clock):
+    budget = make_budget()
+    # 1000 * 0.01 + 500 * 0.3 = 160s at stride 2, over the 85s budget
+    analyze(budget, clock, 200, read_cost=0.01, sample_cost=0.3)
+
+    assert budget.stride == 5
+    assert budget.imgsz is None
+    assert len(budget.adjustments) == 1
+    assert budget.adjustments[0]['stride'] == 5
+
+    # Frames got cheap: the degraded settings stay
+    analyze(budget, clock, 800, read_cost=0.01, sample_cost=0.001)
+    assert budget.stride == 5
+    assert len(budget.adjustments) == 1
+    assert clock.now <= budget.deadline * budget.safety
+
+
+def test_inference_size_is_lowered_once_the_stride_is_maxed(clock):
+    budget = make_budget(max_stride=4)
+    costs = {None: 1.0, 480: 0.2, 320: 0.1}
+    analyze(budget, clock, 1000, read_cost=0.01, sample_cost=lambda imgsz: costs[imgsz])
+
+    assert (budget.stride, budget.imgsz) == (4, 480)
+    # The cost at 480 was measured afresh and fits: 320 is not needed
+    assert len(budget.adjustments) == 1
+    assert budget.reachable
+    assert clock.now <= budget.deadline * budget.safety
+
+
+def test_degradation_stops_at_the_last_step(clock):
+    budget = make_budget(max_stride=4, imgsz_steps=[480])
+    analyze(budget, clock, 1000, read_cost=0.01, sample_cost=5.0)
+
+    assert [(a['stride'], a['imgsz']) for a in budget.adjustments] == [(4, 480), (4, 480)]
+    assert (budget.stride, budget.imgsz) == (4, 480)
+    stats = budget.stats()
+    assert stats['deadline_reachable'] is False
+    assert stats['degraded'] is True
+    assert stats['initial_stride'] == 2
+
+    # Nothing left to degrade: no more replanning
+    assert budget.record_sample(5.0) is False
+    assert len(budget.adjustments) == 2
+
+
+def test_unknown_frame_count_is_not_projected(clock):
+    budget = make_budget(total_frames=0)
+    analyze(budget, clock, 1000, read_cost=0.01, sample_cost=1.0)
+
+    assert not budget.degraded
+    assert budget.stride == 2
@@ -0,0 +1,89 @@
+"""Smart-cut evidence clips must decode cleanly and keep the source stream parameters."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app.services.evidence_clip_service import EvidenceClipService
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg/ffprobe not installed"
+)
+
+FPS = 25
+
+
+def make_source(path: str, profile: str = "main", pix_fmt: str = "yuv420p"):
+    """12 s H.264 video with a keyframe every 4 s."""
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size=320x240:rate={FPS}",
+        "-t", "12", "-c:v", "libx264", "-profile:v", profile, "-pix_fmt", pix_fmt,
+        "-g", str(4 * FPS), "-keyint_min", str(4 * FPS), "-sc_threshold", "0",
+        path
+    ], check=True)
+
+
+def decode_errors(path: str) -> str:
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+    return result.stderr.strip()
+
+
+def frame_count(path: str) -> int:
+    output = subprocess.run([
+        "ffprobe", "-v", "error", "-select_streams", "v:0", "-count_frames",
+        "-show_entries", "stream=nb_read_frames", "-of", "csv=p=0", path
+    ], capture_output=True, text=True, check=True).stdout
+    return int(output.strip())
+
+
+@pytest.mark.parametrize("profile", ["baseline", "main", "high"])
+def test_smart_cut_matches_source_stream(tmp_path, profile):
+    service = EvidenceClipService()
+    source = str(tmp_path / "source.mp4")
+    make_source(source, profile=profile)
+
+    codec, keyframes = service.probe_stream(source)
+    params = service.probe_encoding(source)
+    encoder_args = service.head_encoder_args(params)
+    assert codec == "h264" and encoder_args is not None
+
+    # Window [3, 9) starts 3 s after the keyframe at 0: head [3, 4) + copied body [4, 9)
+    plans = service.plan_clips([6.0], keyframes)
+    assert plans[0].head_end == pytest.approx(4.0) and plans[0].copy_start == pytest.approx(4.0)
+
+    [clip] = service.extract(source, plans, str(tmp_path), encoder_args=encoder_args)
+
+    assert plans[0].head_end == pytest.approx(4.0), "head did not match the body, clip was re-encoded"
+    clip_params = service.probe_encoding(clip)
+    for key in ("codec_name", "profile", "level", "pix_fmt", "width", "height"):
+        assert clip_params.get(key) == params.get(key), key
+    assert decode_errors(clip) == ""
+    assert abs(frame_count(clip) - 6 * FPS) <= 2
+
+
+def test_unmatched_source_is_reencoded_whole(tmp_path):
+    service = EvidenceClipService()
+    source = str(tmp_path / "source.mp4")
+    # 4:4:4 cannot be reproduced by a yuv420p head
+    make_source(source, profile="high444", pix_fmt="yuv444p")
+
+    _, keyframes = service.probe_stream(source)
+    encoder_args = service.head_encoder_args(service.probe_encoding(source))
+    assert encoder_args is None
+
+    plans = service.plan_clips([6.0], keyframes, split_heads=False)
+    assert plans[0].copy_start is None and plans[0].head_end == plans[0].end
+
+    [clip] = service.extract(source, plans, str(tmp_path), encoder_args=encoder_args)
+    assert os.path.exists(clip)
+    assert decode_errors(clip) == ""
@@ -0,0 +1,91 @@
+"""dHash distances and reuse decisions of the frame skipper on synthetic frames."""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from app.ai.frame_hash import FrameSkipper, dhash, hamming_distance
+
+ALL_ONES = (1 << 64) - 1
+
+
+def ramp(width=640, height=480, rising=True, offset=0):
+    """BGR frame getting brighter (or darker) from left to right."""
+    row = np.linspace(20, 220, width)
+    if not rising:
+        row = row[::-1]
+    gray = np.clip(np.tile(row, (height, 1)) + offset, 0, 255).astype(np.uint8)
+    return np.dstack([gray, gray, gray])
+
+
+def frame_with_bits(flipped=()):
+    """9x8 grayscale frame (already thumbnail size) whose dHash has exactly the ``flipped`` bits cleared."""
+    frame = np.zeros((8, 9), dtype=np.uint8)
+    for y in range(8):
+        value = 100
+        frame[y, 0] = value
+        for x in range(8):
+            value += -10 if y * 8 + x in flipped else 10
+            frame[y, x + 1] = value
+    return frame
+
+
+def test_hamming_distance():
+    assert hamming_distance(0b1011, 0b0001) == 2
+    assert hamming_distance(ALL_ONES, 0) == 64
+    assert hamming_distance(12345, 12345) == 0
+
+
+def test_dhash_follows_the_horizontal_gradient():
+    assert dhash(ramp()) == ALL_ONES
+    assert dhash(ramp(rising=False)) == 0
+    # A global brightness change does not move the gradient signs
+    assert dhash(ramp(offset=15)) == dhash(ramp())
+    assert dhash(np.ascontiguousarray(ramp()[:, :, 0])) == dhash(ramp())
+
+
+def test_dhash_of_controlled_thumbnails():
+    assert dhash(frame_with_bits()) == ALL_ONES
+    assert hamming_distance(dhash(frame_with_bits({0, 9, 63})), ALL_ONES) == 3
+
+
+def test_identical_frames_are_reused_until_a_forced_refresh():
+    skipper = FrameSkipper(threshold=4, refresh_every=3)
+    frame = ramp()
+
+    decisions = [skipper.should_reuse(frame) for _ in range(9)]
+    # First frame and every 4th afterwards go through the model
+    assert decisions == [False, True, True, True, False, True, True, True, False]
+
+    stats = skipper.stats()
+    assert stats['frames'] == 9
+    assert stats['skipped'] == 6
+    assert stats['skip_ratio'] == round(6 / 9, 4)
+
+
+def test_changed_frame_is_inferred_and_becomes_the_reference():
+    skipper = FrameSkipper(threshold=4, refresh_every=10)
+
+    assert skipper.should_reuse(ramp()) is False
+    assert skipper.should_reuse(ramp(rising=False)) is False
+    assert skipper.should_reuse(ramp(rising=False)) is True
+    assert skipper.should_reuse(ramp()) is False
+
+
+def test_drift_is_measured_against_the_last_inferred_frame():
+    skipper = FrameSkipper(threshold=4, refresh_every=10)
+
+    assert skipper.should_reuse(frame_with_bits()) is False
+    # 3 bits from the reference: reused
+    assert skipper.should_reuse(frame_with_bits({1, 2, 3})) is True
+    # Only 3 bits from the previous frame but 6 from the reference: inferred
+    assert skipper.should_reuse(frame_with_bits({1, 2, 3, 4, 5, 6})) is False
+    assert skipper.should_reuse(frame_with_bits({1, 2, 3, 4, 5, 6})) is True
+
+
+def test_stats_without_frames():
+    assert FrameSkipper(threshold=4, refresh_every=0).stats() == {
+        'frames': 0, 'skipped': 0, 'skip_ratio': 0.0, 'threshold': 4, 'refresh_every': 1
+    }
@@ -0,0 +1,141 @@
+"""Backoff, jitter bounds and error classification of the job retry policy."""
+
+import json
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app.core.config import settings
+from app.services.job_retry_policy import (
+    JobRetryPolicy, PermanentJobError, PERMANENT, TIMEOUT, LEASE_EXPIRED, TRANSIENT
+)
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BASE_SECONDS", 60)
+    monkeypatch.setattr(settings, "JOB_RETRY_MAX_SECONDS", 3600)
+    monkeypatch.setattr(settings, "JOB_RETRY_JITTER", 0.5)
+    return JobRetryPolicy()
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeHTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code)
+
+
+@pytest.mark.parametrize("attempt, full_delay", [(1, 60), (2, 120), (3, 240), (6, 1920), (7, 3600), (20, 3600)])
+def test_backoff_doubles_up_to_the_cap_within_jitter(policy, attempt, full_delay):
+    delays = [policy.backoff_seconds(attempt) for _ in range(200)]
+    assert all(full_delay * 0.5 <= delay <= full_delay for delay in delays)
+    # Jitter actually spreads retries
+    assert len(set(delays)) > 1
+
+
+def test_backoff_without_jitter_is_exact(policy, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_JITTER", 0.0)
+    assert [policy.backoff_seconds(n) for n in (0, 1, 2, 3)] == [60, 60, 120, 240]
+
+
+def test_next_run_at_is_after_now(policy):
+    now = datetime(2026, 1, 1)
+    run_at = policy.next_run_at(2, now=now)
+    assert now + timedelta(seconds=60) <= run_at <= now + timedelta(seconds=120)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (PermanentJobError("Video with ID 1 not found"), PERMANENT),
+    (FakeHTTPError(404), PERMANENT),
+    (FakeHTTPError(400), PERMANENT),
+    (FakeHTTPError(429), TRANSIENT),
+    (FakeHTTPError(408), TRANSIENT),
+    (FakeHTTPError(503), TRANSIENT),
+    (asyncio.TimeoutError(), TIMEOUT),
+    (TimeoutError("analysis deadline"), TIMEOUT),
+    (ConnectionError("reset by peer"), TRANSIENT),
+    # Malformed remote responses and bugs are retried, not failed at once
+    (ValueError("bad input"), TRANSIENT),
+    (json.JSONDecodeError("Expecting value", "", 0), TRANSIENT),
+    (UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte"), TRANSIENT),
+    (KeyError("secure_url"), TRANSIENT),
+    (TypeError("unsupported operand"), TRANSIENT),
+    (None, TRANSIENT),
+])
+def test_classify(policy, error, expected):
+    assert policy.classify(error) == expected
+
+
+def test_only_permanent_errors_are_not_retried(policy):
+    assert not policy.is_retryable(PERMANENT)
+    for error_class in (TIMEOUT, LEASE_EXPIRED, TRANSIENT, None):
+        assert policy.is_retryable(error_class)
+
+
+class FakeQuery:
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        return None
+
+
+class FakeSession:
+    def query(self, *args):
+        return FakeQuery()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def make_job():
+    from app.models.video_processing_job import VideoProcessingJob, JobType, JobStatus
+
+    return VideoProcessingJob(
+        id=1, video_id=1, job_type=JobType.AI_ANALYSIS, status=JobStatus.PROCESSING, retry_count=0
+    )
+
+
+def test_job_fails_after_the_last_attempt(policy):
+    pytest.importorskip("numpy")
+    from app.models.video_processing_job import JobStatus
+    from app.services.video_processing_service import VideoProcessingService
+
+    service = VideoProcessingService()
+    job = make_job()
+    for attempt in range(1, service.max_retries):
+        service._handle_job_failure(FakeSession(), job, "Cloudinary unavailable", error=ConnectionError())
+        assert job.status == JobStatus.PENDING
+        assert job.retry_count == attempt
+        assert job.next_run_at > datetime.utcnow()
+
+    service._handle_job_failure(FakeSession(), job, "Cloudinary unavailable", error=ConnectionError())
+    assert job.status == JobStatus.FAILED
+    assert job.retry_count == service.max_retries
+    assert job.next_run_at is None
+
+
+def test_permanent_error_fails_the_job_at_once(policy):
+    pytest.importorskip("numpy")
+    from app.models.video_processing_job import JobStatus
+    from app.services.video_processing_service import VideoProcessingService
+
+    job = make_job()
+    VideoProcessingService()._handle_job_failure(
+        FakeSession(), job, "Video gone", error=PermanentJobError("Video with ID 1 not found")
+    )
+    assert job.status == JobStatus.FAILED
+    assert job.error_class == PERMANENT
+    assert job.retry_count == 1
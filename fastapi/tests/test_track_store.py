@@ -0,0 +1,176 @@
+"""Round trips through the track store and revisioned local copies."""
+
+import io
+import os
+import tarfile
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("numpy")
+
+from app.core.config import settings
+from app.core.worker_runtime import worker_runtime
+from app.services.track_store import TrackStore, TrackStoreUnavailable
+
+
+@pytest.fixture(autouse=True)
+def no_upload(monkeypatch):
+    monkeypatch.setattr(settings, "TRACK_STORE_UPLOAD", False)
+
+
+def box(x, class_id=2, class_name="car", track_id=None, plate=None, confidence=0.9):
+    return {
+        'x1': x, 'y1': 10, 'x2': x + 40, 'y2': 50,
+        'class_id': class_id, 'class_name': class_name, 'confidence': confidence,
+        'track_id': track_id, 'license_plate': plate
+    }
+
+
+def frames(fps=10, seconds=3):
+    """Every frame has one tracked car; every other frame also a motorcycle with a plate."""
+    result = []
+    for i in range(fps * seconds):
+        boxes = [box(i, track_id=1)]
+        if i % 2 == 0:
+            boxes.append(box(100 + i, class_id=3, class_name="motorcycle", plate="29A-12345"))
+        result.append({'timestamp': i / fps, 'bounding_boxes': boxes})
+    # Written out of order: the store sorts by timestamp
+    return list(reversed(result))
+
+
+def pack_tar(directory):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for name in ("frames.npy", "offsets.npy", "boxes.npy", "meta.json"):
+            tar.add(os.path.join(directory, name), arcname=name)
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+
+
+class FakeHttp:
+    def __init__(self, response):
+        self.response = response
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        return self.response
+
+
+def serve(monkeypatch, response):
+    """Route the worker's pooled HTTP session to a canned response."""
+    http = FakeHttp(response)
+    monkeypatch.setattr(type(worker_runtime), "http", property(lambda self: http))
+    return http
+
+
+def test_write_then_read_window(tmp_path):
+    store = TrackStore(root=str(tmp_path))
+    summary = store.write(7, frames())
+
+    assert summary['video_id'] == 7
+    assert summary['frames'] == 30
+    assert summary['boxes'] == 45
+    assert (summary['start'], summary['end']) == (0.0, 2.9)
+    assert summary['revision']
+
+    window = store.read_window(7, 1.0, 1.2, pack=summary)
+    assert [frame['timestamp'] for frame in window] == [1.0, 1.1, 1.2]
+    first = window[0]['bounding_boxes']
+    assert first[0] == {
+        'x1': 10, 'y1': 10, 'x2': 50, 'y2': 50, 'class_id': 2, 'class_name': 'car',
+        'confidence': 0.9, 'track_id': 1, 'license_plate': None
+    }
+    assert first[1]['class_name'] == 'motorcycle'
+    assert first[1]['track_id'] is None
+    assert first[1]['license_plate'] == '29A-12345'
+    assert len(window[1]['bounding_boxes']) == 1
+
+    assert store.read_window(7, 5.0, 6.0, pack=summary) == []
+
+
+def test_no_pack(tmp_path):
+    store = TrackStore(root=str(tmp_path))
+    assert store.write(7, []) is None
+    assert store.read_window(7, 0.0, 10.0) is None
+    assert store.downsample(7, 1.0) is None
+
+
+def test_downsample_keeps_first_frame_per_interval(tmp_path):
+    store = TrackStore(root=str(tmp_path))
+    summary = store.write(7, frames(fps=10, seconds=3))
+
+    downsampled = store.downsample(7, 1.0, pack=summary)
+    assert downsampled['frames'] == 3
+    assert downsampled['boxes'] == 6
+    assert downsampled['revision'] != summary['revision']
+
+    window = store.read_window(7, 0.0, 10.0, pack=downsampled)
+    assert [frame['timestamp'] for frame in window] == [0.0, 1.0, 2.0]
+    assert [b['x1'] for b in window[1]['bounding_boxes']] == [10, 110]
+    assert window[2]['bounding_boxes'][1]['license_plate'] == '29A-12345'
+
+    # Already at 1 fps: nothing to do
+    assert store.downsample(7, 1.0, pack=downsampled) is None
+
+
+def test_copy_publishes_an_independent_pack(tmp_path):
+    store = TrackStore(root=str(tmp_path))
+    source = store.write(7, frames())
+
+    copy = store.copy(7, 8, pack=source)
+    assert copy['video_id'] == 8
+    assert copy['revision'] != source['revision']
+    assert store.read_window(8, 0.0, 10.0, pack=copy) == store.read_window(7, 0.0, 10.0, pack=source)
+
+    # Rewriting the source leaves the copy alone
+    store.downsample(7, 1.0, pack=source)
+    assert len(store.read_window(8, 0.0, 10.0, pack=copy)) == 30
+
+
+def test_stale_local_copy_is_downloaded_again(tmp_path, monkeypatch):
+    # Compaction on another host rewrote the pack and uploaded it
+    remote = TrackStore(root=str(tmp_path / "remote"))
+    current = remote.write(7, frames(fps=10, seconds=3))
+    current = remote.downsample(7, 1.0, pack=current)
+    current['url'] = "https://example.com/video_7.tar"
+
+    local = TrackStore(root=str(tmp_path / "local"))
+    stale = local.write(7, frames(fps=10, seconds=3))
+    assert stale['revision'] != current['revision']
+
+    http = serve(monkeypatch, FakeResponse(200, pack_tar(remote._video_dir(7))))
+
+    window = local.read_window(7, 0.0, 10.0, pack=current)
+    assert [frame['timestamp'] for frame in window] == [0.0, 1.0, 2.0]
+    assert http.urls == [current['url']]
+
+    # Now current: no second download
+    local.read_window(7, 0.0, 10.0, pack=current)
+    assert len(http.urls) == 1
+
+
+def test_missing_and_unavailable_uploads(tmp_path, monkeypatch):
+    store = TrackStore(root=str(tmp_path))
+    pack = {'revision': 'abc', 'url': "https://example.com/video_7.tar"}
+
+    serve(monkeypatch, FakeResponse(404))
+    assert store.read_window(7, 0.0, 10.0, pack=pack) is None
+
+    serve(monkeypatch, FakeResponse(503))
+    with pytest.raises(TrackStoreUnavailable):
+        store.read_window(7, 0.0, 10.0, pack=pack)
+
+
+def test_local_copy_of_another_revision_without_url_is_not_used(tmp_path):
+    store = TrackStore(root=str(tmp_path))
+    old = store.write(7, frames())
+    store.write(7, frames(fps=10, seconds=1))
+    assert store.read_window(7, 0.0, 10.0, pack=old) is None
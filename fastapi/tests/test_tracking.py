@@ -0,0 +1,37 @@
+"""Trackers of concurrent analyses number their tracks independently."""
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+np = pytest.importorskip("numpy")
+pytest.importorskip("ultralytics")
+
+from app.ai.tracking import VehicleTracker
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def detections(*xs):
+    """One confident car per x, rows (x1, y1, x2, y2, conf, cls)."""
+    return np.array([[x, 100, x + 60, 160, 0.9, 2] for x in xs], dtype=np.float32)
+
+
+def track_ids(tracker, rows):
+    return sorted(int(track_id) for track_id in tracker.update(rows, FRAME)[:, 4])
+
+
+def test_trackers_number_tracks_independently_from_one():
+    first = VehicleTracker(frame_rate=10)
+    assert track_ids(first, detections(100, 300)) == [1, 2]
+    assert track_ids(first, detections(102, 302)) == [1, 2]
+
+    # A new tracker used to reset the class-level counter of every other one
+    second = VehicleTracker(frame_rate=10)
+    assert track_ids(second, detections(50, 400)) == [1, 2]
+
+    # A vehicle entering the first video continues its own numbering; a new
+    # track is only reported once it has been confirmed on a second frame
+    track_ids(first, detections(104, 304, 500))
+    assert track_ids(first, detections(106, 306, 502)) == [1, 2, 3]
+
+    assert track_ids(second, detections(52, 402)) == [1, 2]
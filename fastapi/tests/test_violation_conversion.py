@@ -0,0 +1,115 @@
+"""Converting violation detections must not count them on top of the analysis count."""
+
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("numpy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set"
+)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Importing from the package registers every table
+    from app.models import Base
+    from app.services.track_store import track_store
+
+    monkeypatch.setattr(track_store, "root", str(tmp_path / "tracks"))
+
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    connection = engine.connect()
+    transaction = connection.begin()
+    # Commits inside the services become savepoints; everything is rolled back
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+        engine.dispose()
+
+
+def make_video(db):
+    from app.models import User, Camera, CameraVideo
+
+    suffix = uuid.uuid4().hex[:8]
+    user = User(
+        username=f"officer_{suffix}",
+        email=f"officer_{suffix}@example.com",
+        password_hash="x",
+        full_name="Test Officer",
+        role="officer",
+        identification_number=f"ID{suffix}"
+    )
+    camera = Camera(camera_id=f"CAM_{suffix}", name="Test camera")
+    db.add_all([user, camera])
+    db.flush()
+
+    video = CameraVideo(
+        camera_id=camera.id,
+        cloudinary_public_id=f"test/{suffix}",
+        cloudinary_url=f"https://example.com/{suffix}.mp4",
+        uploaded_by=user.id
+    )
+    db.add(video)
+    db.flush()
+    return video
+
+
+def analysis_results(confidences):
+    return {
+        'license_plates': [],
+        'vehicle_counts': {},
+        'frame_detections': [],
+        'violations': [
+            {
+                'timestamp': float(i),
+                'confidence': confidence,
+                'violation_type': 'red_light',
+                'description': 'Vượt đèn đỏ',
+                'bbox': [10, 10, 50, 50],
+                'vehicle_type': 'car'
+            }
+            for i, confidence in enumerate(confidences)
+        ]
+    }
+
+
+def test_conversion_recounts_linked_detections(db):
+    from app.services.ai_detection_service import ai_detection_service
+    from app.services.violation_conversion_service import violation_conversion_service
+
+    video = make_video(db)
+    saved = ai_detection_service.save_detection_results(
+        db=db,
+        video_id=video.id,
+        analysis_results=analysis_results([0.95, 0.92, 0.9, 0.5, 0.4]),
+        write_mode="orm"
+    )
+    db.refresh(video)
+    assert saved['violations'] == 5
+    assert video.violation_count == 5
+
+    created = violation_conversion_service.convert_video(db, video.id, min_confidence=0.85)
+    db.commit()
+    db.refresh(video)
+    assert len(created) == 3
+    assert video.violation_count == 3
+    assert video.has_violations is True
+
+    # Running it again converts nothing and leaves the count alone
+    assert violation_conversion_service.convert_video(db, video.id, min_confidence=0.85) == {}
+    db.commit()
+    db.refresh(video)
+    assert video.violation_count == 3
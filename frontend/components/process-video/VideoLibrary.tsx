@@ -52,7 +52,7 @@ type SortOption = "date_desc" | "date_asc" | "duration_desc" | "duration_asc" |
 
 // Component to handle video dialog content with detections
 function VideoDialogContent({ video }: { video: CameraVideo }) {
-  const { detections, loading: detectionsLoading, error: detectionsError } = useVideoDetections(video.id)
+  const { detections, loading: detectionsLoading, error: detectionsError, setPlaybackTime } = useVideoDetections(video.id, video.duration)
   
   return (
     <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
@@ -77,6 +77,7 @@ function VideoDialogContent({ video }: { video: CameraVideo }) {
             videoUrl={video.cloudinary_url}
             detections={detections}
             autoPlay
+            onTimeUpdate={setPlaybackTime}
           />
         )}
       </div>
@@ -25,9 +25,9 @@ interface BoundingBox {
 }
 
 interface Detection {
-  id: number
+  id?: number
   timestamp: number
-  confidence: number
+  confidence?: number
   data: {
     bounding_boxes?: BoundingBox[]
     license_plate?: string
@@ -42,6 +42,8 @@ interface VideoPlayerWithBoundingBoxesProps {
   detections?: Detection[]
   autoPlay?: boolean
   className?: string
+  // Called as playback moves or the user seeks, e.g. to load detections lazily
+  onTimeUpdate?: (time: number) => void
 }
 
 // Vehicle class colors (matching Test/main.py)
@@ -65,7 +67,8 @@ export function VideoPlayerWithBoundingBoxes({
   videoUrl, 
   detections = [], 
   autoPlay = false,
-  className = ""
+  className = "",
+  onTimeUpdate
 }: VideoPlayerWithBoundingBoxesProps) {
   const videoRef = useRef<HTMLVideoElement>(null)
   const canvasRef = useRef<HTMLCanvasElement>(null)
@@ -195,6 +198,7 @@ export function VideoPlayerWithBoundingBoxes({
 
     const handleTimeUpdate = () => {
       setCurrentTime(video.currentTime)
+      onTimeUpdate?.(video.currentTime)
       drawBoundingBoxes()
     }
 
@@ -234,7 +238,7 @@ export function VideoPlayerWithBoundingBoxes({
         cancelAnimationFrame(animationFrameRef.current)
       }
     }
-  }, [autoPlay, detections])
+  }, [autoPlay, detections, onTimeUpdate])
 
   const togglePlay = () => {
     const video = videoRef.current
@@ -254,6 +258,7 @@ export function VideoPlayerWithBoundingBoxes({
     const time = parseFloat(e.target.value)
     video.currentTime = time
     setCurrentTime(time)
+    onTimeUpdate?.(time)
     drawBoundingBoxes()
   }
 
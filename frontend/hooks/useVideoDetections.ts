@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef, useCallback } from 'react'
 import { detectionApi } from '@/lib/api'
 
 interface BoundingBox {
@@ -13,10 +13,11 @@ interface BoundingBox {
   license_plate?: string
 }
 
+// Frames from the track store carry only boxes, so id and confidence are optional
 interface Detection {
-  id: number
+  id?: number
   timestamp: number
-  confidence: number
+  confidence?: number
   data: {
     bounding_boxes?: BoundingBox[]
     license_plate?: string
@@ -27,94 +28,141 @@ interface Detection {
   }
 }
 
-export function useVideoDetections(videoId: number | null) {
+// Khung thời gian mỗi lần tải detections và bounding boxes
+const WINDOW_SECONDS = 60
+// Số detections tối đa mỗi trang
+const PAGE_SIZE = 1000
+
+const transformDetection = (det: any): Detection => {
+  // Nếu là FRAME detection, đã có bounding_boxes
+  if (det.detection_type === 'frame' && det.data.bounding_boxes) {
+    return {
+      id: det.id,
+      timestamp: det.timestamp,
+      confidence: det.confidence,
+      data: {
+        bounding_boxes: det.data.bounding_boxes
+      }
+    }
+  }
+
+  // Convert legacy bbox format to bounding_boxes if needed
+  let boundingBoxes = det.data.bounding_boxes || []
+
+  // If no bounding_boxes but has bbox (legacy format), convert it
+  if (!boundingBoxes.length && det.data.bbox && Array.isArray(det.data.bbox)) {
+    const [x1, y1, x2, y2] = det.data.bbox
+    boundingBoxes = [{
+      x1,
+      y1,
+      x2,
+      y2,
+      class_id: 2, // Default to car
+      class_name: det.data.vehicle_type || 'car',
+      confidence: det.confidence,
+      license_plate: det.data.license_plate || det.data.plate_number
+    }]
+  }
+
+  // Nếu là vehicle_count, thêm vào data
+  if (det.detection_type === 'vehicle_count') {
+    return {
+      id: det.id,
+      timestamp: det.timestamp,
+      confidence: det.confidence,
+      data: {
+        vehicle_count: det.data,
+        bounding_boxes: boundingBoxes
+      }
+    }
+  }
+
+  return {
+    id: det.id,
+    timestamp: det.timestamp,
+    confidence: det.confidence,
+    data: {
+      ...det.data,
+      bounding_boxes: boundingBoxes,
+      license_plate: det.data.license_plate || det.data.plate_number,
+      vehicle_type: det.data.vehicle_type
+    }
+  }
+}
+
+/**
+ * Detections of a video, loaded one time window at a time.
+ *
+ * Only the window at the start is fetched up front; call setPlaybackTime as the
+ * video plays or seeks and the windows around that time are loaded on demand.
+ */
+export function useVideoDetections(videoId: number | null, duration?: number | null) {
   const [detections, setDetections] = useState<Detection[]>([])
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  // Windows already fetched or in flight for the current video
+  const requestedRef = useRef<Set<number>>(new Set())
+  const videoIdRef = useRef<number | null>(videoId)
 
-  useEffect(() => {
-    if (!videoId) {
-      setDetections([])
-      return
-    }
+  const loadWindow = useCallback(async (index: number) => {
+    if (!videoId || requestedRef.current.has(index)) return
+    const tFrom = index * WINDOW_SECONDS
+    if (index > 0 && duration && tFrom >= duration) return
+    requestedRef.current.add(index)
+    const tTo = tFrom + WINDOW_SECONDS - 0.001
 
-    const fetchDetections = async () => {
-      setLoading(true)
-      setError(null)
-      
-      try {
-        const response = await detectionApi.getByVideoId(videoId)
-        
-        // Transform API response to Detection format
-        const transformedDetections: Detection[] = response.detections.map((det: any) => {
-          // Nếu là FRAME detection, đã có bounding_boxes
-          if (det.detection_type === 'frame' && det.data.bounding_boxes) {
-            return {
-              id: det.id,
-              timestamp: det.timestamp,
-              confidence: det.confidence,
-              data: {
-                bounding_boxes: det.data.bounding_boxes
-              }
-            }
-          }
-          
-          // Convert legacy bbox format to bounding_boxes if needed
-          let boundingBoxes = det.data.bounding_boxes || []
-          
-          // If no bounding_boxes but has bbox (legacy format), convert it
-          if (!boundingBoxes.length && det.data.bbox && Array.isArray(det.data.bbox)) {
-            const [x1, y1, x2, y2] = det.data.bbox
-            boundingBoxes = [{
-              x1,
-              y1,
-              x2,
-              y2,
-              class_id: 2, // Default to car
-              class_name: det.data.vehicle_type || 'car',
-              confidence: det.confidence,
-              license_plate: det.data.license_plate || det.data.plate_number
-            }]
-          }
-          
-          // Nếu là vehicle_count, thêm vào data
-          if (det.detection_type === 'vehicle_count') {
-            return {
-              id: det.id,
-              timestamp: det.timestamp,
-              confidence: det.confidence,
-              data: {
-                vehicle_count: det.data,
-                bounding_boxes: boundingBoxes
-              }
-            }
-          }
-          
-          return {
-            id: det.id,
-            timestamp: det.timestamp,
-            confidence: det.confidence,
-            data: {
-              ...det.data,
-              bounding_boxes: boundingBoxes,
-              license_plate: det.data.license_plate || det.data.plate_number,
-              vehicle_type: det.data.vehicle_type
-            }
+    try {
+      // Tải từng trang của khung thời gian theo next_cursor
+      const rawDetections: any[] = []
+      let cursor: string | undefined
+      do {
+        const response = await detectionApi.getByVideoId(videoId, { t_from: tFrom, t_to: tTo, cursor, limit: PAGE_SIZE })
+        rawDetections.push(...response.detections)
+        cursor = response.next_cursor || undefined
+      } while (cursor)
+
+      // Bounding boxes theo frame được lưu trong track store, không còn là FRAME detection
+      const tracks = await detectionApi.getTracks(videoId, tFrom, tTo)
+
+      // Bỏ kết quả nếu người dùng đã chuyển sang video khác
+      if (videoIdRef.current !== videoId) return
+
+      const windowDetections: Detection[] = [
+        ...rawDetections.map(transformDetection),
+        ...tracks.frames.map((frame) => ({
+          timestamp: frame.timestamp,
+          data: {
+            bounding_boxes: frame.bounding_boxes
           }
-        })
-        
-        setDetections(transformedDetections)
-      } catch (err) {
-        console.error('Failed to fetch detections:', err)
+        }))
+      ]
+      setDetections((prev) => [...prev, ...windowDetections])
+    } catch (err) {
+      console.error('Failed to fetch detections:', err)
+      requestedRef.current.delete(index)
+      if (videoIdRef.current === videoId) {
         setError(err instanceof Error ? err.message : 'Failed to fetch detections')
-        setDetections([])
-      } finally {
-        setLoading(false)
       }
     }
+  }, [videoId, duration])
+
+  useEffect(() => {
+    videoIdRef.current = videoId
+    requestedRef.current = new Set()
+    setDetections([])
+    setError(null)
+    if (!videoId) return
+
+    setLoading(true)
+    loadWindow(0).finally(() => setLoading(false))
+  }, [videoId, loadWindow])
 
-    fetchDetections()
-  }, [videoId])
+  // Tải khung hiện tại và khung kế tiếp để phát liên tục
+  const setPlaybackTime = useCallback((time: number) => {
+    const index = Math.max(0, Math.floor(time / WINDOW_SECONDS))
+    loadWindow(index)
+    loadWindow(index + 1)
+  }, [loadWindow])
 
-  return { detections, loading, error }
+  return { detections, loading, error, setPlaybackTime }
 }
@@ -993,15 +993,33 @@ export const detectionApi = {
   getByVideoId: async (videoId: number, params?: {
     detection_type?: string
     min_confidence?: number
-  }): Promise<{ video_id: number; total_detections: number; detections: AIDetection[] }> => {
+    t_from?: number
+    t_to?: number
+    cursor?: string
+    limit?: number
+  }): Promise<{ video_id: number; total_detections: number; page_count: number; detections: AIDetection[]; next_cursor?: string | null }> => {
     const queryParams = new URLSearchParams()
     if (params?.detection_type) queryParams.append('detection_type', params.detection_type)
     if (params?.min_confidence !== undefined) queryParams.append('min_confidence', params.min_confidence.toString())
+    if (params?.t_from !== undefined) queryParams.append('t_from', params.t_from.toString())
+    if (params?.t_to !== undefined) queryParams.append('t_to', params.t_to.toString())
+    if (params?.cursor) queryParams.append('cursor', params.cursor)
+    if (params?.limit !== undefined) queryParams.append('limit', params.limit.toString())
 
     const endpoint = `/v1/videos/${videoId}/detections${queryParams.toString() ? `?${queryParams}` : ''}`
     return apiClient.get(endpoint)
   },
 
+  // Get frame-level bounding boxes of a video for a time window (seconds)
+  getTracks: async (videoId: number, tFrom: number, tTo: number): Promise<{
+    video_id: number
+    t_from: number
+    t_to: number
+    frames: { timestamp: number; bounding_boxes: any[] }[]
+  }> => {
+    return apiClient.get(`/v1/videos/${videoId}/tracks?t_from=${tFrom}&t_to=${tTo}`)
+  },
+
   // Create violation from detection
   createViolation: async (detectionId: number, officerId?: number): Promise<{
     success: boolean